@@ -1,13 +1,20 @@
 # auth.py
-import bcrypt
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 from dotenv import load_dotenv
 from models import User
+from database import get_async_db
+from core.password_hasher import password_hasher, HasherBusyError, HasherTimeoutError
+from core.ttl_cache import TTLCache
 
 
 load_dotenv()
@@ -18,41 +25,41 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# Кэш аутентифицированных пользователей (по id); в каждом воркере свой, TTL ограничивает устаревание
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+)
+
+# Кэш уже проверенных JWT (по sha256 токена); запись живёт не дольше exp
+token_cache = TTLCache(
+    maxsize=int(os.getenv("JWT_CACHE_SIZE", "4096")),
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Проверяет, соответствует ли введенный пароль хешу из базы данных
+    Проверяет, соответствует ли введенный пароль хешу из базы данных.
+    bcrypt выполняется в пуле процессов, чтобы не блокировать event loop
     """
     try:
-        # Конвертируем в байты для bcrypt
-        if isinstance(plain_password, str):
-            plain_password = plain_password.encode('utf-8')
-        if isinstance(hashed_password, str):
-            hashed_password = hashed_password.encode('utf-8')
-        
-        # Обрезаем до 72 байт (ограничение bcrypt)
-        if len(plain_password) > 72:
-            plain_password = plain_password[:72]
-        result = bcrypt.checkpw(plain_password, hashed_password)
+        result = await password_hasher.verify(plain_password, hashed_password)
         print(f"Password verification result: {result}")  
         return result
+    except (HasherBusyError, HasherTimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error verifying password: {e}")
         return False
-def get_password_hash(password: str) -> str:
+
+async def get_password_hash(password: str) -> str:
     """
     Создает хеш пароля для сохранения в базе данных
     """
     try:
-        if isinstance(password, str):
-            password = password.encode('utf-8')
-        
-        if len(password) > 72:
-            password = password[:72]
-        
-        salt = bcrypt.gensalt(rounds=12)
-        hashed = bcrypt.hashpw(password, salt)
-        
-        return hashed.decode('utf-8')
+        return await password_hasher.hash(password)
+    except (HasherBusyError, HasherTimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error hashing password: {e}")
         raise
@@ -77,17 +84,50 @@ def create_refresh_token(data: Dict[str, Any]) -> str:
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti делает токен уникальным, даже если выдан в ту же секунду (нужно индексу сессий)
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def decode_token(token: str) -> Dict[str, Any]:
     """
-    Получает текущего пользователя из JWT токена
+    Декодирует и проверяет JWT, повторные обращения с тем же токеном берутся из кэша.
+    Бросает JWTError, если токен невалиден
+    """
+    digest = _token_digest(token)
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    exp = payload.get("exp")
+    if exp is not None:
+        remaining = exp - time.time()
+        if remaining > 0:
+            token_cache.set(digest, payload, ttl=min(remaining, token_cache.ttl))
+    return payload
+
+def revoke_token(token: str) -> None:
+    """Удаляет токен из кэша проверенных JWT (например, при выходе)"""
+    token_cache.delete(_token_digest(token))
+
+def invalidate_principal(user_id: Optional[int] = None) -> None:
+    """
+    Сбрасывает закэшированного пользователя (или весь кэш, если user_id не указан).
+    Вызывается при изменении, бане и удалении пользователя
+    """
+    if user_id is None:
+        principal_cache.clear()
+    else:
+        principal_cache.delete(int(user_id))
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """
+    Получает текущего пользователя из JWT токена.
+    Использует асинхронную сессию запроса и кэш пользователей, чтобы не ходить в БД на каждый запрос
     """
-    from models import User
-    from database import session_local
-    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -95,21 +135,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         user_id: int = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    db = session_local()
-    try:
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if user is None:
-            raise credentials_exception
+    user = principal_cache.get(int(user_id))
+    if user is not None:
         return user
-    finally:
-        db.close()
+    user = (await db.execute(select(User).where(User.id == int(user_id)))).scalar_one_or_none()
+    if user is None:
+        raise credentials_exception
+    # Отвязываем объект от сессии, чтобы commit в обработчике не сбросил его атрибуты
+    db.expunge(user)
+    principal_cache.set(user.id, user)
+    return user
+
 async def get_current_admin(current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -0,0 +1,65 @@
+# benchmarks/auth_overhead.py
+# Замер накладных расходов аутентификации на запрос: jwt.decode + SELECT users
+# против кэша проверенных токенов и кэша пользователей.
+# Запуск из папки current_version: python benchmarks/auth_overhead.py
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from jose import jwt
+
+import auth
+from models import Base, User
+
+ITERATIONS = 20000
+
+
+def bench(label, fn, iterations=ITERATIONS):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed / iterations * 1e6:8.1f} мкс/запрос")
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(User(nickname="bench", password="x", fullname="Bench", email="bench@example.com", is_active=True))
+    db.commit()
+    user_id = db.query(User).first().id
+    token = auth.create_access_token({"sub": str(user_id), "is_teacher": False})
+
+    loop = asyncio.new_event_loop()
+    async_db = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}"))()
+
+    def uncached():
+        jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        db.query(User).filter(User.id == user_id).first()
+
+    def cached():
+        loop.run_until_complete(auth.get_current_user(token, async_db))
+
+    print(f"Итераций: {ITERATIONS}")
+    bench("jwt.decode без кэша", lambda: jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]))
+    bench("decode_token с кэшем", lambda: auth.decode_token(token))
+    bench("jwt.decode + SELECT users (как раньше)", uncached)
+    cached()
+    bench("get_current_user с кэшами", cached)
+    loop.run_until_complete(async_db.close())
+    loop.close()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
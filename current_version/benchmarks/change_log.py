@@ -0,0 +1,87 @@
+# benchmarks/change_log.py
+# Синхронизация по дельтам: клиент, отставший на CHANGED изменений, читает журнал (/changes)
+# вместо полной выгрузки проектов. Отдельно — цена триггеров журнала при записи.
+# Запуск из папки current_version: python benchmarks/change_log.py
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# База для замера — временная, DATABASE_URL читается при импорте database
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import select, text
+
+from change_log import _TRIGGERS, ensure_change_log, read_changes
+from database import async_session_local, engine
+from models import Base, Project
+
+PROJECTS = 20_000
+CHANGED = 200
+UPDATES = 2000
+ROUNDS = 20
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    ensure_change_log()
+    rows = [{"id": i, "title": f"Проект {i}", "body": "описание " * 40, "underbody": "", "version": 0,
+             "participants": [], "tasks": [], "links": {}, "suggestions": [], "join_requests": []}
+            for i in range(1, PROJECTS + 1)]
+    with engine.begin() as conn:
+        conn.execute(Project.__table__.insert(), rows)
+        return conn.exec_driver_sql("SELECT max(seq) FROM change_log").scalar()
+
+
+def update_projects(count):
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(count):
+        # Как ORM при изменении проекта: отдельная транзакция, version + 1
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE projects SET title = title || '!', version = version + 1 WHERE id = :id"),
+                         {"id": rng.randint(1, PROJECTS)})
+    return (time.perf_counter() - start) / count
+
+
+async def measure(label, read):
+    async with async_session_local() as db:
+        await read(db)      # прогрев
+        latencies = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            size = await read(db)
+            latencies.append(time.perf_counter() - start)
+    print(f"  {label:<40} p50={statistics.median(latencies) * 1000:8.2f} мс, строк {size}")
+
+
+async def main():
+    head = seed()
+    with_log = update_projects(UPDATES)
+    with engine.begin() as conn:
+        for name, _, _ in _TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER {name}")
+    without_log = update_projects(UPDATES)
+    print(f"Проектов: {PROJECTS}; запись (UPDATE + commit): с журналом {with_log * 1e6:.0f} мкс, "
+          f"без журнала {without_log * 1e6:.0f} мкс")
+
+    since = head + UPDATES - CHANGED
+    print(f"Клиент отстал на {CHANGED} изменений:")
+
+    async def full(db):
+        return len((await db.execute(select(Project))).scalars().all())
+
+    async def delta(db):
+        return len((await read_changes(db, since, 500))["changes"])
+
+    await measure("полная выгрузка проектов (было)", full)
+    await measure("GET /changes?since=", delta)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+# benchmarks/db_concurrency.py
+# Сравнение синхронной Session и AsyncSession внутри async-обработчиков:
+# несколько медленных запросов приходят одновременно с равномерным потоком быстрых,
+# измеряем задержку быстрых запросов (от момента прихода) и общую пропускную способность.
+# Запуск из папки current_version: python benchmarks/db_concurrency.py
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 300000) "
+    "SELECT count(*) FROM c"
+)
+FAST_QUERY = text("SELECT 1")
+SLOW_REQUESTS = 2
+FAST_REQUESTS = 200
+FAST_INTERVAL = 0.005
+
+
+async def run_sync(Session):
+    latencies = []
+
+    async def slow():
+        with Session() as db:
+            db.execute(SLOW_QUERY).scalar()
+
+    async def fast(i):
+        arrival = start + i * FAST_INTERVAL
+        await asyncio.sleep(max(arrival - time.perf_counter(), 0))
+        with Session() as db:
+            db.execute(FAST_QUERY).scalar()
+        latencies.append(time.perf_counter() - arrival)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[slow() for _ in range(SLOW_REQUESTS)], *[fast(i) for i in range(FAST_REQUESTS)])
+    return time.perf_counter() - start, latencies
+
+
+async def run_async(AsyncSession):
+    latencies = []
+
+    async def slow():
+        async with AsyncSession() as db:
+            (await db.execute(SLOW_QUERY)).scalar()
+
+    async def fast(i):
+        arrival = start + i * FAST_INTERVAL
+        await asyncio.sleep(max(arrival - time.perf_counter(), 0))
+        async with AsyncSession() as db:
+            (await db.execute(FAST_QUERY)).scalar()
+        latencies.append(time.perf_counter() - arrival)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[slow() for _ in range(SLOW_REQUESTS)], *[fast(i) for i in range(FAST_REQUESTS)])
+    return time.perf_counter() - start, latencies
+
+
+def report(label, elapsed, latencies):
+    latencies = sorted(latencies)
+    total = SLOW_REQUESTS + FAST_REQUESTS
+    print(f"{label}: {total / elapsed:7.1f} запр/с, быстрые запросы "
+          f"p50={statistics.median(latencies) * 1000:.1f} мс, "
+          f"max={latencies[-1] * 1000:.1f} мс")
+
+
+async def main():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    sync_engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    elapsed, latencies = await run_sync(sessionmaker(bind=sync_engine))
+    report("Session (как раньше)", elapsed, latencies)
+    elapsed, latencies = await run_async(async_sessionmaker(async_engine))
+    report("AsyncSession        ", elapsed, latencies)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
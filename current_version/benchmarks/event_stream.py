@@ -0,0 +1,169 @@
+# benchmarks/event_stream.py
+# Поток событий /events (SSE): WORKERS процессов uvicorn с общим журналом событий (BROKER_BACKEND=sqlite),
+# как воркеры gunicorn. На каждый воркер открываем CONNECTIONS простаивающих соединений, замеряем память
+# воркера на соединение и время, за которое комментарий доходит до всех подписчиков (своего и чужих воркеров).
+# Нужен ulimit -n не меньше 2 * WORKERS * CONNECTIONS + запас.
+# Запуск из папки current_version: python benchmarks/event_stream.py [воркеров] [соединений на воркер]
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+CONNECTIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+BASE_PORT = 8701
+CONNECT_BATCH = 500
+ROUNDS = 5
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def start_worker(port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--log-level", "warning", "--no-access-log", "--backlog", "4096"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.3)
+    process.kill()
+    raise RuntimeError(f"Воркер на порту {port} не запустился")
+
+
+def prepare(port):
+    """Пользователь, его токен и проект, на который подписываются соединения"""
+    url = f"http://127.0.0.1:{port}"
+    httpx.post(f"{url}/students/", json={
+        "nickname": "bench", "fullname": "Bench", "email": "bench@example.ru", "password": "pw", "class": 9
+    })
+    token = httpx.post(f"{url}/auth/login", json={"nickname": "bench", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = httpx.get(f"{url}/users/me", headers=headers).json()["id"]
+    project = httpx.post(f"{url}/projects/", headers=headers, json={
+        "title": "Поток событий", "body": "Замер", "tasks": [], "links": {},
+        "participants": [{"user_id": user_id, "role": "customer", "joined_at": "2026-01-01T00:00:00"}],
+    }).json()
+    return token, headers, user_id, project["id"]
+
+
+class Listener:
+    def __init__(self, worker):
+        self.worker = worker
+        self.received = {}      # id комментария -> время получения
+
+    async def connect(self, port, path):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n".encode())
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        if not head.startswith(b"HTTP/1.1 200"):
+            raise RuntimeError(head.decode(errors="replace"))
+
+    async def listen(self):
+        # Тело идёт чанками (Transfer-Encoding: chunked); id комментария ищем прямо в строке
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            if line.startswith(b"data: ") and b"comment.added" in line:
+                marker = line.split(b'"content": "', 1)[1].split(b'"', 1)[0].decode()
+                self.received[marker] = time.perf_counter()
+
+
+async def open_listeners(worker, port, path):
+    listeners = [Listener(worker) for _ in range(CONNECTIONS)]
+    for i in range(0, CONNECTIONS, CONNECT_BATCH):
+        await asyncio.gather(*(l.connect(port, path) for l in listeners[i:i + CONNECT_BATCH]))
+    return listeners
+
+
+async def main():
+    tmp = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        "BROKER_BACKEND": "sqlite",
+        "BROKER_SQLITE_PATH": os.path.join(tmp, "events.db"),
+    }
+    ports = [BASE_PORT + i for i in range(WORKERS)]
+    # Первый воркер создаёт таблицы, остальные стартуют на готовой базе
+    workers = [start_worker(ports[0], env)]
+    try:
+        token, headers, user_id, project_id = prepare(ports[0])
+        workers += [start_worker(port, env) for port in ports[1:]]
+        idle = [rss_mb(w.pid) for w in workers]
+        path = f"/events?projects={project_id}&token={token}"
+        start = time.perf_counter()
+        listeners = []
+        for worker, port in enumerate(ports):
+            listeners += await open_listeners(worker, port, path)
+        opened = time.perf_counter() - start
+        tasks = [asyncio.create_task(l.listen()) for l in listeners]
+        await asyncio.sleep(2)
+        print(f"Воркеров: {WORKERS}, соединений: {len(listeners)} ({CONNECTIONS} на воркер), "
+              f"открыты за {opened:.1f} с")
+        for worker, (pid, before) in enumerate(zip((w.pid for w in workers), idle)):
+            after = rss_mb(pid)
+            print(f"  воркер {worker}: RSS {before:.0f} → {after:.0f} МиБ, "
+                  f"{(after - before) * 1024 / CONNECTIONS:.1f} КиБ на соединение")
+
+        local, remote = [], []
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{ports[0]}", headers=headers) as client:
+            for round_ in range(ROUNDS):
+                marker = f"bench-{round_}"
+                sent = time.perf_counter()
+                response = await client.post(f"/projects/{project_id}/comments", json={
+                    "id": marker, "authorId": user_id, "createdAt": "2026-01-01T00:00:00",
+                    "isRead": False, "content": marker,
+                })
+                response.raise_for_status()
+                deadline = time.perf_counter() + 10
+                while time.perf_counter() < deadline and not all(marker in l.received for l in listeners):
+                    await asyncio.sleep(0.01)
+                for l in listeners:
+                    if marker in l.received:
+                        (local if l.worker == 0 else remote).append(l.received[marker] - sent)
+                missing = sum(marker not in l.received for l in listeners)
+                if missing:
+                    print(f"  раунд {round_}: не дошло до {missing} соединений")
+                await asyncio.sleep(0.5)
+
+        for label, delays in (("тот же воркер", local), ("другие воркеры (опрос журнала)", remote)):
+            if delays:
+                delays.sort()
+                print(f"  доставка, {label:<31} p50={statistics.median(delays) * 1000:7.1f} мс, "
+                      f"p99={delays[int(len(delays) * 0.99) - 1] * 1000:7.1f} мс, max={delays[-1] * 1000:7.1f} мс")
+        for task in tasks:
+            task.cancel()
+        for l in listeners:
+            l.writer.close()
+        await asyncio.gather(*(l.writer.wait_closed() for l in listeners), return_exceptions=True)
+    finally:
+        for w in workers:
+            w.terminate()
+        for w in workers:
+            try:
+                w.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                w.kill()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
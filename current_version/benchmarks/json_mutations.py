@@ -0,0 +1,109 @@
+# benchmarks/json_mutations.py
+# Параллельные запросы на вступление в один проект: ORM «прочитать — дописать — записать»
+# против атомарного json_insert (project_mutations.append_item).
+# Считаем потерянные запросы, время и объём данных, отправленных в UPDATE.
+# Запуск из папки current_version: python benchmarks/json_mutations.py
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.attributes import flag_modified
+
+from database import apply_sqlite_pragmas
+from models import Base, Project
+from project_mutations import append_item
+
+THREADS = 8
+REQUESTS_PER_THREAD = 50
+EXISTING_REQUESTS = 300     # сколько запросов уже лежит в проекте
+
+
+def make_request(user_id):
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "created_at": datetime.utcnow().isoformat(),
+        "status": "pending",
+    }
+
+
+def setup(path):
+    engine = create_engine(f"sqlite:///{path}", pool_size=THREADS)
+    event.listen(engine, "connect", lambda conn, rec: apply_sqlite_pragmas(conn))
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        project = Project(
+            title="bench", body="bench",
+            join_requests=[make_request(100000 + i) for i in range(EXISTING_REQUESTS)],
+        )
+        db.add(project)
+        db.commit()
+        project_id = project.id
+
+    written = {"bytes": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            values = parameters if isinstance(parameters, (list, tuple)) else parameters.values()
+            written["bytes"] += sum(len(str(v).encode()) for v in values)
+
+    return engine, Session, project_id, written
+
+
+def orm_append(Session, project_id, user_id):
+    with Session() as db:
+        project = db.get(Project, project_id)
+        project.join_requests.append(make_request(user_id))
+        flag_modified(project, "join_requests")
+        db.commit()
+
+
+def atomic_append(Session, project_id, user_id):
+    with Session() as db:
+        append_item(db, project_id, "join_requests", make_request(user_id))
+        db.commit()
+
+
+def run(label, append):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine, Session, project_id, written = setup(path)
+
+    def worker(n):
+        for i in range(REQUESTS_PER_THREAD):
+            append(Session, project_id, n * REQUESTS_PER_THREAD + i)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with Session() as db:
+        project = db.get(Project, project_id)
+        stored = len(project.join_requests) - EXISTING_REQUESTS
+    expected = THREADS * REQUESTS_PER_THREAD
+    print(f"{label:<28} сохранено {stored:4d} из {expected}, потеряно {expected - stored:4d}, "
+          f"{elapsed:6.2f} с, в UPDATE передано {written['bytes'] / 1024:9.1f} КиБ")
+    engine.dispose()
+
+
+def main():
+    print(f"Потоков: {THREADS}, запросов на поток: {REQUESTS_PER_THREAD}, уже в проекте: {EXISTING_REQUESTS}")
+    run("ORM read-modify-write", orm_append)
+    run("json_insert (append_item)", atomic_append)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/project_list.py
+# Список проектов: полное представление (ProjectResponse) против краткого (?view=summary).
+# Замеряем задержку страницы и объём ответа на один проект.
+# Запуск из папки current_version: python benchmarks/project_list.py
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# База для замера — временная, DATABASE_URL читается при импорте database
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from fastapi.testclient import TestClient
+
+import main
+from database import session_local
+from models import Project, ProjectComment
+
+PROJECTS = 200
+TASKS_PER_PROJECT = 15
+COMMENTS_PER_PROJECT = 30
+REQUESTS_PER_PROJECT = 20
+PAGE_SIZE = 50
+ROUNDS = 20
+
+
+def seed():
+    now = datetime.utcnow().isoformat()
+    with session_local() as db:
+        for i in range(PROJECTS):
+            project = Project(
+                title=f"Проект {i}",
+                body="Подробное описание проекта. " * 40,
+                participants=[{"user_id": u, "role": "executor", "joined_at": now} for u in range(1, 6)],
+                links={"github": "https://github.com/example"},
+                join_requests=[
+                    {"id": str(uuid.uuid4()), "user_id": 100 + r, "created_at": now,
+                     "status": "pending" if r % 2 else "rejected"}
+                    for r in range(REQUESTS_PER_PROJECT)
+                ],
+                suggestions=[],
+            )
+            project.tasks = [
+                {"title": f"Задача {t}", "status": ("ожидает", "в работе", "выполнена")[t % 3],
+                 "body": "Описание задачи. " * 20, "progress": t * 5, "timelinend": "20.11.2026"}
+                for t in range(TASKS_PER_PROJECT)
+            ]
+            db.add(project)
+            db.flush()
+            db.add_all(
+                ProjectComment(id=uuid.uuid4().hex, project_id=project.id, author_id=1,
+                               content="Комментарий к проекту " * 5, created_at=now)
+                for _ in range(COMMENTS_PER_PROJECT)
+            )
+        db.commit()
+
+
+def measure(client, label, params):
+    client.get("/projects/", params=params)     # прогрев
+    latencies, size, count = [], 0, 0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        response = client.get("/projects/", params=params)
+        latencies.append(time.perf_counter() - start)
+        size = len(response.content)
+        count = len(response.json()["items"])
+    print(f"{label:<26} p50={statistics.median(latencies) * 1000:7.1f} мс, "
+          f"{size / count / 1024:6.2f} КиБ на проект, {size / 1024:8.1f} КиБ на страницу")
+
+
+def main_bench():
+    with TestClient(main.app) as client:
+        seed()
+        print(f"Проектов: {PROJECTS}, задач: {TASKS_PER_PROJECT}, комментариев: {COMMENTS_PER_PROJECT}, "
+              f"запросов на вступление: {REQUESTS_PER_PROJECT}; страница {PAGE_SIZE}")
+        measure(client, "полное (view=full)", {"limit": PAGE_SIZE})
+        measure(client, "краткое (view=summary)", {"limit": PAGE_SIZE, "view": "summary"})
+        measure(client, "fields=title,participants", {"limit": PAGE_SIZE, "fields": "title,participants"})
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,136 @@
+# benchmarks/project_search.py
+# Поиск проектов: прежний ilike по названию (полный просмотр таблицы) против FTS5 (project_search).
+# Замеряем задержку первой страницы для редкого слова, частого слова и запроса из двух слов,
+# и цену нового комментария в проекте с длинным обсуждением (триггеры индекса).
+# Запуск из папки current_version: python benchmarks/project_search.py
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# База для замера — временная, DATABASE_URL читается при импорте database
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from core.pagination import keyset_query
+from database import engine
+from models import Base, Project, ProjectComment, ProjectTask
+from project_search import ensure_search_index, search_query
+
+PROJECTS = 100_000
+TASKS_PER_PROJECT = 3
+PAGE_SIZE = 50
+ROUNDS = 20
+RARE_EVERY = 10_000     # редкое слово — в каждом RARE_EVERY-м проекте
+BIG_THREAD = 2000       # комментариев в обсуждении проекта 1
+INSERTS = 200
+
+WORDS = (
+    "робот датчик сайт игра модель система анализ данные школа город экология энергия "
+    "приложение платформа сервис учёт библиотека музей история физика химия биология "
+    "математика алгоритм сеть дрон камера свет вода почва растение климат транспорт "
+    "карта маршрут опрос журнал расписание турнир олимпиада конструктор макет стенд"
+).split()
+QUERIES = (
+    ("редкое слово", "гидропоника"),
+    ("частое слово", "робот"),
+    ("два слова", "датчик климат"),
+)
+
+
+def text(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def seed():
+    rng = random.Random(42)
+    Base.metadata.create_all(bind=engine)
+    projects, tasks, comments = [], [], []
+    for i in range(1, PROJECTS + 1):
+        title = text(rng, 4).capitalize()
+        if i % RARE_EVERY == 0:
+            title += " гидропоника"
+        projects.append({"id": i, "title": title, "body": text(rng, 60), "underbody": "", "version": 0})
+        for position in range(TASKS_PER_PROJECT):
+            tasks.append({"id": f"{i}-{position}", "project_id": i, "position": position,
+                          "title": text(rng, 3), "body": text(rng, 12)})
+    comments = [{"id": f"c{i}", "project_id": 1, "author_id": 1, "content": text(rng, 20),
+                 "created_at": f"2026-01-01T{i:08d}"} for i in range(BIG_THREAD)]
+    with engine.begin() as conn:
+        conn.execute(Project.__table__.insert(), projects)
+        conn.execute(ProjectTask.__table__.insert(), tasks)
+        conn.execute(ProjectComment.__table__.insert(), comments)
+    # Индекс строится целиком, как при первом запуске на существующей базе
+    start = time.perf_counter()
+    ensure_search_index()
+    return time.perf_counter() - start
+
+
+def measure(label, build):
+    with Session(bind=engine) as db:
+        db.execute(build()).all()       # прогрев
+        latencies, found = [], 0
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            found = len(db.execute(build()).all())
+            latencies.append(time.perf_counter() - start)
+    print(f"  {label:<42} p50={statistics.median(latencies) * 1000:8.2f} мс, на странице {min(found, PAGE_SIZE)}")
+
+
+def ilike_title(q):
+    # Прежний /search: подстрока в названии, страница по id
+    query = select(Project.id).where(*(Project.title.ilike(f"%{w}%") for w in q.split()))
+    return lambda: keyset_query(query, (Project.id,), "id", False, None, PAGE_SIZE)
+
+
+def ilike_everywhere(q):
+    # Что пришлось бы делать без индекса, чтобы искать и в описании
+    query = select(Project.id).where(
+        *(or_(Project.title.ilike(f"%{w}%"), Project.body.ilike(f"%{w}%")) for w in q.split())
+    )
+    return lambda: keyset_query(query, (Project.id,), "id", False, None, PAGE_SIZE)
+
+
+def fts(q):
+    query, rank = search_query(q)
+    query = query.with_only_columns(Project.id, rank)
+    return lambda: keyset_query(query, (rank, Project.id), "relevance", False, None, PAGE_SIZE)
+
+
+def insert_comments():
+    rng = random.Random(7)
+    start = time.perf_counter()
+    for i in range(INSERTS):
+        # Как POST /projects/{id}/comments: отдельная транзакция на комментарий
+        with engine.begin() as conn:
+            conn.execute(ProjectComment.__table__.insert(), {
+                "id": f"new{i}", "project_id": 1, "author_id": 1, "content": text(rng, 20),
+                "created_at": "2026-02-01T00:00:00",
+            })
+    return (time.perf_counter() - start) / INSERTS
+
+
+def main():
+    build_time = seed()
+    size = os.path.getsize(engine.url.database) / 1024 / 1024
+    print(f"Проектов: {PROJECTS}, задач: {PROJECTS * TASKS_PER_PROJECT}; страница {PAGE_SIZE}")
+    print(f"Построение индекса: {build_time:.1f} с, размер базы с индексом {size:.0f} МиБ")
+    for label, q in QUERIES:
+        query, _ = search_query(q)
+        with Session(bind=engine) as db:
+            total = db.scalar(select(func.count()).select_from(query.subquery()))
+        print(f"{label}: «{q}», совпадений {total}")
+        measure("ilike по названию (было)", ilike_title(q))
+        measure("ilike по названию и описанию", ilike_everywhere(q))
+        measure("FTS5 + bm25 (название, описание, задачи)", fts(q))
+    print(f"Новый комментарий в обсуждении из {BIG_THREAD} (INSERT + commit): {insert_comments() * 1e6:.0f} мкс")
+
+
+if __name__ == "__main__":
+    main()
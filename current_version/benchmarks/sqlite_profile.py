@@ -0,0 +1,76 @@
+# benchmarks/sqlite_profile.py
+# Смешанная нагрузка чтение/запись из 4 процессов (как 4 воркера gunicorn):
+# движок по умолчанию против профиля из database.create_sqlite_engines
+# (WAL, busy_timeout, mmap, отдельный писатель с BEGIN IMMEDIATE).
+# Запуск из папки current_version: python benchmarks/sqlite_profile.py
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+WORKERS = 4
+DURATION = 3.0
+WRITE_RATIO = 0.2
+PROJECTS = 200
+
+
+def worker(url, profile, results):
+    import database
+    if profile:
+        writer, reader = database.create_sqlite_engines(url)
+    else:
+        writer = reader = create_engine(url)
+    reads = writes = errors = 0
+    deadline = time.time() + DURATION
+    while time.time() < deadline:
+        project_id = random.randint(1, PROJECTS)
+        try:
+            if random.random() < WRITE_RATIO:
+                with writer.begin() as conn:
+                    body = conn.execute(text("SELECT body FROM projects WHERE id = :id"), {"id": project_id}).scalar()
+                    conn.execute(
+                        text("UPDATE projects SET body = :body WHERE id = :id"),
+                        {"body": (body or "")[-500:] + "x", "id": project_id}
+                    )
+                writes += 1
+            else:
+                with reader.connect() as conn:
+                    conn.execute(text("SELECT * FROM projects WHERE id = :id"), {"id": project_id}).fetchall()
+                reads += 1
+        except OperationalError:
+            errors += 1
+    results.put((reads, writes, errors))
+
+
+def run(label, profile):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite:///{path}"
+    with create_engine(url).begin() as conn:
+        conn.execute(text("CREATE TABLE projects (id INTEGER PRIMARY KEY, title TEXT, body TEXT)"))
+        for i in range(1, PROJECTS + 1):
+            conn.execute(text("INSERT INTO projects (id, title, body) VALUES (:id, 't', '')"), {"id": i})
+    results = mp.Queue()
+    procs = [mp.Process(target=worker, args=(url, profile, results)) for _ in range(WORKERS)]
+    for p in procs:
+        p.start()
+    totals = [0, 0, 0]
+    for _ in procs:
+        for i, value in enumerate(results.get()):
+            totals[i] += value
+    for p in procs:
+        p.join()
+    reads, writes, errors = totals
+    print(f"{label}: чтений {reads / DURATION:8.0f}/с, записей {writes / DURATION:7.0f}/с, "
+          f"ошибок 'database is locked': {errors}")
+
+
+if __name__ == "__main__":
+    run("По умолчанию        ", profile=False)
+    run("Профиль database.py ", profile=True)
@@ -0,0 +1,44 @@
+# benchmarks/store_load.py
+# Время загрузки PersistentMemoryStore из снимка и лога на миллионе записей
+# (половина снимка уже истекла и должна быть пропущена).
+# Запуск из папки current_version: python benchmarks/store_load.py [число_записей]
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.persistent_store import PersistentMemoryStore
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    log_ops = total // 10
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store")
+        now = time.time()
+        with open(path + ".snapshot", 'w', encoding='utf-8') as f:
+            for i in range(total):
+                expires_at = now + 3600 if i % 2 else now - 1
+                f.write(json.dumps([f"refresh:{i % 50000}:{i}", expires_at, "valid"]) + "\n")
+        with open(path + ".aof", 'w', encoding='utf-8') as f:
+            for i in range(log_ops):
+                f.write(json.dumps(["S", f"invite:{i}", now + 3600, "{}"]) + "\n")
+        size_mb = (os.path.getsize(path + ".snapshot") + os.path.getsize(path + ".aof")) / 1024 / 1024
+
+        start = time.perf_counter()
+        store = PersistentMemoryStore(path=path)
+        elapsed = time.perf_counter() - start
+        print(f"Записей в снимке: {total}, в логе: {log_ops}, на диске: {size_mb:.1f} МБ")
+        print(f"Загружено живых ключей: {len(store._store)} за {elapsed:.2f} с")
+
+        start = time.perf_counter()
+        store.compact()
+        print(f"Сжатие в снимок: {time.perf_counter() - start:.2f} с")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/unread_counters.py
+# «Сколько у меня непрочитанных по всем проектам»: раньше — загрузить проекты пользователя
+# и посчитать непрочитанные комментарии в каждой ветке, теперь — готовые счётчики comment_reads
+# (GET /users/me/unread). Отдельно — цена триггеров счётчиков при добавлении комментария.
+# Запуск из папки current_version: python benchmarks/unread_counters.py
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# База для замера — временная, DATABASE_URL читается при импорте database
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import func, select
+
+from database import async_session_local, engine
+from models import Base, Project, ProjectComment, ProjectParticipant
+from read_cursors import _TRIGGERS, ensure_read_cursors, unread_threads
+
+PROJECTS = 2000
+MY_PROJECTS = 300
+PARTICIPANTS = 5
+TASKS = 3
+COMMENTS = 20          # на ветку
+INSERTS = 2000
+ROUNDS = 20
+USER_ID = 1
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    ensure_read_cursors()
+    projects, participants, comments = [], [], []
+    for pid in range(1, PROJECTS + 1):
+        projects.append({"id": pid, "title": f"Проект {pid}", "body": "описание " * 40, "underbody": "",
+                         "version": 0, "participants": [], "tasks": [], "links": {},
+                         "suggestions": [], "join_requests": []})
+        first = USER_ID if pid <= MY_PROJECTS else 100
+        participants += [{"project_id": pid, "user_id": first + i, "role": "executor"} for i in range(PARTICIPANTS)]
+        for thread in [None] + [f"t{pid}-{i}" for i in range(TASKS)]:
+            comments += [{"id": f"{pid}-{thread}-{i}", "project_id": pid, "task_id": thread,
+                          "author_id": 100 + i % 3, "content": "комментарий", "hidden": False,
+                          "created_at": f"2026-01-01T00:00:{i:02d}", "is_read": False}
+                         for i in range(COMMENTS)]
+    with engine.begin() as conn:
+        conn.execute(Project.__table__.insert(), projects)
+        conn.execute(ProjectParticipant.__table__.insert(), participants)
+        conn.execute(ProjectComment.__table__.insert(), comments)
+
+
+def insert_comments(count, prefix):
+    start = time.perf_counter()
+    for i in range(count):
+        # Как POST /projects/{id}/comments: отдельная транзакция на комментарий
+        with engine.begin() as conn:
+            conn.execute(ProjectComment.__table__.insert(), {
+                "id": f"{prefix}-{i}", "project_id": i % MY_PROJECTS + 1, "task_id": None,
+                "author_id": 100, "content": "новый", "created_at": "2026-02-01T00:00:00",
+            })
+    return (time.perf_counter() - start) / count
+
+
+async def measure(label, read):
+    async with async_session_local() as db:
+        await read(db)      # прогрев
+        latencies = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            total = await read(db)
+            latencies.append(time.perf_counter() - start)
+    print(f"  {label:<45} p50={statistics.median(latencies) * 1000:8.2f} мс, непрочитанных {total}")
+
+
+async def main():
+    seed()
+
+    async def by_projects(db):
+        # Было: все проекты пользователя целиком, затем счёт по каждой ветке
+        projects = (await db.execute(select(Project).join(
+            ProjectParticipant, ProjectParticipant.project_id == Project.id
+        ).where(ProjectParticipant.user_id == USER_ID))).scalars().all()
+        total = 0
+        for project in projects:
+            for thread in [None] + [f"t{project.id}-{i}" for i in range(TASKS)]:
+                total += await db.scalar(select(func.count()).select_from(ProjectComment).where(
+                    ProjectComment.project_id == project.id, ProjectComment.task_id == thread,
+                    ProjectComment.hidden == False, ProjectComment.is_read == False,
+                    ProjectComment.author_id != USER_ID,
+                ))
+        return total
+
+    async def by_counters(db):
+        return sum(t["unread"] for t in await unread_threads(db, USER_ID))
+
+    print(f"Проектов: {PROJECTS}, у пользователя {MY_PROJECTS}, веток в проекте {TASKS + 1}, "
+          f"комментариев в ветке {COMMENTS}:")
+    await measure("проекты пользователя + счёт по веткам (было)", by_projects)
+    await measure("GET /users/me/unread (счётчики)", by_counters)
+
+    with_counters = insert_comments(INSERTS, "with")
+    with engine.begin() as conn:
+        for name, _, _ in _TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER {name}")
+    without_counters = insert_comments(INSERTS, "without")
+    print(f"Новый комментарий (INSERT + commit, {PARTICIPANTS} участников): со счётчиками "
+          f"{with_counters * 1e6:.0f} мкс, без счётчиков {without_counters * 1e6:.0f} мкс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+# benchmarks/user_search.py
+# Подсказки при наборе: прежний ilike по нику, ФИО и email (полный просмотр на каждое нажатие)
+# против индекса user_search. Запрос — фамилия, набираемая по букве.
+# Запуск из папки current_version: python benchmarks/user_search.py
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# База для замера — временная, DATABASE_URL читается при импорте database
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import or_, select
+
+from database import async_session_local, engine
+from models import Base, User
+from user_search import AUTOCOMPLETE_LIMIT, autocomplete_users, ensure_user_search_index
+
+USERS = 50_000
+ROUNDS = 50
+TYPED = "Иванов"
+
+FIRST_NAMES = "Иван Пётр Мария Анна Сергей Ольга Алексей Елена Дмитрий Наталья Артём Юлия".split()
+LAST_NAMES = (
+    "Иванов Петров Смирнов Кузнецов Попов Васильев Соколов Михайлов Новиков Фёдоров "
+    "Морозов Волков Алексеев Лебедев Семёнов Егоров Павлов Козлов Степанов Николаев"
+).split()
+
+
+def seed():
+    rng = random.Random(7)
+    Base.metadata.create_all(bind=engine)
+    rows = []
+    for i in range(1, USERS + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append({
+            "id": i, "nickname": f"user{i}", "password": "x", "fullname": f"{first} {last}",
+            "email": f"user{i}@school{i % 100}.ru", "is_teacher": i % 10 == 0, "is_admin": False, "version": 0,
+        })
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), rows)
+    ensure_user_search_index()
+
+
+async def ilike(db, q):
+    # Прежний /users/?q=: подстрока в нике, ФИО или email, первая страница
+    query = select(User.id).where(or_(
+        User.nickname.ilike(f"%{q}%"), User.fullname.ilike(f"%{q}%"), User.email.ilike(f"%{q}%")
+    ))
+    return (await db.execute(query.order_by(User.id).limit(AUTOCOMPLETE_LIMIT))).all()
+
+
+async def measure(label, search):
+    async with async_session_local() as db:
+        print(label)
+        for length in range(1, len(TYPED) + 1):
+            q = TYPED[:length].lower()
+            await search(db, q)     # прогрев
+            latencies = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                found = await search(db, q)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            print(f"  «{q:<6}» p50={statistics.median(latencies) * 1000:6.2f} мс, "
+                  f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} мс, найдено {len(found)}")
+
+
+async def main():
+    seed()
+    print(f"Пользователей: {USERS}, подсказок: {AUTOCOMPLETE_LIMIT}; набираем «{TYPED.lower()}» строчными")
+    await measure("ilike (было): кириллица не сводится к регистру, «иванов» не находит «Иванов»", ilike)
+    await measure("user_search (FTS5, префиксы)", autocomplete_users)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
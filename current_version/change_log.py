@@ -0,0 +1,231 @@
+# change_log.py
+"""
+Журнал изменений для синхронизации по дельтам (GET /changes?since=).
+Каждая запись проекта, пользователя или комментария добавляет строку с растущим seq.
+Строки пишут триггеры SQLite, то есть в той же транзакции, что и само изменение,
+при любой записи: через ORM, core-вставки и сырой SQL (project_mutations).
+Сжатие журнала: python change_log.py
+"""
+import asyncio
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import column, func, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import NullPool
+
+from database import create_sqlite_writer, engine
+
+CHANGE_LOG_TABLE = "change_log"
+# Сколько дней хранить строки; клиенту, отставшему сильнее, придётся перечитать всё (resync)
+CHANGE_LOG_RETENTION_DAYS = float(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+CHANGE_LOG_COMPACT_INTERVAL = float(os.getenv("CHANGE_LOG_COMPACT_INTERVAL", "3600"))
+# Строк журнала на одну транзакцию удаления при сжатии
+CHANGE_LOG_COMPACT_BATCH = int(os.getenv("CHANGE_LOG_COMPACT_BATCH", "2000"))
+
+change_log = table(
+    CHANGE_LOG_TABLE,
+    column("seq"), column("entity"), column("entity_id"), column("project_id"),
+    column("op"), column("version"), column("changed_at"),
+)
+change_log_meta = table("change_log_meta", column("key"), column("value"))
+
+_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def _log(entity: str, row: str, project_id: str, op: str, version: str) -> str:
+    return (
+        f"INSERT INTO {CHANGE_LOG_TABLE} (entity, entity_id, project_id, op, version, changed_at) "
+        f"VALUES ('{entity}', {row}.id, {project_id}, '{op}', {version}, {_NOW});"
+    )
+
+
+# (имя, событие, таблица, строка журнала). Версия проекта растёт при любом его изменении,
+# в том числе задач и участников, поэтому UPDATE проекта и пользователя ловим по version
+_TRIGGERS = (
+    ("change_log_project_ai", "AFTER INSERT ON projects",
+     _log("project", "NEW", "NEW.id", "upsert", "NEW.version")),
+    ("change_log_project_au", "AFTER UPDATE OF version ON projects WHEN NEW.version IS NOT OLD.version",
+     _log("project", "NEW", "NEW.id", "upsert", "NEW.version")),
+    ("change_log_project_ad", "AFTER DELETE ON projects",
+     _log("project", "OLD", "OLD.id", "delete", "OLD.version")),
+    ("change_log_user_ai", "AFTER INSERT ON users",
+     _log("user", "NEW", "NULL", "upsert", "NEW.version")),
+    ("change_log_user_au", "AFTER UPDATE OF version ON users WHEN NEW.version IS NOT OLD.version",
+     _log("user", "NEW", "NULL", "upsert", "NEW.version")),
+    ("change_log_user_ad", "AFTER DELETE ON users",
+     _log("user", "OLD", "NULL", "delete", "OLD.version")),
+    ("change_log_comment_ai", "AFTER INSERT ON project_comments",
+     _log("comment", "NEW", "NEW.project_id", "upsert", "NULL")),
+    ("change_log_comment_au", "AFTER UPDATE OF content, hidden, is_read ON project_comments",
+     _log("comment", "NEW", "NEW.project_id", "upsert", "NULL")),
+    ("change_log_comment_ad", "AFTER DELETE ON project_comments",
+     _log("comment", "OLD", "OLD.project_id", "delete", "NULL")),
+)
+
+
+def _create_statements():
+    # AUTOINCREMENT: seq не переиспользуется после удаления строк при сжатии
+    yield (
+        f"CREATE TABLE IF NOT EXISTS {CHANGE_LOG_TABLE} ("
+        " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " entity TEXT NOT NULL,"
+        " entity_id TEXT NOT NULL,"
+        " project_id INTEGER,"
+        " op TEXT NOT NULL,"
+        " version INTEGER,"
+        " changed_at INTEGER NOT NULL)"
+    )
+    yield f"CREATE INDEX IF NOT EXISTS ix_change_log_entity ON {CHANGE_LOG_TABLE} (entity, entity_id, seq)"
+    yield "CREATE TABLE IF NOT EXISTS change_log_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+    for name, when, statement in _TRIGGERS:
+        yield f"CREATE TRIGGER IF NOT EXISTS {name} {when} BEGIN\n{statement}\nEND"
+
+
+def ensure_change_log(bind=engine) -> None:
+    """Создаёт журнал и триггеры, если их нет. Прошлые изменения в журнал не попадают:
+    клиенты без since начинают с полной загрузки"""
+    with bind.begin() as conn:
+        for statement in _create_statements():
+            conn.exec_driver_sql(statement)
+
+
+def _compactor_engine():
+    # Своё соединение на один проход сжатия: общий писатель процесса (pool_size=1)
+    # остаётся обработчикам запросов
+    return create_sqlite_writer(engine.url.render_as_string(hide_password=False), poolclass=NullPool)
+
+
+def _delete_batches(bind, where: str = "1", upto: Optional[int] = None) -> int:
+    """
+    DELETE строк журнала по условию where (и seq <= upto) пачками по CHANGE_LOG_COMPACT_BATCH
+    строк, каждая пачка — своя короткая транзакция: блокировка писателя не держится долго
+    """
+    deleted, after = 0, 0
+    limit = f" AND seq <= {int(upto)}" if upto is not None else ""
+    while True:
+        with bind.begin() as conn:
+            last = conn.exec_driver_sql(
+                f"SELECT max(seq) FROM (SELECT seq FROM {CHANGE_LOG_TABLE}"
+                f" WHERE seq > ?{limit} ORDER BY seq LIMIT ?)",
+                (after, CHANGE_LOG_COMPACT_BATCH),
+            ).scalar()
+            if last is None:
+                return deleted
+            deleted += conn.exec_driver_sql(
+                f"DELETE FROM {CHANGE_LOG_TABLE} WHERE seq > ? AND seq <= ? AND {where}", (after, last)
+            ).rowcount
+        after = last
+
+
+def compact_change_log(bind=None, retention_days: float = CHANGE_LOG_RETENTION_DAYS) -> dict:
+    """
+    1) Удаляет строки старше retention_days, предварительно запомнив их последний seq
+       в compacted_through: клиентам с since меньше него нужна полная загрузка.
+    2) Удаляет строки, у сущности которых есть более поздняя: клиент всё равно получит
+       последнюю, resync для этого не нужен.
+    Удаление идёт пачками; bind=None — отдельное соединение на время прохода
+    """
+    own = bind is None
+    bind = _compactor_engine() if own else bind
+    try:
+        cutoff = int(time.time() - retention_days * 24 * 60 * 60)
+        with bind.begin() as conn:
+            horizon = conn.exec_driver_sql(
+                f"SELECT max(seq) FROM {CHANGE_LOG_TABLE} WHERE changed_at < ?", (cutoff,)
+            ).scalar()
+            # Отметка — раньше удаления: read_changes увидит её, даже если пачки ещё удаляются
+            if horizon is not None:
+                conn.exec_driver_sql(
+                    "INSERT INTO change_log_meta (key, value) VALUES ('compacted_through', ?)"
+                    " ON CONFLICT (key) DO UPDATE SET value = max(value, excluded.value)", (horizon,)
+                )
+        expired = _delete_batches(bind, upto=horizon) if horizon is not None else 0
+        superseded = _delete_batches(bind, (
+            f"seq < (SELECT max(c.seq) FROM {CHANGE_LOG_TABLE} c"
+            f" WHERE c.entity = {CHANGE_LOG_TABLE}.entity AND c.entity_id = {CHANGE_LOG_TABLE}.entity_id)"
+        ))
+    finally:
+        if own:
+            bind.dispose()
+    return {"superseded": superseded, "expired": expired}
+
+
+def _claim_compaction(bind, interval: float) -> bool:
+    """
+    Аренда сжатия в change_log_meta: из воркеров gunicorn за интервал проход делает
+    только тот, кто первым застал аренду истёкшей
+    """
+    now = time.time()
+    with bind.begin() as conn:
+        return conn.exec_driver_sql(
+            "INSERT INTO change_log_meta (key, value) VALUES ('compactor_lease', ?)"
+            " ON CONFLICT (key) DO UPDATE SET value = excluded.value WHERE value <= ?"
+            " RETURNING value", (int(now + interval * 0.9), int(now))
+        ).first() is not None
+
+
+def _compaction_pass(interval: float) -> Optional[dict]:
+    bind = _compactor_engine()
+    try:
+        return compact_change_log(bind) if _claim_compaction(bind, interval) else None
+    finally:
+        bind.dispose()
+
+
+async def run_compactor(interval: float = CHANGE_LOG_COMPACT_INTERVAL) -> None:
+    """Фоновая задача: периодически сжимает журнал (в потоке, на своём соединении)"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_compaction_pass, interval)
+        except Exception as e:
+            print(f"Ошибка сжатия журнала изменений: {e}")
+
+
+async def read_changes(db: AsyncSession, since: Optional[int], limit: int) -> dict:
+    """
+    Изменения после since, не больше limit строк. Из нескольких изменений одной сущности
+    на странице остаётся последнее. resync=True — клиент перечитывает данные целиком
+    и продолжает с next_since: since не передан или нужные строки уже удалены сжатием
+    """
+    rows = []
+    if since is not None:
+        query = select(change_log).where(change_log.c.seq > since).order_by(change_log.c.seq).limit(limit + 1)
+        rows = (await db.execute(query)).all()
+    # Отметку сжатия читаем после строк: если сжатие успело удалить часть из них, это будет видно
+    compacted = await db.scalar(
+        select(change_log_meta.c.value).where(change_log_meta.c.key == "compacted_through")
+    ) or 0
+    if since is None or since < compacted:
+        # Журнал после сжатия может быть пуст — позиция тогда не меньше отметки сжатия
+        head = await db.scalar(select(func.max(change_log.c.seq)))
+        return {"changes": [], "next_since": max(head or 0, compacted), "has_more": False, "resync": True}
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest = {}
+    for row in rows:
+        latest[(row.entity, row.entity_id)] = row
+    changes = [
+        {
+            "seq": row.seq,
+            "entity": row.entity,
+            "id": row.entity_id,
+            "op": row.op,
+            "version": row.version,
+            "project_id": row.project_id,
+        }
+        for row in sorted(latest.values(), key=lambda r: r.seq)
+    ]
+    return {
+        "changes": changes,
+        "next_since": rows[-1].seq if rows else since,
+        "has_more": has_more,
+        "resync": False,
+    }
+
+if __name__ == "__main__":
+    ensure_change_log()
+    result = compact_change_log()
+    print(f"✅ Журнал изменений сжат: заменённых строк {result['superseded']}, устаревших {result['expired']}")
@@ -0,0 +1,41 @@
+# comments_backfill.py
+from sqlalchemy import select, func, or_, cast, String
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+from database import engine
+from models import Base, Project, ProjectComment, comment_rows, ensure_task_id
+
+
+def backfill_project_comments(bind=engine) -> int:
+    """
+    Переносит комментарии из JSON (projects.comments и tasks[i].comments) в project_comments
+    и убирает их из документа проекта. Проекты без встроенных комментариев не трогает
+    """
+    Base.metadata.create_all(bind=bind, tables=[ProjectComment.__table__])
+    table = ProjectComment.__table__
+    moved = 0
+    with Session(bind=bind) as db:
+        # Отбираем в SQL только проекты, где ещё остались встроенные комментарии
+        pending = select(Project).where(or_(
+            func.json_array_length(Project.comments) > 0,
+            func.instr(cast(Project.tasks_json, String), '"comments"') > 0,
+        ))
+        for project in db.scalars(pending):
+            tasks = project.tasks_json or []
+            rows = comment_rows(project.id, None, project.comments)
+            for task in tasks:
+                if isinstance(task, dict) and task.get("comments"):
+                    rows.extend(comment_rows(project.id, ensure_task_id(task), task.pop("comments")))
+            if rows:
+                # OR IGNORE: несколько воркеров могут запустить перенос одновременно
+                db.execute(table.insert().prefix_with("OR IGNORE"), rows)
+            project.comments = []
+            flag_modified(project, "tasks_json")
+            moved += len(rows)
+        db.commit()
+    return moved
+
+
+if __name__ == "__main__":
+    count = backfill_project_comments()
+    print(f"✅ Перенесено комментариев: {count}")
@@ -0,0 +1,221 @@
+# core/broker.py
+"""
+Рассылка событий подписчикам (WebSocket / SSE) по темам вида "project:12", "user:5".
+memory — только подписчики этого процесса (uvicorn --reload, один воркер);
+sqlite — общий журнал в файле: каждый воркер gunicorn пишет в него свои события
+и одним опросом на процесс забирает чужие, так что событие доходит до подписчиков всех воркеров
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BROKER_BACKEND = os.getenv("BROKER_BACKEND", "memory")
+BROKER_QUEUE_SIZE = int(os.getenv("BROKER_QUEUE_SIZE", "100"))
+RESYNC_EVENT = json.dumps({"type": "resync"})
+
+
+class Subscription:
+    """Очередь событий одного соединения. Переполнение не блокирует публикацию: лишнее
+    отбрасывается, а клиент получает resync и перечитывает данные сам"""
+
+    def __init__(self, broker: "EventBroker", maxsize: int):
+        self._broker = broker
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.topics: Set[str] = set()
+        self.overflowed = False
+
+    def put(self, event: str) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[str]:
+        """Следующее событие (JSON-строка); None — за timeout ничего не пришло"""
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return RESYNC_EVENT
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def add(self, topics: Iterable[str]) -> None:
+        self._broker._attach(self, set(topics) - self.topics)
+
+    def remove(self, topics: Iterable[str]) -> None:
+        self._broker._detach(self, set(topics) & self.topics)
+
+    def close(self) -> None:
+        self._broker._detach(self, set(self.topics))
+
+
+class EventBroker:
+    """Подписчики этого процесса; publish раздаёт событие всем, кто подписан на тему"""
+
+    def __init__(self, queue_size: int = BROKER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, topics: Iterable[str] = ()) -> Subscription:
+        subscription = Subscription(self, self.queue_size)
+        subscription.add(topics)
+        return subscription
+
+    def _attach(self, subscription: Subscription, topics: Set[str]) -> None:
+        for topic in topics:
+            self._subscribers[topic].add(subscription)
+        subscription.topics |= topics
+
+    def _detach(self, subscription: Subscription, topics: Set[str]) -> None:
+        for topic in topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+        subscription.topics -= topics
+
+    @property
+    def connections(self) -> int:
+        return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+    def publish(self, topic: str, event: dict) -> None:
+        """Опубликовать событие; вызывать после commit, чтобы не разослать откатившееся изменение"""
+        self.published += 1
+        self._dispatch(topic, json.dumps(event, ensure_ascii=False, default=str))
+
+    def _dispatch(self, topic: str, payload: str) -> None:
+        # Очереди asyncio не потокобезопасны: из потоков пула передаём раздачу в цикл событий
+        loop = self._loop
+        if loop is not None and not _in_loop(loop):
+            loop.call_soon_threadsafe(self._deliver, topic, payload)
+        else:
+            self._deliver(topic, payload)
+
+    def _deliver(self, topic: str, payload: str) -> None:
+        for subscription in tuple(self._subscribers.get(topic, ())):
+            subscription.put(payload)
+            self.delivered += 1
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        self._loop = None
+
+
+def _in_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+class SQLiteEventBroker(EventBroker):
+    """
+    Общий для воркеров журнал событий (WAL). Своё событие воркер раздаёт сразу,
+    чужие забирает опросом раз в poll_interval — один запрос на процесс, а не на соединение.
+    Журнал хранит события retention секунд: это канал доставки, а не история
+    """
+
+    def __init__(self, path: str = "events.db", poll_interval: float = 0.1, retention: float = 60.0,
+                 busy_timeout_ms: int = 5000, queue_size: int = BROKER_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = uuid.uuid4().hex
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " origin TEXT NOT NULL,"
+            " topic TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._last_seq = 0
+        self._poller: Optional[asyncio.Task] = None
+
+    def _dispatch(self, topic: str, payload: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO events (origin, topic, payload, created_at) VALUES (?, ?, ?, ?)",
+                (self.origin, topic, payload, time.time())
+            )
+        super()._dispatch(topic, payload)
+
+    def _fetch(self) -> list:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, origin, topic, payload FROM events WHERE seq > ? ORDER BY seq", (self._last_seq,)
+            ).fetchall()
+
+    def _prune(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - self.retention,))
+
+    async def _poll(self) -> None:
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                rows = self._fetch()
+                for seq, origin, topic, payload in rows:
+                    if origin != self.origin:
+                        self._deliver(topic, payload)
+                if rows:
+                    self._last_seq = rows[-1][0]
+                if time.monotonic() - last_prune > self.retention:
+                    self._prune()
+                    last_prune = time.monotonic()
+            except sqlite3.Error as e:
+                print(f"Ошибка опроса журнала событий: {e}")
+
+    async def start(self) -> None:
+        await super().start()
+        with self._lock:
+            self._last_seq = self._conn.execute("SELECT coalesce(max(seq), 0) FROM events").fetchone()[0]
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._poller:
+            self._poller.cancel()
+            self._poller = None
+        await super().stop()
+
+
+def create_broker(backend: str = BROKER_BACKEND) -> EventBroker:
+    """Создаёт брокер событий по имени бэкенда (как create_store)"""
+    if backend == "memory":
+        return EventBroker()
+    if backend == "sqlite":
+        return SQLiteEventBroker(
+            path=os.getenv("BROKER_SQLITE_PATH", "events.db"),
+            poll_interval=float(os.getenv("BROKER_POLL_INTERVAL", "0.1")),
+            retention=float(os.getenv("BROKER_RETENTION", "60")),
+        )
+    raise ValueError(f"Unknown BROKER_BACKEND: {backend}")
+
+
+broker = create_broker()
@@ -0,0 +1,70 @@
+# core/conditional.py
+"""
+Условные запросы по версии записи: ETag, If-None-Match (304) и If-Match (412).
+ETag строится из типа, id и version, поэтому проверка не требует загрузки
+и сериализации самой записи
+"""
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+
+def make_etag(kind: str, object_id: int, version: int) -> str:
+    """Сильный ETag вида "project-12-7" """
+    return f'"{kind}-{object_id}-{version}"'
+
+
+def _parse(header: Optional[str]) -> List[str]:
+    return [tag.strip() for tag in (header or "").split(",") if tag.strip()]
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Ответ 304, если у клиента уже есть эта версия (слабое сравнение, как требует RFC 9110)"""
+    tags = _parse(request.headers.get("If-None-Match"))
+    if "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def expected_versions(request: Request, kind: str, object_id: int) -> Optional[List[int]]:
+    """
+    Версии из If-Match для этой записи; None — заголовка нет или он "*".
+    Пустой список — ни один тег не относится к записи (ответ будет 412)
+    """
+    tags = _parse(request.headers.get("If-Match"))
+    if not tags or "*" in tags:
+        return None
+    prefix = f'"{kind}-{object_id}-'
+    versions = []
+    for tag in tags:
+        # Слабые теги для If-Match не подходят; версия — только ASCII-цифры («²» проходит isdigit())
+        version = tag[len(prefix):-1]
+        if tag.startswith(prefix) and tag.endswith('"') and version.isascii() and version.isdigit():
+            versions.append(int(version))
+    return versions
+
+
+def require_version(db: Session, request: Request, model, kind: str, object_id: int, current_version: int) -> None:
+    """
+    Проверка If-Match. Пустой UPDATE с условием на version берёт блокировку писателя,
+    поэтому до commit никто другой не изменит запись между проверкой и записью.
+    При несовпадении — 412 с актуальным ETag
+    """
+    versions = expected_versions(request, kind, object_id)
+    if versions is None:
+        return
+    table = model.__table__
+    locked = db.execute(
+        update(table)
+        .where(table.c.id == object_id, table.c.version.in_(versions))
+        .values(version=table.c.version)
+        .returning(table.c.id)
+    ).first() if versions else None
+    if locked is None:
+        raise HTTPException(
+            status_code=412,
+            detail="Precondition Failed: the resource was modified",
+            headers={"ETag": make_etag(kind, object_id, current_version)},
+        )
@@ -0,0 +1,35 @@
+# core/fts.py
+"""
+Общее для полнотекстовых индексов SQLite FTS5 (project_search, user_search).
+Токенизатор unicode61 сам приводит кириллицу к нижнему регистру, но «ё» и «е»
+считает разными буквами — их сводим одинаково при записи в индекс и в запросе
+"""
+import re
+from typing import List, Optional
+
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+MAX_QUERY_TERMS = 8
+
+
+def fold_sql(expr: str) -> str:
+    """SQL-выражение expr с «ё» → «е» (для записи в индекс)"""
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def fold_text(value: str) -> str:
+    return value.replace("ё", "е").replace("Ё", "Е")
+
+
+def match_terms(q: str, min_prefix: int = 2) -> List[str]:
+    """
+    Слова запроса в синтаксисе FTS5, по одному: слова от min_prefix символов ищутся
+    как префиксы — «проект» находит «проекта». Операторы FTS5 из запроса не проходят
+    """
+    words = re.findall(r"\w+", fold_text(q))[:MAX_QUERY_TERMS]
+    return [f'"{w}"*' if len(w) >= min_prefix else f'"{w}"' for w in words]
+
+
+def match_expression(q: str, min_prefix: int = 2) -> Optional[str]:
+    """Запрос пользователя в синтаксис FTS5: все слова обязательны"""
+    terms = match_terms(q, min_prefix)
+    return " ".join(terms) if terms else None
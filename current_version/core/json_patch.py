@@ -0,0 +1,153 @@
+# core/json_patch.py
+"""
+JSON Patch (RFC 6902) и JSON Merge Patch (RFC 7396) над словарями и списками Python.
+Патч применяется к копии документа целиком или не применяется вовсе
+"""
+import copy
+from typing import Any, List, Set, Tuple
+
+JSON_PATCH_TYPE = "application/json-patch+json"
+MERGE_PATCH_TYPE = "application/merge-patch+json"
+PATCH_OPS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+class PatchError(ValueError):
+    """Некорректный патч или путь (422)"""
+    status_code = 422
+
+
+class PatchConflict(PatchError):
+    """Не прошла операция test (409)"""
+    status_code = 409
+
+
+def parse_pointer(pointer: Any) -> List[str]:
+    """JSON Pointer (RFC 6901) в список токенов"""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    if pointer == "":
+        return []
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    # isascii(): isdigit() пропускает «²», на котором int() падает
+    if not (token.isascii() and token.isdigit()) or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"Invalid array index: {token}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _resolve(doc: Any, tokens: List[str]) -> Any:
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, token, allow_end=False)]
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    return doc
+
+
+def _parent(doc: Any, tokens: List[str]) -> Tuple[Any, str]:
+    if not tokens:
+        raise PatchError("Operations on the whole document are not supported")
+    return _resolve(doc, tokens[:-1]), tokens[-1]
+
+
+def _add(doc: Any, tokens: List[str], value: Any) -> None:
+    parent, key = _parent(doc, tokens)
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    else:
+        raise PatchError(f"Cannot add to a scalar at /{'/'.join(tokens)}")
+
+
+def _remove(doc: Any, tokens: List[str]) -> Any:
+    parent, key = _parent(doc, tokens)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, key, allow_end=False))
+    raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    # В JSON true и 1 — разные значения, а в Python True == 1
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _operation(op: Any) -> Tuple[str, List[str]]:
+    if not isinstance(op, dict) or op.get("op") not in PATCH_OPS:
+        raise PatchError(f"Invalid patch operation: {op!r}")
+    if op["op"] in ("add", "replace", "test") and "value" not in op:
+        raise PatchError(f"Operation '{op['op']}' requires a value")
+    if op["op"] in ("move", "copy") and "from" not in op:
+        raise PatchError(f"Operation '{op['op']}' requires 'from'")
+    return op["op"], parse_pointer(op.get("path"))
+
+
+def json_patch_paths(ops: Any) -> Set[Tuple[str, ...]]:
+    """Все пути, которые патч читает или меняет (для проверки прав)"""
+    if not isinstance(ops, list):
+        raise PatchError("JSON Patch must be an array of operations")
+    paths = set()
+    for op in ops:
+        name, tokens = _operation(op)
+        paths.add(tuple(tokens))
+        if name in ("move", "copy"):
+            paths.add(tuple(parse_pointer(op["from"])))
+    return paths
+
+
+def apply_json_patch(doc: Any, ops: List[dict]) -> Any:
+    """Применить операции по порядку к копии doc; при ошибке исходный doc не меняется"""
+    result = copy.deepcopy(doc)
+    for op in ops:
+        name, tokens = _operation(op)
+        if name == "add":
+            _add(result, tokens, copy.deepcopy(op["value"]))
+        elif name == "remove":
+            _remove(result, tokens)
+        elif name == "replace":
+            _remove(result, tokens)
+            _add(result, tokens, copy.deepcopy(op["value"]))
+        elif name == "move":
+            source = parse_pointer(op["from"])
+            if tokens[:len(source)] == source and tokens != source:
+                raise PatchError("Cannot move a value into itself")
+            _add(result, tokens, _remove(result, source))
+        elif name == "copy":
+            _add(result, tokens, copy.deepcopy(_resolve(result, parse_pointer(op["from"]))))
+        elif not _json_equal(_resolve(result, tokens), op["value"]):
+            raise PatchConflict(f"Test failed at {op['path']}")
+    return result
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """RFC 7396: объекты сливаются рекурсивно, null удаляет ключ, остальное заменяется целиком"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
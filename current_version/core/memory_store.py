@@ -1,58 +1,221 @@
 # core/memory_store.py
+import asyncio
+import bisect
+import heapq
+import os
 import time
 import re
-from typing import Dict, Optional, Iterator
+from fnmatch import translate
+from functools import lru_cache
+from collections import OrderedDict
+from typing import Dict, Optional, Iterator, List, Tuple
+
+GLOB_CHARS = "*?[\\"
+
+
+@lru_cache(maxsize=256)
+def _compile_glob(match: str):
+    return re.compile(translate(match))
+
+
+def _literal_prefix(match: str) -> str:
+    """Часть паттерна до первого спецсимвола glob"""
+    for i, ch in enumerate(match):
+        if ch in GLOB_CHARS:
+            return match[:i]
+    return match
+
 
 class MemoryStore:
     """Простое in-memory хранилище вместо Redis"""
-    
-    def __init__(self):
-        self._store: Dict[str, dict] = {}
-    
+
+    def __init__(self, max_keys: int = 0, max_bytes: int = 0):
+        # max_keys / max_bytes = 0 означает "без ограничения"
+        self._store: "OrderedDict[str, dict]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        # Отсортированный список ключей: поиск по префиксу за O(log n + совпадения)
+        self._sorted_keys: List[str] = []
+        self._bytes = 0
+        self.max_keys = max_keys
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return len(key.encode('utf-8')) + len(str(value).encode('utf-8'))
+
+    def _remove(self, key: str) -> None:
+        data = self._store.pop(key, None)
+        if data is not None:
+            self._bytes -= data['size']
+            i = bisect.bisect_left(self._sorted_keys, key)
+            del self._sorted_keys[i]
+
+    def _expire(self, key: str) -> None:
+        self._remove(key)
+        self.expirations += 1
+
+    def _compact_heap(self) -> None:
+        """Перестраивает кучу сроков, если в ней накопилось много устаревших записей"""
+        if len(self._expiry_heap) > 2 * len(self._store) + 1024:
+            self._expiry_heap = [(d['expires_at'], k) for k, d in self._store.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _enforce_limits(self) -> None:
+        """Вытесняет давно не использованные ключи при превышении лимитов"""
+        while self._store and (
+            (self.max_keys and len(self._store) > self.max_keys) or
+            (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            self._evict(next(iter(self._store)))
+
+    def _evict(self, key: str) -> None:
+        self._remove(key)
+        self.evictions += 1
+
     def setex(self, key: str, seconds: int, value: str) -> None:
         """Сохранить значение с TTL"""
+        self._remove(key)
+        expires_at = time.time() + seconds
+        size = self._entry_size(key, value)
         self._store[key] = {
             'value': value,
-            'expires_at': time.time() + seconds
+            'expires_at': expires_at,
+            'size': size
         }
-    
+        self._bytes += size
+        bisect.insort(self._sorted_keys, key)
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        self._enforce_limits()
+        self._compact_heap()
+
     def get(self, key: str) -> Optional[str]:
         """Получить значение, если не истекло"""
         data = self._store.get(key)
         if not data:
+            self.misses += 1
             return None
-        
+
         if time.time() > data['expires_at']:
-            del self._store[key]
+            self._expire(key)
+            self.misses += 1
             return None
-        
+
+        self._store.move_to_end(key)
+        self.hits += 1
         return data['value']
-    
+
     def delete(self, key: str) -> None:
         """Удалить ключ"""
-        if key in self._store:
-            del self._store[key]
-    
+        self._remove(key)
+
+    def delete_if_exists(self, key: str) -> bool:
+        """Удалить ключ; True, если он был и не истёк (проверка и удаление — одна операция)"""
+        if not self.exists(key):
+            return False
+        self.delete(key)
+        return True
+
     def exists(self, key: str) -> bool:
         """Проверить существование ключа"""
         data = self._store.get(key)
         if not data:
             return False
-        
+
         if time.time() > data['expires_at']:
-            del self._store[key]
+            self._expire(key)
             return False
-        
+
         return True
-    
+
+    def _prefix_bounds(self, prefix: str) -> Tuple[int, int]:
+        keys = self._sorted_keys
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + "\U0010ffff", start)
+        return start, end
+
     def scan_iter(self, match: str = "*") -> Iterator[str]:
         """Имитация redis scan_iter для поиска ключей по паттерну"""
-        pattern = match.replace('*', '.*').replace('?', '.')
-        
-        for key in list(self._store.keys()):
-            if re.match(pattern, key):
+        prefix = _literal_prefix(match)
+        if match == prefix:
+            if self.exists(match):
+                yield match
+            return
+        start, end = self._prefix_bounds(prefix)
+        matcher = None if match == prefix + "*" else _compile_glob(match).match
+
+        for key in self._sorted_keys[start:end]:
+            if matcher is None or matcher(key):
                 if self.exists(key):
                     yield key
 
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """Получить несколько значений за один вызов"""
+        return [self.get(key) for key in keys]
+
+    def setex_many(self, items: Dict[str, str], seconds: int) -> None:
+        """Сохранить несколько значений с одинаковым TTL"""
+        for key, value in items.items():
+            self.setex(key, seconds, value)
+
+    def delete_many(self, keys: List[str]) -> None:
+        """Удалить несколько ключей"""
+        for key in keys:
+            self._remove(key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Удалить все ключи с префиксом (например, все refresh-токены пользователя)"""
+        start, end = self._prefix_bounds(prefix)
+        keys = self._sorted_keys[start:end]
+        del self._sorted_keys[start:end]
+        for key in keys:
+            self._bytes -= self._store.pop(key)['size']
+        return len(keys)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Удалить все истекшие ключи, возвращает их количество"""
+        now = time.time() if now is None else now
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            data = self._store.get(key)
+            # Запись в куче могла устареть: ключ перезаписан или удалён
+            if data is not None and data['expires_at'] == expires_at:
+                self._expire(key)
+                removed += 1
+        self._compact_heap()
+        return removed
+
+    async def run_sweeper(self, interval: float = 30.0) -> None:
+        """Фоновая задача: периодически удаляет истекшие ключи"""
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def close(self) -> None:
+        """Ничего не держит открытым"""
+        return None
+
+    def stats(self) -> dict:
+        """Счётчики попаданий, промахов, истечений и вытеснений"""
+        return {
+            "backend": "memory",
+            "keys": len(self._store),
+            "bytes": self._bytes,
+            "max_keys": self.max_keys,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
 # Создаём глобальный экземпляр
-memory_store = MemoryStore()
\ No newline at end of file
+memory_store = MemoryStore(
+    max_keys=int(os.getenv("MEMORY_STORE_MAX_KEYS", "100000")),
+    max_bytes=int(os.getenv("MEMORY_STORE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
@@ -0,0 +1,105 @@
+# core/pagination.py
+import base64
+import json
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*values) -> str:
+    """Непрозрачный курсор из значений ключа сортировки последней записи страницы"""
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    """Разобрать курсор; 400, если он повреждён или от другого списка"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Значения идут параметрами в SQL: объект или список из подделанного курсора дал бы 500
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def parse_sort(sort: Optional[str], allowed: Dict[str, Any], default: str = "id") -> Tuple[str, bool]:
+    """Разобрать ?sort=: имя поля, с минусом — по убыванию; 400 для неизвестного поля"""
+    sort = sort or default
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in allowed:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort field: {name}")
+    return name, descending
+
+
+def keyset_condition(columns: Sequence, values: Sequence, descending: bool = False):
+    """Условие «строго после курсора» для ключа из нескольких колонок (a, b) > (x, y)"""
+    clauses = []
+    for i, column in enumerate(columns):
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], step))
+    return or_(*clauses)
+
+
+def keyset_query(query, columns: Sequence, sort_name: str, descending: bool, after: Optional[str], limit: int):
+    """
+    Добавить к select() фильтр по курсору, сортировку и limit + 1.
+    Курсор хранит имя сортировки — курсор от другой сортировки даёт 400
+    """
+    values = decode_cursor(after, len(columns) + 1)
+    if values is not None:
+        if values[0] != sort_name:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(keyset_condition(columns, values[1:], descending))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return query.order_by(*order).limit(limit + 1)
+
+
+def next_cursor(rows: list, columns: Sequence, sort_name: str, limit: int) -> Optional[str]:
+    """Курсор на следующую страницу, если запрошенная строка limit + 1 нашлась"""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(sort_name, *(getattr(last, c.key) for c in columns))
+
+
+class PageParams:
+    """Общие параметры списков: ?limit=&after=&sort=&with_total= (подключается через Depends())"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+        after: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+        sort: Optional[str] = Query(None, description="Поле сортировки; с минусом — по убыванию"),
+        with_total: bool = Query(False, description="Посчитать общее число записей"),
+    ):
+        self.limit = limit
+        self.after = after
+        self.sort = sort
+        self.with_total = with_total
+
+
+if __name__ == "__main__":
+    # Проверка разбора курсоров: python -m core.pagination
+    assert decode_cursor(encode_cursor("id", 7), 2) == ["id", 7]
+    assert decode_cursor(encode_cursor("title", "Ёлка", 3), 3) == ["title", "Ёлка", 3]
+    assert decode_cursor(None, 2) is None
+    for tampered in ("не base64", encode_cursor("id"), encode_cursor("id", {"a": 1}), encode_cursor("id", [1])):
+        try:
+            decode_cursor(tampered, 2)
+        except HTTPException as exc:
+            assert exc.status_code == 400, tampered
+        else:
+            raise AssertionError(f"accepted tampered cursor {tampered!r}")
+    print("✅ Курсоры разбираются, подделанные дают 400")
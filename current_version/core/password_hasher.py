@@ -0,0 +1,150 @@
+# core/password_hasher.py
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BCRYPT_ROUNDS = 12
+BCRYPT_MAX_BYTES = 72
+
+
+class HasherBusyError(Exception):
+    """Очередь на хеширование переполнена"""
+
+
+class HasherTimeoutError(Exception):
+    """Хеширование не уложилось в таймаут"""
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    # Обрезаем до 72 байт (ограничение bcrypt)
+    return value[:BCRYPT_MAX_BYTES]
+
+
+def _hash_job(password) -> Tuple[str, float]:
+    """Выполняется в процессе пула: возвращает хеш и время начала работы"""
+    started_at = time.time()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    hashed = bcrypt.hashpw(_to_bytes(password), salt)
+    return hashed.decode('utf-8'), started_at
+
+
+def _check_job(plain_password, hashed_password) -> Tuple[bool, float]:
+    """Выполняется в процессе пула: проверяет пароль"""
+    started_at = time.time()
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return bcrypt.checkpw(_to_bytes(plain_password), hashed_password), started_at
+
+
+class PasswordHasher:
+    """Асинхронное хеширование паролей в ограниченном пуле процессов"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: int = 64, timeout: float = 10.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._stats = {
+            "completed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "hash_time_total": 0.0,
+            "hash_time_max": 0.0,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise HasherBusyError("Password hasher queue is full")
+        self._pending += 1
+        submitted_at = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            job = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._pending -= 1
+            raise
+        # Место в очереди освобождается, когда задача закончилась в пуле, а не когда её перестали ждать:
+        # после таймаута хеширование продолжается, и его процесс занят
+        job.add_done_callback(lambda _: self._release(loop))
+        try:
+            result, started_at = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise HasherTimeoutError("Password hashing timed out")
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finished_at = time.time()
+        self._record(max(started_at - submitted_at, 0.0), finished_at - started_at)
+        return result
+
+    def _release(self, loop) -> None:
+        """Вызывается из потока пула: счётчик меняем в цикле событий"""
+        def release():
+            self._pending -= 1
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            # Цикл уже закрыт (остановка приложения) — считать больше некому
+            pass
+
+    def _record(self, queue_wait: float, hash_time: float) -> None:
+        stats = self._stats
+        stats["completed"] += 1
+        stats["queue_wait_total"] += queue_wait
+        stats["queue_wait_max"] = max(stats["queue_wait_max"], queue_wait)
+        stats["hash_time_total"] += hash_time
+        stats["hash_time_max"] = max(stats["hash_time_max"], hash_time)
+
+    async def hash(self, password) -> str:
+        """Создать bcrypt-хеш пароля"""
+        return await self._run(_hash_job, password)
+
+    async def verify(self, plain_password, hashed_password) -> bool:
+        """Проверить пароль по хешу"""
+        return await self._run(_check_job, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """Метрики очереди и времени хеширования (в секундах)"""
+        stats = dict(self._stats)
+        completed = stats["completed"] or 1
+        stats["queue_wait_avg"] = stats["queue_wait_total"] / completed
+        stats["hash_time_avg"] = stats["hash_time_total"] / completed
+        stats["pending"] = self._pending
+        stats["workers"] = self.workers
+        stats["max_queue"] = self.max_queue
+        stats["timeout"] = self.timeout
+        return stats
+
+    def shutdown(self) -> None:
+        """Остановить пул процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Создаём глобальный экземпляр
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64")),
+    timeout=float(os.getenv("PASSWORD_HASH_TIMEOUT", "10")),
+)
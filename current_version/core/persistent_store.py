@@ -0,0 +1,163 @@
+# core/persistent_store.py
+import heapq
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from core.memory_store import MemoryStore
+
+
+class PersistentMemoryStore(MemoryStore):
+    """
+    MemoryStore, переживающий перезапуск: каждая запись попадает в append-only лог,
+    лог периодически сворачивается в снимок живых ключей.
+    Для одного процесса (uvicorn); при нескольких воркерах используйте sqlite/redis
+    """
+
+    def __init__(self, path: str = "store", max_keys: int = 0, max_bytes: int = 0,
+                 compact_min_ops: int = 10000):
+        super().__init__(max_keys=max_keys, max_bytes=max_bytes)
+        self.snapshot_path = f"{path}.snapshot"
+        self.log_path = f"{path}.aof"
+        self.compact_min_ops = compact_min_ops
+        self._log_ops = 0
+        self._log = None
+        self.load()
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    # ---------- Журнал ----------
+    def _append(self, record: list) -> None:
+        if self._log is None:
+            return
+        self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._log.flush()
+        self._log_ops += 1
+
+    def setex(self, key: str, seconds: int, value: str) -> None:
+        super().setex(key, seconds, value)
+        if key in self._store:
+            self._append(["S", key, self._store[key]['expires_at'], value])
+
+    def delete(self, key: str) -> None:
+        if key in self._store:
+            self._append(["D", key])
+        super().delete(key)
+
+    def delete_many(self, keys: List[str]) -> None:
+        for key in keys:
+            self.delete(key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        self._append(["P", prefix])
+        return super().delete_prefix(prefix)
+
+    def _evict(self, key: str) -> None:
+        self._append(["D", key])
+        super()._evict(key)
+
+    # ---------- Загрузка ----------
+    def load(self) -> int:
+        """Загрузить снимок и доиграть лог, пропуская истекшие ключи"""
+        now = time.time()
+        entries: Dict[str, tuple] = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                for line in f:
+                    key, expires_at, value = json.loads(line)
+                    if expires_at > now:
+                        entries[key] = (expires_at, value)
+        if os.path.exists(self.log_path):
+            # Смещение конца последней целой записи: хвост после него отрезаем
+            good_end = 0
+            torn = False
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Недописанная последняя строка после аварийной остановки
+                        torn = True
+                        break
+                    good_end += len(line)
+                    if not line.endswith(b"\n"):
+                        # Запись целая, но без перевода строки — следующая дописалась бы к ней
+                        torn = True
+                    op = record[0]
+                    if op == "S":
+                        _, key, expires_at, value = record
+                        if expires_at > now:
+                            entries[key] = (expires_at, value)
+                        else:
+                            entries.pop(key, None)
+                    elif op == "D":
+                        entries.pop(record[1], None)
+                    elif op == "P":
+                        prefix = record[1]
+                        for key in [k for k in entries if k.startswith(prefix)]:
+                            del entries[key]
+                    self._log_ops += 1
+            if torn:
+                self._repair_log(good_end)
+
+        # Собираем структуры целиком, без поэлементных вставок в индекс и кучу
+        self._store.clear()
+        self._bytes = 0
+        for key, (expires_at, value) in sorted(entries.items(), key=lambda item: item[1][0]):
+            size = self._entry_size(key, value)
+            self._store[key] = {'value': value, 'expires_at': expires_at, 'size': size}
+            self._bytes += size
+        self._sorted_keys = sorted(self._store)
+        self._expiry_heap = [(d['expires_at'], k) for k, d in self._store.items()]
+        heapq.heapify(self._expiry_heap)
+        self._enforce_limits()
+        return len(self._store)
+
+    def _repair_log(self, good_end: int) -> None:
+        """Отрезать оборванный хвост лога, чтобы новые записи не склеились с ним"""
+        with open(self.log_path, 'r+b') as f:
+            f.truncate(good_end)
+            if good_end:
+                f.seek(good_end - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ---------- Сжатие ----------
+    def compact(self) -> None:
+        """Записать снимок живых ключей и начать лог заново"""
+        now = time.time()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, data in self._store.items():
+                if data['expires_at'] > now:
+                    f.write(json.dumps([key, data['expires_at'], data['value']], ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, 'w', encoding='utf-8')
+        self._log_ops = 0
+
+    def needs_compaction(self) -> bool:
+        return self._log_ops > max(self.compact_min_ops, len(self._store))
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        removed = super().sweep(now)
+        if self.needs_compaction():
+            self.compact()
+        return removed
+
+    def close(self) -> None:
+        """Свернуть лог в снимок и закрыть файл"""
+        self.compact()
+        self._log.close()
+        self._log = None
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["backend"] = "memory+aof"
+        stats["log_ops"] = self._log_ops
+        return stats
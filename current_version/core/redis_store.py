@@ -0,0 +1,100 @@
+# core/redis_store.py
+from typing import Dict, Optional, Iterator, List
+
+try:
+    import redis
+except ImportError:  # redis — необязательная зависимость
+    redis = None
+
+
+class RedisStore:
+    """Хранилище ключей в Redis с пулом соединений, API как у MemoryStore"""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", max_connections: int = 20, client=None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("STORE_BACKEND=redis требует установленный пакет redis")
+            pool = redis.ConnectionPool.from_url(url, max_connections=max_connections, decode_responses=True)
+            client = redis.Redis(connection_pool=pool)
+        self._client = client
+
+    def setex(self, key: str, seconds: int, value: str) -> None:
+        """Сохранить значение с TTL"""
+        self._client.setex(key, seconds, value)
+
+    def get(self, key: str) -> Optional[str]:
+        """Получить значение (истечение контролирует сам Redis)"""
+        return self._client.get(key)
+
+    def delete(self, key: str) -> None:
+        """Удалить ключ"""
+        self._client.delete(key)
+
+    def delete_if_exists(self, key: str) -> bool:
+        """Удалить ключ; True, если он был (DEL возвращает число удалённых — атомарно)"""
+        return self._client.delete(key) > 0
+
+    def exists(self, key: str) -> bool:
+        """Проверить существование ключа"""
+        return bool(self._client.exists(key))
+
+    def scan_iter(self, match: str = "*") -> Iterator[str]:
+        """Поиск ключей по паттерну через SCAN"""
+        return self._client.scan_iter(match=match)
+
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """Получить несколько значений одной командой MGET"""
+        if not keys:
+            return []
+        return self._client.mget(keys)
+
+    def setex_many(self, items: Dict[str, str], seconds: int) -> None:
+        """Сохранить несколько значений одним pipeline"""
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(key, seconds, value)
+        pipe.execute()
+
+    def delete_many(self, keys: List[str]) -> None:
+        """Удалить несколько ключей одной командой"""
+        if keys:
+            self._client.delete(*keys)
+
+    def delete_prefix(self, prefix: str, batch_size: int = 500) -> int:
+        """Удалить все ключи с префиксом пачками через pipeline"""
+        deleted = 0
+        pipe = self._client.pipeline(transaction=False)
+        batch = 0
+        for key in self._client.scan_iter(match=prefix + "*", count=batch_size):
+            pipe.delete(key)
+            batch += 1
+            if batch >= batch_size:
+                deleted += sum(pipe.execute())
+                batch = 0
+        if batch:
+            deleted += sum(pipe.execute())
+        return deleted
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Redis сам удаляет истекшие ключи"""
+        return 0
+
+    async def run_sweeper(self, interval: float = 30.0) -> None:
+        """Фоновая очистка не нужна"""
+        return None
+
+    def close(self) -> None:
+        """Закрыть соединения пула"""
+        self._client.close()
+
+    def stats(self) -> dict:
+        """Размер базы и счётчики keyspace из INFO"""
+        info = self._client.info("stats")
+        return {
+            "backend": "redis",
+            "keys": self._client.dbsize(),
+            "hits": info.get("keyspace_hits"),
+            "misses": info.get("keyspace_misses"),
+            "expirations": info.get("expired_keys"),
+            "evictions": info.get("evicted_keys"),
+        }
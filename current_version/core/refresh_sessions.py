@@ -0,0 +1,71 @@
+# core/refresh_sessions.py
+import hashlib
+import json
+import time
+
+
+def token_id(token: str) -> str:
+    """Короткий идентификатор токена вместо самого JWT"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:32]
+
+
+class RefreshSessionIndex:
+    """
+    Индекс refresh-сессий пользователя: по ключу sessions:{user_id}:{token_id} на токен.
+    Каждая операция затрагивает один ключ, поэтому воркеры не затирают сессии друг друга;
+    ротация — атомарное удаление старого ключа, второй refresh тем же токеном не пройдёт.
+    Выход со всех устройств — удаление по префиксу
+    """
+
+    def __init__(self, store, ttl: int):
+        self.store = store
+        self.ttl = ttl
+
+    @staticmethod
+    def _prefix(user_id: int) -> str:
+        return f"sessions:{user_id}:"
+
+    def _key(self, user_id: int, token: str) -> str:
+        return f"{self._prefix(user_id)}{token_id(token)}"
+
+    def _migrate(self, user_id: int) -> None:
+        # Прежний формат — один JSON sessions:{user_id}; переносит его тот, кто первым удалил ключ
+        legacy_key = f"sessions:{user_id}"
+        raw = self.store.get(legacy_key)
+        if not raw or not self.store.delete_if_exists(legacy_key):
+            return
+        now = time.time()
+        for tid, expires_at in json.loads(raw).items():
+            if expires_at > now:
+                self.store.setex(f"{self._prefix(user_id)}{tid}", int(expires_at - now) + 1, "1")
+
+    def add(self, user_id: int, token: str) -> None:
+        """Зарегистрировать новый refresh-токен"""
+        self.store.setex(self._key(user_id, token), self.ttl, "1")
+
+    def is_valid(self, user_id: int, token: str) -> bool:
+        """Токен выдан этому пользователю и не отозван"""
+        self._migrate(user_id)
+        return self.store.exists(self._key(user_id, token))
+
+    def rotate(self, user_id: int, old_token: str, new_token: str) -> bool:
+        """Заменить старый токен новым; False, если старый уже недействителен или использован"""
+        self._migrate(user_id)
+        if not self.store.delete_if_exists(self._key(user_id, old_token)):
+            return False
+        self.add(user_id, new_token)
+        return True
+
+    def revoke(self, user_id: int, token: str) -> None:
+        """Отозвать один токен (выход с устройства)"""
+        self._migrate(user_id)
+        self.store.delete(self._key(user_id, token))
+
+    def revoke_all(self, user_id: int) -> None:
+        """Отозвать все сессии пользователя (бан, смена пароля, удаление)"""
+        self.store.delete(f"sessions:{user_id}")
+        self.store.delete_prefix(self._prefix(user_id))
+
+    def count(self, user_id: int) -> int:
+        self._migrate(user_id)
+        return sum(1 for _ in self.store.scan_iter(f"{self._prefix(user_id)}*"))
@@ -0,0 +1,143 @@
+# core/sqlite_store.py
+import asyncio
+import sqlite3
+import time
+from typing import Dict, Optional, Iterator, List
+
+from core.memory_store import _literal_prefix
+
+
+class SQLiteStore:
+    """
+    Хранилище ключей в файле SQLite (режим WAL).
+    Общее для всех воркеров gunicorn на одной машине, API как у MemoryStore
+    """
+
+    def __init__(self, path: str = "store.db", busy_timeout_ms: int = 5000):
+        self.path = path
+        # autocommit: каждая операция — отдельная короткая транзакция
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_kv_expires_at ON kv (expires_at)")
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    def setex(self, key: str, seconds: int, value: str) -> None:
+        """Сохранить значение с TTL"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + seconds)
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """Получить значение, если не истекло"""
+        row = self._conn.execute(
+            "SELECT value FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def delete(self, key: str) -> None:
+        """Удалить ключ"""
+        self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def delete_if_exists(self, key: str) -> bool:
+        """Удалить ключ; True, если он был и не истёк. Один DELETE — из двух воркеров удалит только один"""
+        row = self._conn.execute(
+            "DELETE FROM kv WHERE key = ? AND expires_at > ? RETURNING 1", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def exists(self, key: str) -> bool:
+        """Проверить существование ключа"""
+        row = self._conn.execute(
+            "SELECT 1 FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def scan_iter(self, match: str = "*") -> Iterator[str]:
+        """Поиск ключей по glob-паттерну; литеральный префикс сужает поиск по первичному ключу"""
+        prefix = _literal_prefix(match)
+        rows = self._conn.execute(
+            "SELECT key FROM kv WHERE key >= ? AND key < ? AND key GLOB ? AND expires_at > ? ORDER BY key",
+            (prefix, prefix + "\U0010ffff", match, time.time())
+        ).fetchall()
+        for (key,) in rows:
+            yield key
+
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """Получить несколько значений одним запросом"""
+        if not keys:
+            return []
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn.execute(
+            f"SELECT key, value FROM kv WHERE key IN ({placeholders}) AND expires_at > ?",
+            (*keys, time.time())
+        ).fetchall()
+        found = dict(rows)
+        return [found.get(key) for key in keys]
+
+    def setex_many(self, items: Dict[str, str], seconds: int) -> None:
+        """Сохранить несколько значений в одной транзакции"""
+        expires_at = time.time() + seconds
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key, value in items.items()]
+            )
+
+    def delete_many(self, keys: List[str]) -> None:
+        """Удалить несколько ключей в одной транзакции"""
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany("DELETE FROM kv WHERE key = ?", [(key,) for key in keys])
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Удалить все ключи с префиксом"""
+        cursor = self._conn.execute(
+            "DELETE FROM kv WHERE key >= ? AND key < ?", (prefix, prefix + "\U0010ffff")
+        )
+        return cursor.rowcount
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Удалить все истекшие ключи (по индексу expires_at)"""
+        now = time.time() if now is None else now
+        cursor = self._conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+        self.expirations += cursor.rowcount
+        return cursor.rowcount
+
+    async def run_sweeper(self, interval: float = 30.0) -> None:
+        """Фоновая задача: периодически удаляет истекшие ключи"""
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def close(self) -> None:
+        """Закрыть соединение"""
+        self._conn.close()
+
+    def stats(self) -> dict:
+        """Счётчики этого воркера и общее число ключей в файле"""
+        keys = self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "keys": keys,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,43 @@
+# core/store.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# memory — в процессе (для uvicorn --reload), sqlite — общий файл для всех воркеров, redis — внешний сервер
+STORE_BACKEND = os.getenv("STORE_BACKEND", "memory")
+STORE_SWEEP_INTERVAL = float(os.getenv("STORE_SWEEP_INTERVAL", "30"))
+
+
+def create_store(backend: str = STORE_BACKEND):
+    """Создаёт хранилище с API setex/get/delete/exists/scan_iter по имени бэкенда"""
+    if backend == "memory":
+        persist_path = os.getenv("STORE_PERSIST_PATH")
+        if persist_path:
+            # Лог + снимок, чтобы refresh-токены и приглашения пережили перезапуск
+            from core.persistent_store import PersistentMemoryStore
+            return PersistentMemoryStore(
+                path=persist_path,
+                max_keys=int(os.getenv("MEMORY_STORE_MAX_KEYS", "100000")),
+                max_bytes=int(os.getenv("MEMORY_STORE_MAX_BYTES", str(64 * 1024 * 1024))),
+                compact_min_ops=int(os.getenv("STORE_COMPACT_MIN_OPS", "10000")),
+            )
+        from core.memory_store import memory_store
+        return memory_store
+    if backend == "sqlite":
+        from core.sqlite_store import SQLiteStore
+        return SQLiteStore(
+            path=os.getenv("STORE_SQLITE_PATH", "store.db"),
+            busy_timeout_ms=int(os.getenv("STORE_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        )
+    if backend == "redis":
+        from core.redis_store import RedisStore
+        return RedisStore(
+            url=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "20")),
+        )
+    raise ValueError(f"Unknown STORE_BACKEND: {backend}")
+
+
+# Создаём глобальный экземпляр
+store = create_store()
@@ -1,13 +1,147 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, JSON, text
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, ForeignKey, JSON, text
+from sqlalchemy import Insert, Update, Delete
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from dotenv import load_dotenv
+import os
 
-SQL_DB_URL = 'sqlite:///./my_database.db'
+load_dotenv()
 
-engine = create_engine(SQL_DB_URL)
+# Тот же DATABASE_URL, что читает tables_update.py
+SQL_DB_URL = os.getenv("DATABASE_URL", 'sqlite:///./my_database.db')
+ASYNC_SQL_DB_URL = SQL_DB_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
 
-session_local = sessionmaker( autoflush=False, autocommit=False, bind=engine)
+# Профиль SQLite: применяется к каждому новому соединению
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),   # отрицательное значение — в КиБ
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "foreign_keys": "ON",
+}
+# Писатель один на процесс; остальные ждут соединение не дольше SQLITE_WRITER_TIMEOUT секунд
+SQLITE_WRITER_TIMEOUT = float(os.getenv("SQLITE_WRITER_TIMEOUT", "10"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "5"))
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=None) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in (pragmas or SQLITE_PRAGMAS).items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def create_sqlite_writer(url: str = SQL_DB_URL, pragmas=None, **engine_kw):
+    """
+    Движок-писатель: транзакции начинаются с BEGIN IMMEDIATE, поэтому воркеры gunicorn
+    ждут блокировку (busy_timeout), а не падают с "database is locked".
+    engine_kw — настройки пула (по умолчанию одно соединение на процесс)
+    """
+    engine_kw = engine_kw or {"pool_size": 1, "max_overflow": 0, "pool_timeout": SQLITE_WRITER_TIMEOUT}
+    writer = create_engine(url, **engine_kw)
+    if not url.startswith("sqlite"):
+        return writer
+
+    @event.listens_for(writer, "connect")
+    def _writer_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+        # Транзакциями управляем сами (см. _writer_begin)
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer, "begin")
+    def _writer_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return writer
+
+
+def create_sqlite_engines(url: str = SQL_DB_URL, pragmas=None):
+    """Возвращает (writer, reader) для одной базы SQLite; writer — одно соединение на процесс"""
+    writer = create_sqlite_writer(url, pragmas)
+    reader = create_engine(url, pool_size=SQLITE_READ_POOL_SIZE)
+    if not url.startswith("sqlite"):
+        return writer, reader
+
+    @event.listens_for(reader, "connect")
+    def _reader_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    return writer, reader
+
+
+engine, read_engine = create_sqlite_engines()
+
+
+class RoutingSession(Session):
+    """
+    Чтения идут через пул читателей, flush и DML — через единственного писателя.
+    После первой записи сессия до конца транзакции закреплена за писателем:
+    читатель не видит её незакоммиченных строк
+    """
+
+    _on_writer = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kw):
+        # Явно переданный bind_arguments={"bind": ...} — без маршрутизации
+        if bind is not None:
+            return bind
+        if (
+            self._on_writer
+            or self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+            or isinstance(clause, TextClause) and clause.text.lstrip().upper().startswith(WRITE_STATEMENTS)
+        ):
+            self._on_writer = True
+            return engine
+        return read_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    # Коммит, откат или закрытие внешней транзакции — следующие чтения снова через читателей
+    if transaction.parent is None:
+        session._on_writer = False
+
+
+session_local = sessionmaker(class_=RoutingSession, autoflush=False, autocommit=False)
+
+# Асинхронный движок: запросы не блокируют event loop остальных запросов воркера
+async_engine = create_async_engine(ASYNC_SQL_DB_URL, poolclass=AsyncAdaptedQueuePool, pool_size=SQLITE_READ_POOL_SIZE)
+
+if ASYNC_SQL_DB_URL.startswith("sqlite"):
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _async_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+
+async_session_local = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 Base = declarative_base()
 
+def ensure_columns(bind, table: str, columns: dict) -> None:
+    """
+    Добавляет колонки, которых нет в существующей таблице (create_all их не добавляет).
+    columns: {имя: определение}, например {"version": "INTEGER NOT NULL DEFAULT 0"}
+    """
+    with bind.begin() as conn:
+        existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+def get_db():
+    db = session_local()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with async_session_local() as db:
+        yield db
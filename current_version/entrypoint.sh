@@ -3,5 +3,11 @@
 # Запускаем миграции базы данных, если они есть (опционально)
 # alembic upgrade head
 
+# Воркеры gunicorn — отдельные процессы, поэтому коды подтверждения, приглашения
+# и refresh-токены храним в общем хранилище (sqlite или redis), а не в памяти процесса
+export STORE_BACKEND=${STORE_BACKEND:-sqlite}
+# События для WebSocket/SSE расходятся между воркерами через общий журнал (core/broker.py)
+export BROKER_BACKEND=${BROKER_BACKEND:-sqlite}
+
 # Запускаем сервер
 gunicorn main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
\ No newline at end of file
@@ -0,0 +1,74 @@
+# expand.py
+"""
+Встраивание связанных пользователей в ответ (?expand=participants.user,suggestions.author).
+Все id, упомянутые на странице, собираются и читаются одним запросом IN,
+вместо отдельного /users/{id} клиента на каждого участника и автора
+"""
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import User
+from schemas import UserBrief
+
+MAX_BATCH_USERS = 200
+
+# путь в ?expand= -> (список в документе, поле с id пользователя, куда положить карточку)
+PROJECT_EXPANSIONS = {
+    "participants.user": ("participants", "user_id", "user"),
+    "join_requests.user": ("join_requests", "user_id", "user"),
+    "suggestions.author": ("suggestions", "author_id", "author"),
+}
+# Комментариев в ответе проекта нет — авторов встраивает их страница
+PROJECT_EXPAND_HELP = ("Встроить карточки пользователей, через запятую: " + ", ".join(PROJECT_EXPANSIONS)
+                       + ". Авторы комментариев: /projects/{id}/comments?expand=author")
+# Для краткого представления: другие списки в ProjectSummary не входят
+SUMMARY_EXPANSIONS = {"participants.user": PROJECT_EXPANSIONS["participants.user"]}
+# Страница комментариев: документ — сам комментарий
+COMMENT_EXPANSIONS = {"author": (None, "authorId", "author")}
+
+
+def parse_expand(expand: Optional[str], allowed: dict) -> Set[str]:
+    """Пути из ?expand= через запятую; 400 для неизвестного пути"""
+    paths = {path.strip() for path in (expand or "").split(",") if path.strip()}
+    unknown = paths - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported expand: {', '.join(sorted(unknown))}")
+    return paths
+
+
+async def user_cards(db: AsyncSession, ids: Iterable[int]) -> Dict[int, dict]:
+    """Карточки UserBrief по id одним запросом; несуществующие id пропускаются"""
+    ids = {i for i in ids if isinstance(i, int)}
+    if not ids:
+        return {}
+    rows = await db.execute(
+        select(User.id, User.nickname, User.fullname, User.avatar, User.is_teacher).where(User.id.in_(ids))
+    )
+    return {row.id: UserBrief.model_validate(row).model_dump() for row in rows}
+
+
+def _items(document: dict, collection: Optional[str]) -> List[dict]:
+    if collection is None:
+        return [document]
+    return [item for item in document.get(collection) or [] if isinstance(item, dict)]
+
+
+async def expand_users(db: AsyncSession, documents: List[dict], paths: Set[str], expansions: dict) -> None:
+    """Дописывает карточки пользователей в документы (словари ответа) по путям из paths"""
+    if not paths or not documents:
+        return
+    targets = [expansions[path] for path in sorted(paths)]
+    ids = {
+        item.get(key)
+        for document in documents
+        for collection, key, _ in targets
+        for item in _items(document, collection)
+    }
+    cards = await user_cards(db, ids)
+    for document in documents:
+        for collection, key, field in targets:
+            for item in _items(document, collection):
+                item[field] = cards.get(item.get(key))
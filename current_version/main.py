@@ -1,14 +1,16 @@
-from fastapi import FastAPI, HTTPException, Query, Depends, File, UploadFile, Request, Body
+from fastapi import FastAPI, HTTPException, Query, Depends, File, UploadFile, Request, Response, Body, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, text, and_
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, text, and_, select, func, update
+from typing import Optional, List, Dict, Any, Union
+from datetime import datetime, timedelta, date
 from jose import JWTError, jwt
 import uvicorn
 import os
+import asyncio
 import io
 import uuid
 import random
@@ -16,21 +18,23 @@ import string
 from dotenv import load_dotenv
 import json
 from pathlib import Path
+from pydantic import ValidationError
 from auth import get_current_admin
 
 load_dotenv()
-from sqlalchemy.orm.attributes import flag_modified
-from models import Base, User, Project
-from database import engine, session_local
+from models import Base, User, Project, ProjectParticipant, ProjectComment, ProjectTask, comment_rows, ensure_task_id, participant_rows
+from database import engine, session_local, get_db, async_engine, get_async_db, async_session_local, ensure_columns
 from schemas import (
     StudentCreate, StudentResponse, StudentUpdate,
     TeacherCreate, TeacherResponse, TeacherUpdate, TeacherInfo,
-    UserResponse, LoginRequest,
-    ProjectRole, Participant, ProjectCreate, ProjectResponse, ProjectUpdate, Comment,
+    UserResponse, UserBrief, LoginRequest, ChangeFeed,
+    BulkIds, BulkAction, BulkResult, ReadUpTo, ReadResult, UnreadSummary,
+    ProjectRole, Participant, ProjectCreate, ProjectResponse, ProjectUpdate, ProjectSummary, Comment, CommentPage, Page,
     EmailVerificationCodeRequest, EmailVerificationRequest,
     PasswordResetRequest, PasswordResetConfirm,
     TokenResponse,
-    Suggestion, SuggestionCreate, SuggestionStatus,
+    Suggestion, SuggestionCreate, SuggestionStatus, JoinRequest,
+    TaskCreate, TaskUpdate, TaskResponse,
     InvitationCreate, InvitationInfo
 )
 
@@ -43,6 +47,8 @@ from auth import (
     create_access_token,
     create_refresh_token,
     get_current_user,
+    invalidate_principal,
+    revoke_token,
     SECRET_KEY,
     ALGORITHM,
     ACCESS_TOKEN_EXPIRE_MINUTES,
@@ -52,10 +58,32 @@ from auth import (
 
 from fastapi.security import OAuth2PasswordRequestFormStrict
 from email_utils import generate_verification_code, send_verification_email, send_password_reset_email
-from core.memory_store import memory_store as redis_client
+from core.store import store as redis_client, STORE_SWEEP_INTERVAL
+from core.broker import broker
+from core.password_hasher import password_hasher
+from core.refresh_sessions import RefreshSessionIndex
+from participants_backfill import backfill_project_participants
+from comments_backfill import backfill_project_comments
+from tasks_backfill import backfill_project_tasks
+from core.conditional import make_etag, not_modified, require_version
+from core.json_patch import (
+    JSON_PATCH_TYPE, MERGE_PATCH_TYPE, PatchError, apply_json_patch, apply_merge_patch, json_patch_paths
+)
+from core.pagination import encode_cursor, decode_cursor, PageParams, parse_sort, keyset_query, next_cursor
+from project_mutations import append_item, append_items, update_item, update_items
+from project_summary import summary_fields, summary_query, summarize
+from project_search import attach_snippets, ensure_search_index, search_query
+from user_search import AUTOCOMPLETE_LIMIT, autocomplete_users, ensure_user_search_index, user_match_filter
+from change_log import CHANGE_LOG_COMPACT_INTERVAL, ensure_change_log, read_changes, run_compactor
+from read_cursors import advance_cursor, ensure_read_cursors, is_read_by, thread_cursor, unread_threads
+from expand import (
+    COMMENT_EXPANSIONS, MAX_BATCH_USERS, PROJECT_EXPAND_HELP, PROJECT_EXPANSIONS, SUMMARY_EXPANSIONS,
+    expand_users, parse_expand, user_cards
+)
 
 app = FastAPI(title="School Platform API", description="API для управления учениками, учителями и проектами")
 ADMIN_INIT_PASSWORD = os.getenv("ADMIN_INIT_PASSWORD", "SuperMegaSilvaAdmin")
+refresh_sessions = RefreshSessionIndex(redis_client, REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60)
 
 # Настройка CORS
 origins = [
@@ -88,13 +116,55 @@ AVATAR_DIR = "avatars"
 
 # Создаем таблицы
 Base.metadata.create_all(bind=engine)
-
-def get_db():
-    db = session_local()
-    try:
-        yield db
-    finally:
-        db.close()
+ensure_columns(engine, "projects", {"version": "INTEGER NOT NULL DEFAULT 0"})
+ensure_columns(engine, "users", {"version": "INTEGER NOT NULL DEFAULT 0"})
+# Переносим участников из JSON в project_participants (только если таблица пуста)
+backfill_project_participants()
+# Переносим встроенные в JSON комментарии в project_comments
+backfill_project_comments()
+# Затем задачи из JSON в project_tasks (комментарии уже ссылаются на их id)
+backfill_project_tasks()
+# Полнотекстовый индекс проектов (FTS5); при первом запуске заполняется целиком
+ensure_search_index()
+ensure_user_search_index()
+# Журнал изменений для GET /changes; строки пишут триггеры в транзакции изменения
+ensure_change_log()
+# Курсоры прочтения и счётчики непрочитанных по участникам; ведутся триггерами
+ensure_read_cursors()
+
+@app.on_event("startup")
+async def start_store_sweeper():
+    app.state.store_sweeper = asyncio.create_task(redis_client.run_sweeper(STORE_SWEEP_INTERVAL))
+
+@app.on_event("startup")
+async def start_event_broker():
+    await broker.start()
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    await broker.stop()
+
+@app.on_event("startup")
+async def start_change_log_compactor():
+    app.state.change_log_compactor = asyncio.create_task(run_compactor(CHANGE_LOG_COMPACT_INTERVAL))
+
+@app.on_event("shutdown")
+async def stop_change_log_compactor():
+    compactor = getattr(app.state, "change_log_compactor", None)
+    if compactor:
+        compactor.cancel()
+
+@app.on_event("shutdown")
+async def stop_store_sweeper():
+    sweeper = getattr(app.state, "store_sweeper", None)
+    if sweeper:
+        sweeper.cancel()
+    redis_client.close()
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+def shutdown_password_hasher():
+    password_hasher.shutdown()
 
 def is_curator(user: User) -> bool:
     """Проверяет, является ли пользователь куратором (глобальная роль)."""
@@ -104,21 +174,21 @@ def is_curator(user: User) -> bool:
 @app.post("/token", response_model=TokenResponse, tags=["Auth"])
 async def token_login(
     form_data: OAuth2PasswordRequestFormStrict = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(
+    user = (await db.execute(select(User).where(
         (User.nickname == form_data.username.strip()) |
         (User.email == form_data.username.strip())
-    ).first()
+    ))).scalars().first()
     if not user:
         raise HTTPException(status_code=402, detail="Пользователь с таким логином не найден")
-    if not verify_password(form_data.password.strip(), user.password):
+    if not await verify_password(form_data.password.strip(), user.password):
         raise HTTPException(status_code=402, detail="Неверный пароль")
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Пользователь забанен")
     access_token = create_access_token({"sub": str(user.id), "is_teacher": user.is_teacher})
     refresh_token = create_refresh_token({"sub": str(user.id), "is_teacher": user.is_teacher})
-    redis_client.setex(f"refresh:{user.id}:{refresh_token}", REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60, "valid")
+    refresh_sessions.add(user.id, refresh_token)
     return TokenResponse(access_token=access_token, refresh_token=refresh_token, token_type="bearer")
 
 # ==================== ADMIN ENDPOINTS ====================
@@ -139,7 +209,7 @@ async def admin_create_user(
     existing_email = db.query(User).filter(User.email == email.strip()).first()
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already exists")
-    hashed = get_password_hash(password.strip())
+    hashed = await get_password_hash(password.strip())
     new_user = User(
         nickname=username.strip(),
         fullname=fullname,
@@ -167,72 +237,68 @@ async def admin_delete_comment_permanently(
     if not (current_user.is_admin or is_curator(current_user)):
         raise HTTPException(status_code=403, detail="Only admin or curator can permanently delete comments")
 
-    # Ищем комментарий во всех проектах (можно оптимизировать, но для простоты)
-    projects = db.query(Project).all()
-    found = False
-    for project in projects:
-        if project.comments:
-            for i, c in enumerate(project.comments):
-                if c.get("id") == comment_id and c.get("hidden") == True:
-                    # Удаляем комментарий из списка
-                    project.comments.pop(i)
-                    flag_modified(project, "comments")
-                    db.commit()
-                    found = True
-                    break
-        if found:
-            break
-        if project.tasks:
-            for task in project.tasks:
-                if task.get("comments"):
-                    for j, c in enumerate(task["comments"]):
-                        if c.get("id") == comment_id and c.get("hidden") == True:
-                            task["comments"].pop(j)
-                            flag_modified(project, "tasks")
-                            db.commit()
-                            found = True
-                            break
-                    if found:
-                        break
-            if found:
-                break
-    if not found:
+    comment = db.get(ProjectComment, comment_id)
+    if not comment or not comment.hidden:
         raise HTTPException(status_code=404, detail="Hidden comment not found")
+    project_id, task_id = comment.project_id, comment.task_id
+    db.delete(comment)
+    db.commit()
+    publish_project(project_id, "comment.deleted", task_id=task_id, comment_id=comment_id)
     return {"message": "Comment permanently deleted"}
-@app.get("/admin/users", response_model=List[UserResponse], tags=["Admin"])
+@app.get("/admin/metrics/password-hasher", tags=["Admin"])
+async def admin_password_hasher_metrics(admin: User = Depends(get_current_admin)):
+    """Метрики пула хеширования паролей (очередь, время bcrypt) для подбора числа процессов."""
+    return password_hasher.stats()
+
+@app.get("/admin/metrics/store", tags=["Admin"])
+async def admin_store_metrics(admin: User = Depends(get_current_admin)):
+    """Счётчики хранилища ключей: размер, попадания, промахи, истечения, вытеснения."""
+    return redis_client.stats()
+
+@app.get("/admin/users", response_model=Page[UserResponse], tags=["Admin"])
 async def admin_get_all_users(
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(get_current_admin)
 ):
-    return db.query(User).all()
+    return await list_page(db, select(User), USER_SORTS, page)
 
 @app.get("/admin/users/{user_id}", response_model=UserResponse, tags=["Admin"])
 async def admin_get_user(
     user_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(404, "User not found")
-    return user
+    return etag_response(request, response, "user", user) or user
 
 @app.put("/admin/users/{user_id}", response_model=UserResponse, tags=["Admin"])
 async def admin_update_user(
     user_id: int,
     user_update: dict,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(404, "User not found")
+    require_version(db, request, User, "user", user.id, user.version)
     allowed_fields = {"fullname", "email", "is_active", "is_verified", "is_admin", "is_teacher", "teacher_info"}
     for field, value in user_update.items():
         if field in allowed_fields:
             setattr(user, field, value)
     db.commit()
+    if user_update.get("is_active") is False:
+        refresh_sessions.revoke_all(user_id)
+    invalidate_principal(user_id)
     db.refresh(user)
+    etag_response(request, response, "user", user)
     return user
 
 @app.delete("/admin/users/{user_id}", tags=["Admin"])
@@ -248,12 +314,12 @@ async def admin_delete_user(
         filepath = os.path.join(AVATAR_DIR, user.avatar)
         if os.path.exists(filepath):
             os.remove(filepath)
-    all_projects = db.query(Project).all()
-    for p in all_projects:
-        if p.participants:
-            p.participants = [part for part in p.participants if part.get("user_id") != user_id]
+    for p in projects_of_user(db, user_id):
+        p.participants = [part for part in p.participants if part.get("user_id") != user_id]
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
+    refresh_sessions.revoke_all(user_id)
     return {"message": f"User {user_id} deleted"}
 
 @app.post("/admin/users/delete-all", tags=["Admin"])
@@ -263,48 +329,61 @@ async def admin_delete_all_users(
 ):
     users = db.query(User).all()
     for user in users:
+        refresh_sessions.revoke_all(user.id)
         if user.avatar:
             filepath = os.path.join(AVATAR_DIR, user.avatar)
             if os.path.exists(filepath):
                 os.remove(filepath)
     db.query(User).delete()
     db.commit()
+    invalidate_principal()
     return {"message": "All users deleted"}
 
-@app.get("/admin/projects", response_model=List[ProjectResponse], tags=["Admin"])
+@app.get("/admin/projects", response_model=Page[Union[ProjectResponse, ProjectSummary]], tags=["Admin"])
 async def admin_get_all_projects(
-    db: Session = Depends(get_db),
+    view: Optional[str] = Query(None, description="full (по умолчанию) или summary"),
+    fields: Optional[str] = Query(None, description="Поля краткого представления через запятую"),
+    expand: Optional[str] = Query(None, description=PROJECT_EXPAND_HELP),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(get_current_admin)
 ):
-    return db.query(Project).all()
+    return await project_list(db, select(Project), page, view, fields, expand=expand)
 
 @app.get("/admin/projects/{project_id}", response_model=ProjectResponse, tags=["Admin"])
 async def admin_get_project(
     project_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(404, "Project not found")
-    return project
+    return etag_response(request, response, "project", project) or project
 
 @app.put("/admin/projects/{project_id}", response_model=ProjectResponse, tags=["Admin"])
 async def admin_update_project(
     project_id: int,
     project_update: ProjectUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(404, "Project not found")
+    require_version(db, request, Project, "project", project.id, project.version)
     update_data = project_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if hasattr(project, field):
             setattr(project, field, value)
     db.commit()
     db.refresh(project)
+    publish_project(project.id, "project.updated", version=project.version)
+    etag_response(request, response, "project", project)
     return project
 
 @app.delete("/admin/projects/{project_id}", tags=["Admin"])
@@ -318,6 +397,7 @@ async def admin_delete_project(
         raise HTTPException(404, "Project not found")
     db.delete(project)
     db.commit()
+    publish_project(project_id, "project.deleted")
     return {"message": f"Project {project_id} deleted"}
 
 @app.post("/admin/projects/delete-all", tags=["Admin"])
@@ -325,16 +405,20 @@ async def admin_delete_all_projects(
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
+    db.query(ProjectParticipant).delete()
+    db.query(ProjectComment).delete()
+    db.query(ProjectTask).delete()
     db.query(Project).delete()
     db.commit()
     return {"message": "All projects deleted"}
 
-@app.get("/admin/teachers", response_model=List[UserResponse], tags=["Admin"])
+@app.get("/admin/teachers", response_model=Page[UserResponse], tags=["Admin"])
 async def admin_get_teachers(
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(get_current_admin)
 ):
-    return db.query(User).filter(User.is_teacher == True).all()
+    return await list_page(db, select(User).where(User.is_teacher == True), USER_SORTS, page)
 
 @app.put("/admin/teachers/{user_id}/curator", tags=["Admin"])
 async def admin_set_curator(
@@ -350,17 +434,211 @@ async def admin_set_curator(
         user.teacher_info = {}
     user.teacher_info["curator"] = is_curator
     db.commit()
+    invalidate_principal(user_id)
     return {"message": f"Curator status for user {user_id} set to {is_curator}"}
 
 # ==================== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ДЛЯ ПРОЕКТОВ ====================
-def is_project_participant(project: Project, user_id: int) -> bool:
-    return any(p.get("user_id") == user_id for p in (project.participants or []))
+def is_project_participant(db: Session, project_id: int, user_id: int) -> bool:
+    return get_participant_role(db, project_id, user_id) is not None
+
+def get_participant_role(db: Session, project_id: int, user_id: int) -> Optional[str]:
+    """Роль пользователя в проекте по индексу project_participants"""
+    return db.query(ProjectParticipant.role).filter(
+        ProjectParticipant.project_id == project_id,
+        ProjectParticipant.user_id == user_id
+    ).scalar()
+
+def projects_of_user(db: Session, user_id: int) -> List[Project]:
+    """Проекты, в которых участвует пользователь (по индексу, без просмотра всех проектов)"""
+    return db.query(Project).join(
+        ProjectParticipant, ProjectParticipant.project_id == Project.id
+    ).filter(ProjectParticipant.user_id == user_id).all()
+
+def project_exists(db: Session, project_id: int) -> bool:
+    # Только id: JSON-колонки и задачи не загружаем
+    return db.query(Project.id).filter(Project.id == project_id).scalar() is not None
+
+def find_json_item(db: Session, project_id: int, column, item_id: str) -> Optional[dict]:
+    """Элемент JSON-массива проекта по id (только чтение одной колонки)"""
+    items = db.query(column).filter(Project.id == project_id).scalar()
+    return next((item for item in (items or []) if item.get("id") == item_id), None)
+
+def add_participant(db: Session, project_id: int, participant: dict) -> bool:
+    """Дописать участника одной командой UPDATE; False, если он уже в проекте"""
+    if append_item(db, project_id, "participants", participant, unless={"user_id": participant["user_id"]}) is None:
+        return False
+    # Атомарное изменение идёт мимо ORM, поэтому индекс участников обновляем сами
+    db.execute(ProjectParticipant.__table__.insert().prefix_with("OR IGNORE"),
+               participant_rows(project_id, [participant]))
+    return True
+
+def add_participants(db: Session, project_id: int, participants: List[dict]) -> Optional[int]:
+    """Дописать нескольких участников одним UPDATE; уже состоящие пропускаются. Новая версия или None"""
+    version, added = append_items(db, project_id, "participants", participants, unique="user_id")
+    if added:
+        db.execute(ProjectParticipant.__table__.insert().prefix_with("OR IGNORE"),
+                   participant_rows(project_id, added))
+    return version
+
+def find_task(project: Project, task_index: int) -> ProjectTask:
+    """Задача по позиции — для старых маршрутов с task_index"""
+    if task_index < 0 or task_index >= len(project.task_rows):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return project.task_rows[task_index]
+
+def task_to_dict(task: ProjectTask) -> dict:
+    return {**task.to_dict(), "project_id": task.project_id, "position": task.position}
+
+def check_task_editor(db: Session, project_id: int, user: User) -> None:
+    """Задачи меняют те же, кто может обновлять проект"""
+    if not (user.is_admin or is_curator(user)):
+        role = get_participant_role(db, project_id, user.id)
+        if role not in [ProjectRole.CUSTOMER.value, ProjectRole.EXECUTOR.value]:
+            raise HTTPException(status_code=403, detail="Only customer, executor, curator or admin can edit tasks")
+
+def renumber_tasks(project: Project) -> None:
+    for position, task in enumerate(project.task_rows):
+        if task.position != position:
+            task.position = position
+
+def comment_to_dict(comment: ProjectComment) -> dict:
+    return {
+        "id": comment.id,
+        "authorId": comment.author_id,
+        "content": comment.content,
+        "createdAt": comment.created_at,
+        "isRead": comment.is_read,
+        "hidden": comment.hidden,
+    }
+
+def publish_project(project_id: int, event_type: str, **data) -> None:
+    """Событие подписчикам проекта (/events, /ws); вызывать после db.commit()"""
+    broker.publish(f"project:{project_id}", {"type": event_type, "project_id": project_id, **data})
+
+def publish_user(user_id: int, event_type: str, **data) -> None:
+    """Событие лично пользователю: его приняли в проект, ответили на запрос и т.п."""
+    broker.publish(f"user:{user_id}", {"type": event_type, **data})
+
+def find_comment(db: Session, project_id: int, task_id: Optional[str], comment_id: str) -> ProjectComment:
+    """Комментарий по первичному ключу; 404, если он из другого проекта или задачи"""
+    comment = db.get(ProjectComment, comment_id)
+    if not comment or comment.project_id != project_id or comment.task_id != task_id:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return comment
+
+def add_comment_row(db: Session, project_id: int, task_id: Optional[str], comment: Comment) -> ProjectComment:
+    if db.get(ProjectComment, comment.id):
+        raise HTTPException(status_code=409, detail="Comment with this id already exists")
+    row = ProjectComment(**comment_rows(project_id, task_id, [comment.model_dump(mode='json')])[0])
+    db.add(row)
+    return row
 
-def get_participant_role(project: Project, user_id: int) -> Optional[str]:
-    for p in (project.participants or []):
-        if p.get("user_id") == user_id:
-            return p.get("role")
-    return None
+def replace_task_comments(db: Session, project: Project, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Готовит новый список задач к записи: сохраняет id задач, переносит присланные
+    комментарии в project_comments и удаляет комментарии исчезнувших задач
+    """
+    old_tasks = project.tasks or []
+    for i, task in enumerate(tasks):
+        if not task.get("id") and i < len(old_tasks):
+            task["id"] = old_tasks[i].get("id")
+        task_id = ensure_task_id(task)
+        rows = comment_rows(project.id, task_id, task.pop("comments", None))
+        if rows:
+            # Клиент может прислать задачу вместе с уже сохранёнными комментариями
+            db.execute(ProjectComment.__table__.insert().prefix_with("OR IGNORE"), rows)
+    task_ids = [t["id"] for t in tasks]
+    db.query(ProjectComment).filter(
+        ProjectComment.project_id == project.id,
+        ProjectComment.task_id.isnot(None),
+        ProjectComment.task_id.notin_(task_ids)
+    ).delete(synchronize_session=False)
+    return tasks
+
+async def comment_page(db: AsyncSession, project_id: int, task_id: Optional[str], user: User,
+                       limit: int, after: Optional[str], expand: Optional[str] = None):
+    """
+    Страница комментариев, новые сверху; ключ (created_at, id) идёт по индексу ix_project_comments_thread.
+    expand=author — карточки авторов страницы одним запросом
+    """
+    paths = parse_expand(expand, COMMENT_EXPANSIONS)
+    filters = [ProjectComment.project_id == project_id, ProjectComment.task_id == task_id]
+    # Скрытые комментарии видят только админ и куратор
+    if not (user.is_admin or is_curator(user)):
+        filters.append(ProjectComment.hidden == False)
+    query = select(ProjectComment).where(*filters)
+    cursor = decode_cursor(after, 2)
+    if cursor:
+        created_at, comment_id = cursor
+        query = query.where(or_(
+            ProjectComment.created_at < created_at,
+            and_(ProjectComment.created_at == created_at, ProjectComment.id < comment_id)
+        ))
+    rows = (await db.execute(
+        query.order_by(ProjectComment.created_at.desc(), ProjectComment.id.desc()).limit(limit + 1)
+    )).scalars().all()
+    page = {"items": [comment_to_dict(c) for c in rows[:limit]], "next_cursor": None, "unread": None}
+    if len(rows) > limit:
+        page["next_cursor"] = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id)
+    # У участника прочитанность своя (курсор), у остальных — общий флаг is_read
+    reads = await thread_cursor(db, user.id, project_id, task_id)
+    if reads:
+        for item in page["items"]:
+            item["isRead"] = is_read_by(reads, user.id, item["authorId"], item["createdAt"], item["id"])
+    if cursor is None:
+        page["unread"] = reads.unread if reads else await db.scalar(
+            select(func.count()).select_from(ProjectComment).where(*filters, ProjectComment.is_read == False)
+        )
+    if paths:
+        await expand_users(db, page["items"], paths, COMMENT_EXPANSIONS)
+        # Поле author не входит в CommentPage — отдаём готовый словарь
+        return JSONResponse(page)
+    return page
+
+def etag_response(request: Request, response: Response, kind: str, obj):
+    """Проставить ETag записи; вернуть 304, если у клиента уже эта версия"""
+    etag = make_etag(kind, obj.id, obj.version)
+    response.headers["ETag"] = etag
+    return not_modified(request, etag)
+
+# Ключи сортировки списков: последним всегда id, чтобы порядок был однозначным.
+# title, nickname и fullname проиндексированы, а индекс SQLite уже содержит rowid (= id)
+PROJECT_SORTS = {"id": (Project.id,), "title": (Project.title, Project.id)}
+USER_SORTS = {"id": (User.id,), "nickname": (User.nickname, User.id), "fullname": (User.fullname, User.id)}
+
+async def list_page(db: AsyncSession, query, sorts: dict, page: PageParams, default_sort: str = "id") -> dict:
+    """Страница списка с курсором по ключу сортировки; total считается только по запросу"""
+    name, descending = parse_sort(page.sort, sorts, default_sort)
+    columns = sorts[name]
+    rows = (await db.execute(keyset_query(query, columns, name, descending, page.after, page.limit))).scalars().all()
+    result = {"items": rows[:page.limit], "next_cursor": next_cursor(rows, columns, name, page.limit), "total": None}
+    if page.with_total:
+        result["total"] = await db.scalar(select(func.count()).select_from(query.subquery()))
+    return result
+
+async def project_list(db: AsyncSession, query, page: PageParams, view: Optional[str], fields: Optional[str],
+                       sorts: dict = PROJECT_SORTS, default_sort: str = "id", search: Optional[str] = None,
+                       expand: Optional[str] = None):
+    """
+    Страница проектов: полная (ProjectResponse) или краткая (ProjectSummary) по ?view= / ?fields=.
+    search — строка поиска, по которой к проектам страницы добавляются фрагменты с совпадениями;
+    expand — пути для встраивания карточек пользователей (participants.user, ...)
+    """
+    selected = summary_fields(view, fields)
+    paths = parse_expand(expand, PROJECT_EXPANSIONS if selected is None else SUMMARY_EXPANSIONS)
+    result = await list_page(db, query if selected is None else summary_query(query), sorts, page, default_sort)
+    if search:
+        await attach_snippets(db, search, result["items"])
+    if selected is None:
+        if not paths:
+            return result
+        result["items"] = [ProjectResponse.model_validate(p).model_dump(mode="json") for p in result["items"]]
+        await expand_users(db, result["items"], paths, PROJECT_EXPANSIONS)
+        return JSONResponse(result)
+    result["items"] = await summarize(db, result["items"], selected)
+    await expand_users(db, result["items"], paths, SUMMARY_EXPANSIONS)
+    # Словари уже собраны по ProjectSummary и содержат только запрошенные поля
+    return JSONResponse(result)
 
 # ==================== TEACHER EMAIL VERIFICATION ====================
 ACCEPTED_EMAILS_FILE = Path("accepted_emails.json")
@@ -400,7 +678,7 @@ async def create_student(student: StudentCreate, db: Session = Depends(get_db)):
     existing_email = db.query(User).filter(User.email == student.email.strip()).first()
     if existing_email:
         raise HTTPException(status_code=400, detail="Пользователь с таким email уже существует")
-    hashed_password = get_password_hash(student.password.strip())
+    hashed_password = await get_password_hash(student.password.strip())
     db_user = User(
         nickname=student.nickname.strip(),
         fullname=student.fullname,
@@ -419,25 +697,31 @@ async def create_student(student: StudentCreate, db: Session = Depends(get_db)):
     db.refresh(db_user)
     return db_user
 
-@app.get("/students/", response_model=List[StudentResponse], tags=["Students"])
-async def get_students(q: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    query = db.query(User).filter(User.is_teacher == False)
+@app.get("/students/", response_model=Page[StudentResponse], tags=["Students"])
+async def get_students(
+    q: Optional[str] = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = select(User).where(User.is_teacher == False)
     if q:
-        query = query.filter(or_(User.nickname.ilike(f"%{q}%"), User.fullname.ilike(f"%{q}%"), User.email.ilike(f"%{q}%")))
-    return query.all()
+        query = query.where(user_match_filter(q))
+    return await list_page(db, query, USER_SORTS, page)
 
 @app.get("/students/{student_id}", response_model=StudentResponse, tags=["Students"])
-async def get_student(student_id: int, db: Session = Depends(get_db)):
+async def get_student(student_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     student = db.query(User).filter(User.id == student_id, User.is_teacher == False).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    return student
+    return etag_response(request, response, "user", student) or student
 
 @app.put("/students/{student_id}", response_model=StudentResponse, tags=["Students"])
-async def update_student(student_id: int, student_update: StudentUpdate, db: Session = Depends(get_db)):
+async def update_student(student_id: int, student_update: StudentUpdate, request: Request, response: Response,
+                         db: Session = Depends(get_db)):
     student = db.query(User).filter(User.id == student_id, User.is_teacher == False).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
+    require_version(db, request, User, "user", student.id, student.version)
     if student_update.fullname is not None:
         student.fullname = student_update.fullname
     if student_update.email is not None:
@@ -450,7 +734,9 @@ async def update_student(student_id: int, student_update: StudentUpdate, db: Ses
     if student_update.speciality is not None:
         student.speciality = student_update.speciality
     db.commit()
+    invalidate_principal(student_id)
     db.refresh(student)
+    etag_response(request, response, "user", student)
     return student
 
 @app.delete("/students/{student_id}", tags=["Students"])
@@ -465,12 +751,12 @@ async def delete_student(student_id: int, db: Session = Depends(get_db)):
                 os.remove(filepath)
             except OSError as e:
                 print(f"Ошибка при удалении файла {filepath}: {e}")
-    all_projects = db.query(Project).all()
-    for project in all_projects:
-        if project.participants:
-            project.participants = [p for p in project.participants if p.get("user_id") != student_id]
+    for project in projects_of_user(db, student_id):
+        project.participants = [p for p in project.participants if p.get("user_id") != student_id]
     db.delete(student)
     db.commit()
+    invalidate_principal(student_id)
+    refresh_sessions.revoke_all(student_id)
     return {"message": f"Student {student_id} deleted successfully"}
 
 # ==================== TEACHERS ====================
@@ -494,7 +780,7 @@ async def create_teacher(teacher: TeacherCreate, db: Session = Depends(get_db)):
     existing_email = db.query(User).filter(User.email == teacher.email.strip()).first()
     if existing_email:
         raise HTTPException(status_code=400, detail="Пользователь с таким email уже существует")
-    hashed_password = get_password_hash(teacher.password.strip())
+    hashed_password = await get_password_hash(teacher.password.strip())
     teacher_info_dict = teacher.teacher_info.model_dump() if teacher.teacher_info else {}
     db_user = User(
         nickname=teacher.nickname.strip(),
@@ -536,7 +822,7 @@ async def verify_and_create_teacher(request: dict, db: Session = Depends(get_db)
     ).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Nickname or email already registered")
-    hashed_password = get_password_hash(teacher_data.get('password'))
+    hashed_password = await get_password_hash(teacher_data.get('password'))
     db_user = User(
         nickname=teacher_data.get('nickname').strip(),
         fullname=teacher_data.get('fullname'),
@@ -555,31 +841,31 @@ async def verify_and_create_teacher(request: dict, db: Session = Depends(get_db)
     db.refresh(db_user)
     return db_user
 
-@app.get("/teachers/", response_model=List[TeacherResponse], tags=["Teachers"])
-async def get_teachers(q: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    query = db.query(User).filter(User.is_teacher == True)
+@app.get("/teachers/", response_model=Page[TeacherResponse], tags=["Teachers"])
+async def get_teachers(
+    q: Optional[str] = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = select(User).where(User.is_teacher == True)
     if q:
-        text_condition = or_(
-            User.nickname.ilike(f"%{q}%"),
-            User.fullname.ilike(f"%{q}%"),
-            User.email.ilike(f"%{q}%"),
-            User.speciality.ilike(f"%{q}%")
-        )
-        query = query.filter(text_condition)
-    return query.all()
+        query = query.where(user_match_filter(q))
+    return await list_page(db, query, USER_SORTS, page)
 
 @app.get("/teachers/{teacher_id}", response_model=TeacherResponse, tags=["Teachers"])
-async def get_teacher(teacher_id: int, db: Session = Depends(get_db)):
+async def get_teacher(teacher_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     teacher = db.query(User).filter(User.id == teacher_id, User.is_teacher == True).first()
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
-    return teacher
+    return etag_response(request, response, "user", teacher) or teacher
 
 @app.put("/teachers/{teacher_id}", response_model=TeacherResponse, tags=["Teachers"])
-async def update_teacher(teacher_id: int, teacher_update: TeacherUpdate, db: Session = Depends(get_db)):
+async def update_teacher(teacher_id: int, teacher_update: TeacherUpdate, request: Request, response: Response,
+                         db: Session = Depends(get_db)):
     teacher = db.query(User).filter(User.id == teacher_id, User.is_teacher == True).first()
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
+    require_version(db, request, User, "user", teacher.id, teacher.version)
     if teacher_update.fullname is not None:
         teacher.fullname = teacher_update.fullname
     if teacher_update.email is not None:
@@ -592,7 +878,9 @@ async def update_teacher(teacher_id: int, teacher_update: TeacherUpdate, db: Ses
     if teacher_update.teacher_info is not None:
         teacher.teacher_info = teacher_update.teacher_info.model_dump()
     db.commit()
+    invalidate_principal(teacher_id)
     db.refresh(teacher)
+    etag_response(request, response, "user", teacher)
     return teacher
 
 @app.delete("/teachers/{teacher_id}", tags=["Teachers"])
@@ -604,57 +892,95 @@ async def delete_teacher(teacher_id: int, db: Session = Depends(get_db)):
         filepath = os.path.join(AVATAR_DIR, teacher.avatar)
         if os.path.exists(filepath):
             os.remove(filepath)
-    all_projects = db.query(Project).all()
-    for project in all_projects:
-        if project.participants:
-            project.participants = [p for p in project.participants if p.get("user_id") != teacher_id]
+    for project in projects_of_user(db, teacher_id):
+        project.participants = [p for p in project.participants if p.get("user_id") != teacher_id]
     db.delete(teacher)
     db.commit()
+    invalidate_principal(teacher_id)
+    refresh_sessions.revoke_all(teacher_id)
     return {"message": f"Teacher {teacher_id} deleted successfully"}
 
 # ==================== COMMON USER ENDPOINTS ====================
+@app.get("/users/autocomplete", response_model=List[UserBrief], tags=["Common"])
+async def autocomplete(
+    q: str = Query(..., min_length=1, description="Начало ника, имени, фамилии или email"),
+    limit: int = Query(AUTOCOMPLETE_LIMIT, ge=1, le=50),
+    user_type: Optional[str] = Query(None, description="Фильтр по типу: student или teacher"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Подсказки при наборе: лучшие совпадения по индексу пользователей, без пагинации"""
+    return await autocomplete_users(db, q, limit, user_type)
+
+@app.get("/users/batch", response_model=List[UserBrief], tags=["Common"])
+async def get_users_batch(
+    ids: str = Query(..., description="ID пользователей через запятую"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Карточки пользователей (ник, имя, аватар) одним запросом, в порядке ids; несуществующие пропускаются"""
+    try:
+        user_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if len(user_ids) > MAX_BATCH_USERS:
+        raise HTTPException(status_code=400, detail=f"Too many ids, max {MAX_BATCH_USERS}")
+    cards = await user_cards(db, user_ids)
+    return [cards[i] for i in user_ids if i in cards]
+
 @app.get("/users/me", response_model=UserResponse, tags=["Common"])
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
-    return current_user
+async def get_current_user_info(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Пользователь из кэша аутентификации может отставать — версию берём из базы
+    version = await db.scalar(select(User.version).where(User.id == current_user.id))
+    if version != current_user.version:
+        current_user = await db.get(User, current_user.id)
+    return etag_response(request, response, "user", current_user) or current_user
+
+@app.get("/users/me/unread", response_model=UnreadSummary, tags=["Common"])
+async def get_my_unread(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Непрочитанные комментарии по веткам проектов пользователя — из готовых счётчиков"""
+    threads = await unread_threads(db, current_user.id)
+    return {"total": sum(t["unread"] for t in threads), "threads": threads}
 
 @app.get("/users/{user_id}", response_model=UserResponse, tags=["Common"])
-async def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user_by_id(user_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return etag_response(request, response, "user", user) or user
 
-@app.get("/users/", response_model=List[UserResponse], tags=["Common"])
+@app.get("/users/", response_model=Page[UserResponse], tags=["Common"])
 async def search_all_users(
     q: Optional[str] = Query(None, description="Поисковый запрос"),
     user_type: Optional[str] = Query(None, description="Фильтр по типу: student или teacher"),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(User)
+    query = select(User)
     if user_type == "student":
-        query = query.filter(User.is_teacher == False)
+        query = query.where(User.is_teacher == False)
     elif user_type == "teacher":
-        query = query.filter(User.is_teacher == True)
+        query = query.where(User.is_teacher == True)
     if q:
-        try:
-            user_id = int(q)
-            id_filter = (User.id == user_id)
-        except ValueError:
-            id_filter = None
-        text_filters = [
-            User.nickname.ilike(f"%{q}%"),
-            User.fullname.ilike(f"%{q}%"),
-            User.email.ilike(f"%{q}%")
-        ]
-        if id_filter is not None:
-            query = query.filter(or_(id_filter, *text_filters))
-        else:
-            query = query.filter(or_(*text_filters))
-    return query.all()
+        # Число — ещё и поиск по id. Только ASCII-цифры (isdigit() пропускает «²», на нём int() падает)
+        # и не длиннее 18 знаков, чтобы id влез в INTEGER SQLite
+        match = user_match_filter(q)
+        digits = q.strip()
+        is_id = digits.isascii() and digits.isdigit() and len(digits) <= 18
+        query = query.where(or_(User.id == int(digits), match) if is_id else match)
+    return await list_page(db, query, USER_SORTS, page)
 
 @app.post("/users/{user_id}/avatar", response_model=UserResponse, tags=["Common"])
 async def upload_avatar(
     user_id: int,
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -664,6 +990,7 @@ async def upload_avatar(
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    require_version(db, request, User, "user", user.id, user.version)
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     contents = await file.read()
@@ -689,7 +1016,9 @@ async def upload_avatar(
                 os.remove(old_path)
         user.avatar = filename
         db.commit()
+        invalidate_principal(user_id)
         db.refresh(user)
+        etag_response(request, response, "user", user)
         return user
     except Exception as e:
         if 'filepath' in locals() and os.path.exists(filepath):
@@ -698,104 +1027,87 @@ async def upload_avatar(
 
 # ==================== PROJECTS ====================
 
-@app.post("/projects/{project_id}/join-requests", response_model=ProjectResponse, tags=["Projects"])
+@app.post("/projects/{project_id}/join-requests", response_model=JoinRequest, tags=["Projects"])
 async def create_join_request(
     project_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
+    if not project_exists(db, project_id):
         raise HTTPException(status_code=404, detail="Project not found")
-    if any(p.get("user_id") == current_user.id for p in (project.participants or [])):
+    if is_project_participant(db, project_id, current_user.id):
         raise HTTPException(status_code=400, detail="You are already a participant")
     if current_user.is_teacher:
         raise HTTPException(status_code=403, detail="Only students can request to join as executor")
-    if project.join_requests:
-        existing = next((r for r in project.join_requests if r.get("user_id") == current_user.id and r.get("status") == "pending"), None)
-        if existing:
-            raise HTTPException(status_code=400, detail="You already have a pending request")
     new_request = {
         "id": str(uuid.uuid4()),
         "user_id": current_user.id,
         "created_at": datetime.utcnow().isoformat(),
         "status": "pending"
     }
-    if project.join_requests is None:
-        project.join_requests = []
-    project.join_requests.append(new_request)
-    flag_modified(project, "join_requests")
+    # Проверка на уже открытый запрос выполняется в том же UPDATE — параллельные запросы не создадут дубль
+    if append_item(db, project_id, "join_requests", new_request,
+                   unless={"user_id": current_user.id, "status": "pending"}) is None:
+        raise HTTPException(status_code=400, detail="You already have a pending request")
     db.commit()
-    db.refresh(project)
-    return project
+    publish_project(project_id, "join_request.created", request=new_request)
+    return new_request
 
-@app.put("/projects/{project_id}/join-requests/{request_id}/accept", response_model=ProjectResponse, tags=["Projects"])
+@app.put("/projects/{project_id}/join-requests/{request_id}/accept", response_model=JoinRequest, tags=["Projects"])
 async def accept_join_request(
     project_id: int,
     request_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
+    if not project_exists(db, project_id):
         raise HTTPException(status_code=404, detail="Project not found")
     # Админ и куратор могут принимать запросы
     if not (current_user.is_admin or is_curator(current_user)):
-        role = get_participant_role(project, current_user.id)
+        role = get_participant_role(db, project_id, current_user.id)
         if role not in [ProjectRole.CUSTOMER.value, ProjectRole.CURATOR.value]:
             raise HTTPException(status_code=403, detail="Only customer, curator or admin can accept join requests")
-    request = None
-    for r in (project.join_requests or []):
-        if r.get("id") == request_id:
-            request = r
-            break
-    if not request:
+    if not find_json_item(db, project_id, Project.join_requests, request_id):
         raise HTTPException(status_code=404, detail="Join request not found")
-    if request.get("status") != "pending":
+    result = update_item(db, project_id, "join_requests", "id", request_id,
+                         {"status": "accepted"}, expect={"status": "pending"})
+    if result is None:
         raise HTTPException(status_code=400, detail="Request already processed")
-    request["status"] = "accepted"
-    new_participant = {
+    _, request = result
+    add_participant(db, project_id, {
         "user_id": request["user_id"],
         "role": ProjectRole.EXECUTOR.value,
         "joined_at": datetime.utcnow().isoformat()
-    }
-    if project.participants is None:
-        project.participants = []
-    project.participants.append(new_participant)
-    flag_modified(project, "join_requests")
-    flag_modified(project, "participants")
+    })
     db.commit()
-    db.refresh(project)
-    return project
+    publish_project(project_id, "join_request.accepted", request=request)
+    publish_user(request["user_id"], "join_request.accepted", project_id=project_id, request=request)
+    return request
 
-@app.put("/projects/{project_id}/join-requests/{request_id}/reject", response_model=ProjectResponse, tags=["Projects"])
+@app.put("/projects/{project_id}/join-requests/{request_id}/reject", response_model=JoinRequest, tags=["Projects"])
 async def reject_join_request(
     project_id: int,
     request_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
+    if not project_exists(db, project_id):
         raise HTTPException(status_code=404, detail="Project not found")
     if not (current_user.is_admin or is_curator(current_user)):
-        role = get_participant_role(project, current_user.id)
+        role = get_participant_role(db, project_id, current_user.id)
         if role not in [ProjectRole.CUSTOMER.value, ProjectRole.CURATOR.value]:
             raise HTTPException(status_code=403, detail="Only customer, curator or admin can reject join requests")
-    request = None
-    for r in (project.join_requests or []):
-        if r.get("id") == request_id:
-            request = r
-            break
-    if not request:
+    if not find_json_item(db, project_id, Project.join_requests, request_id):
         raise HTTPException(status_code=404, detail="Join request not found")
-    if request.get("status") != "pending":
+    result = update_item(db, project_id, "join_requests", "id", request_id,
+                         {"status": "rejected"}, expect={"status": "pending"})
+    if result is None:
         raise HTTPException(status_code=400, detail="Request already processed")
-    request["status"] = "rejected"
-    flag_modified(project, "join_requests")
     db.commit()
-    db.refresh(project)
-    return project
+    request = result[1]
+    publish_project(project_id, "join_request.rejected", request=request)
+    publish_user(request["user_id"], "join_request.rejected", project_id=project_id, request=request)
+    return request
 
 @app.post("/projects/", response_model=ProjectResponse, tags=["Projects"])
 async def create_project(
@@ -828,41 +1140,69 @@ async def create_project(
         body=project.body,
         underbody=project.underbody,
         participants=[p.model_dump(mode='json') for p in project.participants],
-        tasks=project.tasks,
+        tasks=[],
         links=project.links,
-        comments=[c.model_dump(mode='json') for c in project.comments] if project.comments else []
+        comments=[]
     )
     db.add(db_project)
+    db.flush()
+    # Комментарии хранятся в project_comments, а не в документе проекта
+    db_project.tasks = replace_task_comments(db, db_project, project.tasks)
+    for comment in project.comments:
+        add_comment_row(db, db_project.id, None, comment)
     db.commit()
     db.refresh(db_project)
+    for user_id in set(user_ids):
+        publish_user(user_id, "project.joined", project_id=db_project.id)
     return db_project
 
-@app.get("/projects/", response_model=List[ProjectResponse], tags=["Projects"])
+@app.get("/projects/", response_model=Page[Union[ProjectResponse, ProjectSummary]], tags=["Projects"])
 async def get_projects(
     participant_id: Optional[int] = Query(None, description="ID участника для фильтрации проектов"),
-    db: Session = Depends(get_db)
+    view: Optional[str] = Query(None, description="full (по умолчанию) или summary"),
+    fields: Optional[str] = Query(None, description="Поля краткого представления через запятую"),
+    expand: Optional[str] = Query(None, description=PROJECT_EXPAND_HELP),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    query = select(Project)
     if participant_id is not None:
-        all_projects = db.query(Project).all()
-        projects = [
-            p for p in all_projects
-            if any(part.get("user_id") == participant_id for part in (p.participants or []))
-        ]
-    else:
-        projects = db.query(Project).all()
-    return projects
+        query = query.join(
+            ProjectParticipant, ProjectParticipant.project_id == Project.id
+        ).where(ProjectParticipant.user_id == participant_id)
+    return await project_list(db, query, page, view, fields, expand=expand)
 
 @app.get("/projects/{project_id}", response_model=ProjectResponse, tags=["Projects"])
-async def get_project_by_id(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
+async def get_project_by_id(project_id: int, request: Request, response: Response,
+                            expand: Optional[str] = Query(None, description=PROJECT_EXPAND_HELP),
+                            db: AsyncSession = Depends(get_async_db)):
+    paths = parse_expand(expand, PROJECT_EXPANSIONS)
+    # Сначала только версия: если она у клиента уже есть, проект не читаем и не сериализуем
+    version = await db.scalar(select(Project.version).where(Project.id == project_id))
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    # Карточки пользователей меняются независимо от версии проекта, поэтому с expand 304 не отдаём;
+    # ETag тот же — он годится для If-Match при изменении
+    cached = not paths and not_modified(request, make_etag("project", project_id, version))
+    if cached:
+        return cached
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    etag = make_etag("project", project.id, project.version)
+    if paths:
+        document = ProjectResponse.model_validate(project).model_dump(mode="json")
+        await expand_users(db, [document], paths, PROJECT_EXPANSIONS)
+        return JSONResponse(document, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return project
 
 @app.put("/projects/{project_id}", response_model=ProjectResponse, tags=["Projects"])
 async def update_project(
     project_id: int,
     project_update: ProjectUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -871,9 +1211,19 @@ async def update_project(
         raise HTTPException(status_code=404, detail="Project not found")
     # Админ и куратор могут обновлять любой проект
     if not (current_user.is_admin or is_curator(current_user)):
-        participant = next((p for p in project.participants if p.get("user_id") == current_user.id), None)
-        if not participant or participant.get("role") not in [ProjectRole.CUSTOMER.value, ProjectRole.EXECUTOR.value]:
+        role = get_participant_role(db, project.id, current_user.id)
+        if role not in [ProjectRole.CUSTOMER.value, ProjectRole.EXECUTOR.value]:
             raise HTTPException(status_code=403, detail="Only customer, executor, curator or admin can update the project")
+    require_version(db, request, Project, "project", project.id, project.version)
+    apply_project_update(db, project, project_update)
+    db.commit()
+    db.refresh(project)
+    publish_project(project.id, "project.updated", version=project.version)
+    etag_response(request, response, "project", project)
+    return project
+
+def apply_project_update(db: Session, project: Project, project_update: ProjectUpdate) -> None:
+    """Записать в проект заданные (не None) поля ProjectUpdate; общий код PUT и PATCH"""
     if project_update.title is not None:
         project.title = project_update.title
     if project_update.body is not None:
@@ -881,22 +1231,127 @@ async def update_project(
     if project_update.underbody is not None:
         project.underbody = project_update.underbody
     if project_update.tasks is not None:
-        project.tasks = project_update.tasks
+        project.tasks = replace_task_comments(db, project, project_update.tasks)
     if project_update.links is not None:
         project.links = project_update.links
-    if project_update.comments is not None:
-        project.comments = [c.model_dump(mode='json') for c in project_update.comments]
     if project_update.participants is not None:
         new_ids = [p.user_id for p in project_update.participants]
         users = db.query(User).filter(User.id.in_(new_ids)).all()
         if len(users) != len(new_ids):
             raise HTTPException(404, "One or more users not found")
         project.participants = [p.model_dump(mode='json') for p in project_update.participants]
+
+# Поля, которые можно менять через PATCH, и роли участника, которым это разрешено
+# (админ и куратор могут менять всё). Комментарии, предложения и запросы — через свои эндпоинты
+PROJECT_EDITORS = {ProjectRole.CUSTOMER.value, ProjectRole.EXECUTOR.value}
+PATCH_FIELD_ROLES = {
+    "title": PROJECT_EDITORS,
+    "body": PROJECT_EDITORS,
+    "underbody": PROJECT_EDITORS,
+    "links": PROJECT_EDITORS,
+    "tasks": PROJECT_EDITORS,
+    "participants": {ProjectRole.CUSTOMER.value},
+}
+
+def project_document(project: Project, fields) -> Dict[str, Any]:
+    """Текущие значения полей проекта в виде JSON-документа для патча"""
+    values = {
+        "title": lambda: project.title,
+        "body": lambda: project.body,
+        "underbody": lambda: project.underbody or "",
+        "links": lambda: dict(project.links or {}),
+        "tasks": lambda: project.tasks,
+        "participants": lambda: [dict(p) for p in (project.participants or [])],
+    }
+    return {field: values[field]() for field in fields}
+
+@app.patch("/projects/{project_id}", response_model=ProjectResponse, tags=["Projects"])
+async def patch_project(
+    project_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Частичное изменение проекта: application/json-patch+json (RFC 6902, массив операций)
+    или application/merge-patch+json (RFC 7396). Все операции применяются вместе или ни одна
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in (JSON_PATCH_TYPE, MERGE_PATCH_TYPE, "application/json"):
+        raise HTTPException(status_code=415, detail=f"Use {JSON_PATCH_TYPE} or {MERGE_PATCH_TYPE}")
+    try:
+        patch = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    try:
+        if content_type == JSON_PATCH_TYPE:
+            fields = {path[0] if path else "" for path in json_patch_paths(patch)}
+        elif isinstance(patch, dict):
+            fields = set(patch)
+        else:
+            raise PatchError("Merge patch must be a JSON object")
+    except PatchError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    forbidden = fields - set(PATCH_FIELD_ROLES)
+    if forbidden:
+        raise HTTPException(status_code=422, detail=f"Fields cannot be patched: {', '.join(sorted(forbidden)) or '/'}")
+
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not (current_user.is_admin or is_curator(current_user)):
+        role = get_participant_role(db, project.id, current_user.id)
+        denied = sorted(f for f in fields if role not in PATCH_FIELD_ROLES[f])
+        if denied:
+            raise HTTPException(status_code=403, detail=f"Your role cannot change: {', '.join(denied)}")
+    require_version(db, request, Project, "project", project.id, project.version)
+
+    document = project_document(project, fields)
+    try:
+        if content_type == JSON_PATCH_TYPE:
+            patched = apply_json_patch(document, patch)
+        else:
+            patched = apply_merge_patch(document, patch)
+    except PatchError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    changes = {field: patched.get(field) for field in fields if patched.get(field) != document[field]}
+    if "links" in changes and changes["links"] is None:
+        changes["links"] = {}
+    removed = sorted(field for field, value in changes.items() if value is None)
+    if removed:
+        raise HTTPException(status_code=422, detail=f"Fields cannot be removed: {', '.join(removed)}")
+    for task in changes.get("tasks") or []:
+        # Новым задачам id назначаем сразу, чтобы они не заняли id соседних задач
+        if isinstance(task, dict):
+            ensure_task_id(task)
+    try:
+        project_update = ProjectUpdate(**changes)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+    # Пишем только изменившиеся поля; задачи обновляются построчно
+    apply_project_update(db, project, project_update)
     db.commit()
     db.refresh(project)
+    publish_project(project.id, "project.updated", version=project.version)
+    etag_response(request, response, "project", project)
     return project
 
-@app.post("/projects/{project_id}/comments", response_model=ProjectResponse, tags=["Projects"])
+@app.get("/projects/{project_id}/comments", response_model=CommentPage, tags=["Projects"])
+async def list_project_comments(
+    project_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Курсор next_cursor предыдущей страницы"),
+    expand: Optional[str] = Query(None, description="author — встроить карточки авторов"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if not await db.scalar(select(Project.id).where(Project.id == project_id)):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return await comment_page(db, project_id, None, current_user, limit, after, expand)
+
+@app.post("/projects/{project_id}/comments", response_model=Comment, tags=["Projects"])
 async def add_comment(
     project_id: int,
     comment: Comment,
@@ -907,25 +1362,36 @@ async def add_comment(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     # Админ и куратор могут комментировать любой проект
-    if not (current_user.is_admin or is_curator(current_user) or any(p.get("user_id") == current_user.id for p in (project.participants or []))):
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, project.id, current_user.id)):
         raise HTTPException(status_code=403, detail="Only project participants, curator or admin can comment")
-    if project.comments is None:
-        project.comments = []
     comment.authorId = current_user.id
-    project.comments.append(comment.model_dump(mode='json'))
+    row = add_comment_row(db, project.id, None, comment)
     try:
         db.commit()
-        db.refresh(project)
-        return project
     except Exception as e:
         print("Ошибка при сохранении комментария:", e)
         raise HTTPException(status_code=500, detail="Internal server error")
-
-@app.get("/search", response_model=List[ProjectResponse], tags=["Projects"])
-async def search_projects(q: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    if not q:
-        return []
-    return db.query(Project).filter(Project.title.ilike(f"%{q}%")).all()
+    publish_project(project.id, "comment.added", task_id=None, comment=comment_to_dict(row))
+    return comment_to_dict(row)
+
+@app.get("/search", response_model=Page[Union[ProjectResponse, ProjectSummary]], tags=["Projects"])
+async def search_projects(
+    q: Optional[str] = Query(None),
+    view: Optional[str] = Query(None, description="full (по умолчанию) или summary"),
+    fields: Optional[str] = Query(None, description="Поля краткого представления через запятую"),
+    expand: Optional[str] = Query(None, description=PROJECT_EXPAND_HELP),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Полнотекстовый поиск по названию, описанию, задачам и комментариям.
+    По умолчанию sort=relevance (bm25, лучшие первыми); у каждого результата snippet с <mark>
+    """
+    query, rank = search_query(q or "")
+    if query is None:
+        return {"items": [], "next_cursor": None, "total": 0 if page.with_total else None}
+    sorts = {"relevance": (rank, Project.id), **PROJECT_SORTS}
+    return await project_list(db, query, page, view, fields, sorts, default_sort="relevance", search=q, expand=expand)
 
 @app.delete("/projects/{project_id}", tags=["Projects"])
 async def delete_project(
@@ -938,14 +1404,32 @@ async def delete_project(
         raise HTTPException(status_code=404, detail="Project not found")
     # Админ и куратор могут удалить любой проект
     if not (current_user.is_admin or is_curator(current_user)):
-        participant = next((p for p in project.participants if p.get("user_id") == current_user.id), None)
-        if not participant or participant.get("role") != ProjectRole.CUSTOMER.value:
+        role = get_participant_role(db, project.id, current_user.id)
+        if role != ProjectRole.CUSTOMER.value:
             raise HTTPException(status_code=403, detail="Only customer, curator or admin can delete the project")
     db.delete(project)
     db.commit()
+    publish_project(project_id, "project.deleted")
     return {"message": f"Project {project_id} deleted successfully"}
 
-@app.post("/projects/{project_id}/tasks/{task_index}/comments", response_model=ProjectResponse, tags=["Projects"])
+@app.get("/projects/{project_id}/tasks/{task_index}/comments", response_model=CommentPage, tags=["Projects"])
+async def list_task_comments(
+    project_id: int,
+    task_index: int,
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Курсор next_cursor предыдущей страницы"),
+    expand: Optional[str] = Query(None, description="author — встроить карточки авторов"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    task_id = await db.scalar(select(ProjectTask.id).where(
+        ProjectTask.project_id == project_id, ProjectTask.position == task_index
+    ))
+    if task_id is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return await comment_page(db, project_id, task_id, current_user, limit, after, expand)
+
+@app.post("/projects/{project_id}/tasks/{task_index}/comments", response_model=Comment, tags=["Projects"])
 async def add_task_comment(
     project_id: int,
     task_index: int,
@@ -956,38 +1440,162 @@ async def add_task_comment(
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if not (current_user.is_admin or is_curator(current_user) or any(p.get("user_id") == current_user.id for p in (project.participants or []))):
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, project.id, current_user.id)):
         raise HTTPException(status_code=403, detail="Only project participants, curator or admin can comment")
-    if not project.tasks or task_index < 0 or task_index >= len(project.tasks):
-        raise HTTPException(status_code=404, detail="Task not found")
-    task = project.tasks[task_index]
-    if task.get("comments") is None:
-        task["comments"] = []
+    task = find_task(project, task_index)
     comment.authorId = current_user.id
-    task["comments"].append(comment.model_dump(mode='json'))
-    flag_modified(project, "tasks")
+    row = add_comment_row(db, project.id, task.id, comment)
     try:
         db.commit()
-        db.refresh(project)
-        return project
     except Exception as e:
         print("Ошибка при сохранении комментария к задаче:", e)
         raise HTTPException(status_code=500, detail="Internal server error")
+    publish_project(project.id, "comment.added", task_id=task.id, comment=comment_to_dict(row))
+    return comment_to_dict(row)
+
+# ==================== TASKS ====================
+@app.get("/projects/{project_id}/tasks", response_model=List[TaskResponse], tags=["Tasks"])
+async def list_project_tasks(
+    project_id: int,
+    status: Optional[str] = Query(None, description="Только задачи с этим статусом"),
+    due_before: Optional[date] = Query(None, description="Срок окончания не позже даты (ГГГГ-ММ-ДД)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not await db.scalar(select(Project.id).where(Project.id == project_id)):
+        raise HTTPException(status_code=404, detail="Project not found")
+    query = select(ProjectTask).where(ProjectTask.project_id == project_id)
+    if status is not None:
+        query = query.where(ProjectTask.status == status)
+    if due_before is not None:
+        query = query.where(ProjectTask.deadline <= due_before)
+    tasks = (await db.execute(query.order_by(ProjectTask.position))).scalars().all()
+    return [task_to_dict(t) for t in tasks]
+
+@app.get("/projects/{project_id}/tasks/{task_index}", response_model=TaskResponse, tags=["Tasks"])
+async def get_task_by_index(project_id: int, task_index: int, db: AsyncSession = Depends(get_async_db)):
+    """Задача по позиции в проекте (для ссылок вида /project/{id}/task/{index})"""
+    task = await db.scalar(select(ProjectTask).where(
+        ProjectTask.project_id == project_id, ProjectTask.position == task_index
+    ))
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task_to_dict(task)
+
+@app.get("/tasks/{task_id}", response_model=TaskResponse, tags=["Tasks"])
+async def get_task(task_id: str, db: AsyncSession = Depends(get_async_db)):
+    task = await db.get(ProjectTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task_to_dict(task)
+
+@app.post("/projects/{project_id}/tasks", response_model=TaskResponse, tags=["Tasks"])
+async def create_task(
+    project_id: int,
+    task: TaskCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    check_task_editor(db, project.id, current_user)
+    row = ProjectTask(id=uuid.uuid4().hex, project_id=project.id)
+    row.apply(task.model_dump(exclude={"position"}), replace=True)
+    position = len(project.task_rows) if task.position is None else max(0, min(task.position, len(project.task_rows)))
+    project.task_rows.insert(position, row)
+    renumber_tasks(project)
+    db.commit()
+    publish_project(project.id, "task.created", task=task_to_dict(row))
+    return task_to_dict(row)
+
+@app.put("/tasks/{task_id}", response_model=TaskResponse, tags=["Tasks"])
+async def update_task(
+    task_id: str,
+    task_update: TaskUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Обновить одну задачу: записываются только переданные поля этой строки"""
+    task = db.get(ProjectTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    check_task_editor(db, task.project_id, current_user)
+    data = task_update.model_dump(exclude_unset=True)
+    position = data.pop("position", None)
+    task.apply(data)
+    if position is not None and position != task.position:
+        project = db.get(Project, task.project_id)
+        project.task_rows.remove(task)
+        project.task_rows.insert(max(0, min(position, len(project.task_rows))), task)
+        renumber_tasks(project)
+    db.commit()
+    publish_project(task.project_id, "task.updated", task=task_to_dict(task))
+    return task_to_dict(task)
+
+@app.delete("/tasks/{task_id}", tags=["Tasks"])
+async def delete_task(
+    task_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    task = db.get(ProjectTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    check_task_editor(db, task.project_id, current_user)
+    db.query(ProjectComment).filter(ProjectComment.task_id == task.id).delete(synchronize_session=False)
+    db.query(ProjectTask).filter(
+        ProjectTask.project_id == task.project_id, ProjectTask.position > task.position
+    ).update({ProjectTask.position: ProjectTask.position - 1}, synchronize_session=False)
+    db.delete(task)
+    db.commit()
+    publish_project(task.project_id, "task.deleted", task_id=task_id)
+    return {"message": f"Task {task_id} deleted"}
+
+@app.get("/tasks/{task_id}/comments", response_model=CommentPage, tags=["Tasks"])
+async def list_task_comments_by_id(
+    task_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Курсор next_cursor предыдущей страницы"),
+    expand: Optional[str] = Query(None, description="author — встроить карточки авторов"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    project_id = await db.scalar(select(ProjectTask.project_id).where(ProjectTask.id == task_id))
+    if project_id is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return await comment_page(db, project_id, task_id, current_user, limit, after, expand)
+
+@app.post("/tasks/{task_id}/comments", response_model=Comment, tags=["Tasks"])
+async def add_task_comment_by_id(
+    task_id: str,
+    comment: Comment,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    task = db.get(ProjectTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, task.project_id, current_user.id)):
+        raise HTTPException(status_code=403, detail="Only project participants, curator or admin can comment")
+    comment.authorId = current_user.id
+    row = add_comment_row(db, task.project_id, task.id, comment)
+    db.commit()
+    publish_project(task.project_id, "comment.added", task_id=task.id, comment=comment_to_dict(row))
+    return comment_to_dict(row)
 
 # ==================== SUGGESTIONS ====================
-@app.post("/projects/{project_id}/suggestions", response_model=ProjectResponse, tags=["Projects"])
+@app.post("/projects/{project_id}/suggestions", response_model=Suggestion, tags=["Projects"])
 async def create_suggestion(
     project_id: int,
     suggestion_data: SuggestionCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
+    if not project_exists(db, project_id):
         raise HTTPException(status_code=404, detail="Project not found")
     # Админ и куратор могут создавать предложения в любом проекте
     if not (current_user.is_admin or is_curator(current_user)):
-        role = get_participant_role(project, current_user.id)
+        role = get_participant_role(db, project_id, current_user.id)
         if not role or role not in [ProjectRole.EXPERT.value, ProjectRole.SUPERVISOR.value, ProjectRole.EXECUTOR.value]:
             raise HTTPException(status_code=403, detail="Only expert, supervisor, executor, curator or admin can create suggestions")
     if suggestion_data.target_type not in ["project", "task", "link"]:
@@ -1002,13 +1610,10 @@ async def create_suggestion(
         "created_at": datetime.utcnow().isoformat(),
         "comments": []
     }
-    if project.suggestions is None:
-        project.suggestions = []
-    project.suggestions.append(new_suggestion)
-    flag_modified(project, "suggestions")
+    append_item(db, project_id, "suggestions", new_suggestion)
     db.commit()
-    db.refresh(project)
-    return project
+    publish_project(project_id, "suggestion.created", suggestion=new_suggestion)
+    return new_suggestion
 
 @app.put("/projects/{project_id}/suggestions/{suggestion_id}/accept", response_model=ProjectResponse, tags=["Projects"])
 async def accept_suggestion(
@@ -1027,50 +1632,51 @@ async def accept_suggestion(
             break
     if not suggestion:
         raise HTTPException(status_code=404, detail="Suggestion not found")
+    role = get_participant_role(db, project.id, current_user.id)
     # Админ и куратор могут принимать любое предложение
     if not (current_user.is_admin or is_curator(current_user)):
-        role = get_participant_role(project, current_user.id)
         if not (suggestion.get("author_id") == current_user.id or role in [ProjectRole.CUSTOMER.value, ProjectRole.EXECUTOR.value]):
             raise HTTPException(status_code=403, detail="Only suggestion author, customer, executor, curator or admin can accept it")
-    suggestion["status"] = SuggestionStatus.ACCEPTED.value
-    flag_modified(project, "suggestions")
+    if update_item(db, project.id, "suggestions", "id", suggestion_id,
+                   {"status": SuggestionStatus.ACCEPTED.value}) is None:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
     if (role == ProjectRole.CUSTOMER.value or current_user.is_admin or is_curator(current_user)) and suggestion["target_type"] == "project":
         for key, value in suggestion["changes"].items():
-            if hasattr(project, key):
+            if hasattr(project, key) and key not in ("id", "version"):
                 setattr(project, key, value)
     db.commit()
     db.refresh(project)
+    publish_project(project.id, "suggestion.accepted", suggestion_id=suggestion_id, version=project.version)
+    publish_user(suggestion["author_id"], "suggestion.accepted", project_id=project.id, suggestion_id=suggestion_id)
     return project
 
-@app.put("/projects/{project_id}/suggestions/{suggestion_id}/reject", response_model=ProjectResponse, tags=["Projects"])
+@app.put("/projects/{project_id}/suggestions/{suggestion_id}/reject", response_model=Suggestion, tags=["Projects"])
 async def reject_suggestion(
     project_id: int,
     suggestion_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
+    if not project_exists(db, project_id):
         raise HTTPException(status_code=404, detail="Project not found")
-    suggestion = None
-    for s in (project.suggestions or []):
-        if s.get("id") == suggestion_id:
-            suggestion = s
-            break
+    suggestion = find_json_item(db, project_id, Project.suggestions, suggestion_id)
     if not suggestion:
         raise HTTPException(status_code=404, detail="Suggestion not found")
     if not (current_user.is_admin or is_curator(current_user)):
-        role = get_participant_role(project, current_user.id)
+        role = get_participant_role(db, project_id, current_user.id)
         if not (suggestion.get("author_id") == current_user.id or role in [ProjectRole.CUSTOMER.value, ProjectRole.EXECUTOR.value]):
             raise HTTPException(status_code=403, detail="Only suggestion author, customer, executor, curator or admin can reject it")
-    suggestion["status"] = SuggestionStatus.REJECTED.value
-    flag_modified(project, "suggestions")
+    result = update_item(db, project_id, "suggestions", "id", suggestion_id,
+                         {"status": SuggestionStatus.REJECTED.value})
+    if result is None:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
     db.commit()
-    db.refresh(project)
-    return project
+    publish_project(project_id, "suggestion.rejected", suggestion_id=suggestion_id)
+    publish_user(suggestion["author_id"], "suggestion.rejected", project_id=project_id, suggestion_id=suggestion_id)
+    return result[1]
 
 # ==================== HIDE COMMENTS ====================
-@app.post("/projects/{project_id}/comments/{comment_id}/hide", response_model=ProjectResponse, tags=["Projects"])
+@app.post("/projects/{project_id}/comments/{comment_id}/hide", response_model=Comment, tags=["Projects"])
 async def hide_comment(
     project_id: int,
     comment_id: str,
@@ -1082,17 +1688,14 @@ async def hide_comment(
         raise HTTPException(status_code=404, detail="Project not found")
     # Админ и куратор могут скрывать комментарии
     if not (current_user.is_admin or is_curator(current_user)):
-        role = get_participant_role(project, current_user.id)
+        role = get_participant_role(db, project.id, current_user.id)
         if role != ProjectRole.SUPERVISOR.value:
             raise HTTPException(status_code=403, detail="Only supervisor, curator or admin can hide comments")
-    comment = next((c for c in (project.comments or []) if c.get("id") == comment_id), None)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    comment["hidden"] = True
-    flag_modified(project, "comments")
+    comment = find_comment(db, project.id, None, comment_id)
+    comment.hidden = True
     db.commit()
-    db.refresh(project)
-    return project
+    publish_project(project.id, "comment.hidden", task_id=None, comment_id=comment.id)
+    return comment_to_dict(comment)
 
 # ==================== INVITATIONS ====================
 @app.post("/projects/{project_id}/invite", response_model=Dict[str, str], tags=["Projects"])
@@ -1107,7 +1710,7 @@ async def create_invitation(
         raise HTTPException(status_code=404, detail="Project not found")
     # Админ и куратор могут приглашать
     if not (current_user.is_admin or is_curator(current_user)):
-        role = get_participant_role(project, current_user.id)
+        role = get_participant_role(db, project.id, current_user.id)
         if role not in [ProjectRole.CUSTOMER.value, ProjectRole.SUPERVISOR.value]:
             raise HTTPException(status_code=403, detail="Only customer, supervisor, curator or admin can invite")
     token = str(uuid.uuid4())
@@ -1148,24 +1751,21 @@ async def accept_invitation(
     if not data_str:
         raise HTTPException(status_code=404, detail="Invitation not found or expired")
     data = json.loads(data_str)
-    project = db.query(Project).filter(Project.id == data["project_id"]).first()
-    if not project:
+    if not project_exists(db, data["project_id"]):
         raise HTTPException(status_code=404, detail="Project not found")
-    if any(p.get("user_id") == current_user.id for p in (project.participants or [])):
-        raise HTTPException(status_code=400, detail="User already in project")
-    new_participant = {
+    added = add_participant(db, data["project_id"], {
         "user_id": current_user.id,
         "role": data["role"],
         "joined_at": datetime.utcnow().isoformat(),
         "invited_by": data["invited_by"]
-    }
-    if project.participants is None:
-        project.participants = []
-    project.participants.append(new_participant)
+    })
+    if not added:
+        raise HTTPException(status_code=400, detail="User already in project")
     redis_client.delete(f"invite:{token}")
     db.commit()
-    db.refresh(project)
-    return project
+    publish_project(data["project_id"], "participant.added", user_id=current_user.id, role=data["role"])
+    publish_user(current_user.id, "project.joined", project_id=data["project_id"])
+    return db.get(Project, data["project_id"])
 
 # ==================== AUTH & VERIFICATION ====================
 @app.post("/auth/request-verification-code", tags=["Auth"])
@@ -1211,6 +1811,7 @@ async def verify_email(request: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     user.is_verified = True
     db.commit()
+    invalidate_principal(user.id)
     db.refresh(user)
     return {"message": "Email successfully verified", "user": user}
 
@@ -1234,7 +1835,7 @@ async def register_with_verification(request: dict, db: Session = Depends(get_db
     ).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Nickname or email already registered")
-    hashed_password = get_password_hash(user_data.get('password'))
+    hashed_password = await get_password_hash(user_data.get('password'))
     if is_teacher:
         teacher_info = user_data.get('teacher_info', {})
         db_user = User(
@@ -1270,20 +1871,20 @@ async def register_with_verification(request: dict, db: Session = Depends(get_db
     return db_user
 
 @app.post("/auth/login", response_model=TokenResponse, tags=["Auth"])
-async def auth_login(credentials: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(
+async def auth_login(credentials: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).where(
         (User.nickname == credentials.nickname.strip()) |
         (User.email == credentials.nickname.strip())
-    ).first()
+    ))).scalars().first()
     if not user:
         raise HTTPException(status_code=402, detail="Пользователь с таким логином не найден")
-    if not verify_password(credentials.password.strip(), user.password):
+    if not await verify_password(credentials.password.strip(), user.password):
         raise HTTPException(status_code=402, detail="Неверный пароль")
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Пользователь забанен")
     access_token = create_access_token({"sub": str(user.id), "is_teacher": user.is_teacher})
     refresh_token = create_refresh_token({"sub": str(user.id), "is_teacher": user.is_teacher})
-    redis_client.setex(f"refresh:{user.id}:{refresh_token}", REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60, "valid")
+    refresh_sessions.add(user.id, refresh_token)
     return TokenResponse(access_token=access_token, refresh_token=refresh_token)
 
 @app.post("/auth/refresh", response_model=TokenResponse, tags=["Auth"])
@@ -1294,15 +1895,17 @@ async def refresh_token(request: Request, db: Session = Depends(get_db)):
     try:
         payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = int(payload.get("sub"))
-        if not redis_client.get(f"refresh:{user_id}:{refresh_token}"):
-            raise HTTPException(status_code=402, detail="Invalid refresh token")
+        # Токены старого формата (refresh:{user_id}:{jwt}) принимаем один раз и переводим в индекс
+        legacy_key = f"refresh:{user_id}:{refresh_token}"
+        if redis_client.delete_if_exists(legacy_key):
+            refresh_sessions.add(user_id, refresh_token)
         user = db.query(User).filter(User.id == user_id).first()
         if not user or not user.is_active:
             raise HTTPException(status_code=402, detail="User not found or inactive")
         new_access_token = create_access_token({"sub": str(user.id), "is_teacher": user.is_teacher})
         new_refresh_token = create_refresh_token({"sub": str(user.id), "is_teacher": user.is_teacher})
-        redis_client.delete(f"refresh:{user_id}:{refresh_token}")
-        redis_client.setex(f"refresh:{user_id}:{new_refresh_token}", REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60, "valid")
+        if not refresh_sessions.rotate(user_id, refresh_token, new_refresh_token):
+            raise HTTPException(status_code=402, detail="Invalid refresh token")
         return TokenResponse(access_token=new_access_token, refresh_token=new_refresh_token)
     except JWTError:
         raise HTTPException(status_code=402, detail="Invalid refresh token")
@@ -1311,11 +1914,12 @@ async def refresh_token(request: Request, db: Session = Depends(get_db)):
 async def logout(request: Request, current_user: User = Depends(get_current_user)):
     refresh_token = request.headers.get("Authorization", "").replace("Bearer ", "")
     if refresh_token:
-        redis_client.delete(f"refresh:{current_user.id}:{refresh_token}")
+        refresh_sessions.revoke(current_user.id, refresh_token)
+        revoke_token(refresh_token)
     return {"message": "Logged out successfully"}
 
 # ==================== DELETE COMMENTS ====================
-@app.delete("/projects/{project_id}/comments/{comment_id}", response_model=ProjectResponse, tags=["Projects"])
+@app.delete("/projects/{project_id}/comments/{comment_id}", response_model=Comment, tags=["Projects"])
 async def delete_project_comment(
     project_id: int,
     comment_id: str,
@@ -1326,22 +1930,19 @@ async def delete_project_comment(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     # Админ и куратор могут удалять комментарии
-    if not (current_user.is_admin or is_curator(current_user) or any(p.get("user_id") == current_user.id for p in (project.participants or []))):
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, project.id, current_user.id)):
         raise HTTPException(status_code=403, detail="Only project participants, curator or admin can modify comments")
-    comment = next((c for c in (project.comments or []) if c.get("id") == comment_id), None)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    if not (current_user.is_admin or is_curator(current_user) or comment.get("authorId") == current_user.id):
-        role = get_participant_role(project, current_user.id)
+    comment = find_comment(db, project.id, None, comment_id)
+    if not (current_user.is_admin or is_curator(current_user) or comment.author_id == current_user.id):
+        role = get_participant_role(db, project.id, current_user.id)
         if role != ProjectRole.CUSTOMER.value:
             raise HTTPException(status_code=403, detail="Only comment author, customer, curator or admin can delete")
-    comment["hidden"] = True
-    flag_modified(project, "comments")
+    comment.hidden = True
     db.commit()
-    db.refresh(project)
-    return project
+    publish_project(project.id, "comment.hidden", task_id=comment.task_id, comment_id=comment.id)
+    return comment_to_dict(comment)
 
-@app.delete("/projects/{project_id}/tasks/{task_index}/comments/{comment_id}", response_model=ProjectResponse, tags=["Projects"])
+@app.delete("/projects/{project_id}/tasks/{task_index}/comments/{comment_id}", response_model=Comment, tags=["Projects"])
 async def delete_task_comment(
     project_id: int,
     task_index: int,
@@ -1352,28 +1953,21 @@ async def delete_task_comment(
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if not (current_user.is_admin or is_curator(current_user) or any(p.get("user_id") == current_user.id for p in (project.participants or []))):
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, project.id, current_user.id)):
         raise HTTPException(status_code=403, detail="Only project participants, curator or admin can modify comments")
-    if not project.tasks or task_index < 0 or task_index >= len(project.tasks):
-        raise HTTPException(status_code=404, detail="Task not found")
-    task = project.tasks[task_index]
-    if task.get("comments") is None:
-        raise HTTPException(status_code=404, detail="Comments not found")
-    comment = next((c for c in task["comments"] if c.get("id") == comment_id), None)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    if not (current_user.is_admin or is_curator(current_user) or comment.get("authorId") == current_user.id):
-        role = get_participant_role(project, current_user.id)
+    task = find_task(project, task_index)
+    comment = find_comment(db, project.id, task.id, comment_id)
+    if not (current_user.is_admin or is_curator(current_user) or comment.author_id == current_user.id):
+        role = get_participant_role(db, project.id, current_user.id)
         if role != ProjectRole.CUSTOMER.value:
             raise HTTPException(status_code=403, detail="Only comment author, customer, curator or admin can delete")
-    comment["hidden"] = True
-    flag_modified(project, "tasks")
+    comment.hidden = True
     db.commit()
-    db.refresh(project)
-    return project
+    publish_project(project.id, "comment.hidden", task_id=comment.task_id, comment_id=comment.id)
+    return comment_to_dict(comment)
 
 # ==================== MARK COMMENTS READ ====================
-@app.put("/projects/{project_id}/comments/{comment_id}/read", response_model=ProjectResponse, tags=["Projects"])
+@app.put("/projects/{project_id}/comments/{comment_id}/read", response_model=Comment, tags=["Projects"])
 async def mark_project_comment_read(
     project_id: int,
     comment_id: str,
@@ -1383,18 +1977,15 @@ async def mark_project_comment_read(
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if not (current_user.is_admin or is_curator(current_user) or any(p.get("user_id") == current_user.id for p in (project.participants or []))):
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, project.id, current_user.id)):
         raise HTTPException(status_code=403, detail="Only project participants, curator or admin can modify comments")
-    comment = next((c for c in (project.comments or []) if c.get("id") == comment_id), None)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    comment["isRead"] = True
-    flag_modified(project, "comments")
+    comment = find_comment(db, project.id, None, comment_id)
+    comment.is_read = True
+    advance_cursor(db, current_user.id, project.id, None, comment.created_at, comment.id)
     db.commit()
-    db.refresh(project)
-    return project
+    return comment_to_dict(comment)
 
-@app.put("/projects/{project_id}/tasks/{task_index}/comments/{comment_id}/read", response_model=ProjectResponse, tags=["Projects"])
+@app.put("/projects/{project_id}/tasks/{task_index}/comments/{comment_id}/read", response_model=Comment, tags=["Projects"])
 async def mark_task_comment_read(
     project_id: int,
     task_index: int,
@@ -1405,19 +1996,300 @@ async def mark_task_comment_read(
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if not (current_user.is_admin or is_curator(current_user) or any(p.get("user_id") == current_user.id for p in (project.participants or []))):
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, project.id, current_user.id)):
         raise HTTPException(status_code=403, detail="Only project participants, curator or admin can modify comments")
-    if not project.tasks or task_index < 0 or task_index >= len(project.tasks):
-        raise HTTPException(status_code=404, detail="Task not found")
-    task = project.tasks[task_index]
-    comment = next((c for c in (task.get("comments") or []) if c.get("id") == comment_id), None)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    comment["isRead"] = True
-    flag_modified(project, "tasks")
+    task = find_task(project, task_index)
+    comment = find_comment(db, project.id, task.id, comment_id)
+    comment.is_read = True
+    advance_cursor(db, current_user.id, project.id, task.id, comment.created_at, comment.id)
     db.commit()
-    db.refresh(project)
-    return project
+    return comment_to_dict(comment)
+
+def mark_thread_read(db: Session, project_id: int, task_id: Optional[str], user: User,
+                     up_to: Optional[str]) -> dict:
+    """
+    Отметить прочитанными комментарии ветки до up_to включительно (порядок — по created_at, id)
+    и сдвинуть туда курсор пользователя; без up_to — до последнего комментария ветки
+    """
+    filters = [ProjectComment.project_id == project_id, ProjectComment.task_id == task_id]
+    if up_to:
+        last = find_comment(db, project_id, task_id, up_to)
+    else:
+        last = db.query(ProjectComment).filter(*filters).order_by(
+            ProjectComment.created_at.desc(), ProjectComment.id.desc()
+        ).first()
+    if last is None:
+        return {"updated": 0, "unread": 0}
+    updated = db.execute(
+        update(ProjectComment).where(*filters, ProjectComment.is_read == False, or_(
+            ProjectComment.created_at < last.created_at,
+            and_(ProjectComment.created_at == last.created_at, ProjectComment.id <= last.id)
+        )).values(is_read=True)
+    ).rowcount
+    unread = advance_cursor(db, user.id, project_id, task_id, last.created_at, last.id)
+    db.commit()
+    if unread is None:
+        # Не участник: остаток по общему флагу, как unread в comment_page
+        if not (user.is_admin or is_curator(user)):
+            filters.append(ProjectComment.hidden == False)
+        unread = db.query(func.count()).select_from(ProjectComment).filter(
+            *filters, ProjectComment.is_read == False
+        ).scalar()
+    return {"updated": updated, "unread": unread}
+
+@app.put("/projects/{project_id}/comments/read", response_model=ReadResult, tags=["Projects"])
+async def mark_project_comments_read(
+    project_id: int,
+    body: ReadUpTo = Body(ReadUpTo()),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if not project_exists(db, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, project_id, current_user.id)):
+        raise HTTPException(status_code=403, detail="Only project participants, curator or admin can modify comments")
+    return mark_thread_read(db, project_id, None, current_user, body.up_to)
+
+@app.put("/projects/{project_id}/tasks/{task_index}/comments/read", response_model=ReadResult, tags=["Projects"])
+async def mark_task_comments_read(
+    project_id: int,
+    task_index: int,
+    body: ReadUpTo = Body(ReadUpTo()),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not (current_user.is_admin or is_curator(current_user) or is_project_participant(db, project.id, current_user.id)):
+        raise HTTPException(status_code=403, detail="Only project participants, curator or admin can modify comments")
+    task = find_task(project, task_index)
+    return mark_thread_read(db, project.id, task.id, current_user, body.up_to)
+
+# ==================== BULK MODERATION ====================
+# Пачка элементов одного проекта: права проверяются один раз, изменения — одной транзакцией,
+# события подписчикам — после commit, по одному на элемент, как у одиночных маршрутов
+
+def bulk_result(ids: List[str], updated: List[str], version: Optional[int]) -> dict:
+    done = set(updated)
+    return {"updated": updated, "skipped": [i for i in ids if i not in done], "version": version}
+
+@app.post("/projects/{project_id}/join-requests/bulk", response_model=BulkResult, tags=["Projects"])
+async def bulk_join_requests(
+    project_id: int,
+    body: BulkAction,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Принять или отклонить несколько запросов на вступление; уже обработанные пропускаются"""
+    if not project_exists(db, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not (current_user.is_admin or is_curator(current_user)):
+        role = get_participant_role(db, project_id, current_user.id)
+        if role not in [ProjectRole.CUSTOMER.value, ProjectRole.CURATOR.value]:
+            raise HTTPException(status_code=403, detail=f"Only customer, curator or admin can {body.action} join requests")
+    ids = list(dict.fromkeys(body.ids))
+    status = "accepted" if body.action == "accept" else "rejected"
+    version, requests = update_items(db, project_id, "join_requests", "id", ids,
+                                     {"status": status}, expect={"status": "pending"}) or (None, [])
+    if status == "accepted" and requests:
+        joined_at = datetime.utcnow().isoformat()
+        version = add_participants(db, project_id, [
+            {"user_id": r["user_id"], "role": ProjectRole.EXECUTOR.value, "joined_at": joined_at}
+            for r in requests
+        ]) or version
+    db.commit()
+    for request in requests:
+        publish_project(project_id, f"join_request.{status}", request=request)
+        publish_user(request["user_id"], f"join_request.{status}", project_id=project_id, request=request)
+    return bulk_result(ids, [r["id"] for r in requests], version)
+
+@app.post("/projects/{project_id}/suggestions/bulk", response_model=BulkResult, tags=["Projects"])
+async def bulk_suggestions(
+    project_id: int,
+    body: BulkAction,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Принять или отклонить несколько ожидающих предложений; изменения принятых применяются по порядку"""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    ids = list(dict.fromkeys(body.ids))
+    role = get_participant_role(db, project.id, current_user.id)
+    privileged = current_user.is_admin or is_curator(current_user)
+    # Без роли заказчика или исполнителя можно обработать только свои предложения — проверяем всю пачку сразу
+    if not (privileged or role in [ProjectRole.CUSTOMER.value, ProjectRole.EXECUTOR.value]):
+        authors = {s.get("id"): s.get("author_id") for s in (project.suggestions or [])}
+        if any(i in authors and authors[i] != current_user.id for i in ids):
+            raise HTTPException(status_code=403, detail=f"Only suggestion author, customer, executor, curator or admin can {body.action} it")
+    status = SuggestionStatus.ACCEPTED.value if body.action == "accept" else SuggestionStatus.REJECTED.value
+    version, suggestions = update_items(db, project.id, "suggestions", "id", ids,
+                                        {"status": status}, expect={"status": SuggestionStatus.PENDING.value}) or (None, [])
+    if status == SuggestionStatus.ACCEPTED.value and (role == ProjectRole.CUSTOMER.value or privileged):
+        for suggestion in suggestions:
+            if suggestion["target_type"] == "project":
+                for key, value in suggestion["changes"].items():
+                    if hasattr(project, key) and key not in ("id", "version"):
+                        setattr(project, key, value)
+    db.commit()
+    if suggestions:
+        db.refresh(project)
+        version = project.version
+    for suggestion in suggestions:
+        publish_project(project.id, f"suggestion.{status}", suggestion_id=suggestion["id"], version=version)
+        publish_user(suggestion["author_id"], f"suggestion.{status}", project_id=project.id, suggestion_id=suggestion["id"])
+    return bulk_result(ids, [s["id"] for s in suggestions], version)
+
+@app.post("/projects/{project_id}/comments/hide", response_model=BulkResult, tags=["Projects"])
+async def bulk_hide_comments(
+    project_id: int,
+    body: BulkIds,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Скрыть несколько комментариев проекта одним UPDATE; уже скрытые пропускаются"""
+    if not project_exists(db, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not (current_user.is_admin or is_curator(current_user)):
+        role = get_participant_role(db, project_id, current_user.id)
+        if role != ProjectRole.SUPERVISOR.value:
+            raise HTTPException(status_code=403, detail="Only supervisor, curator or admin can hide comments")
+    ids = list(dict.fromkeys(body.ids))
+    hidden = set(db.execute(
+        update(ProjectComment)
+        .where(ProjectComment.project_id == project_id, ProjectComment.task_id == None,
+               ProjectComment.id.in_(ids), ProjectComment.hidden == False)
+        .values(hidden=True)
+        .returning(ProjectComment.id)
+    ).scalars())
+    db.commit()
+    updated = [i for i in ids if i in hidden]
+    for comment_id in updated:
+        publish_project(project_id, "comment.hidden", task_id=None, comment_id=comment_id)
+    # Комментарии не меняют версию проекта
+    return bulk_result(ids, updated, None)
+
+# ==================== CHANGES ====================
+@app.get("/changes", response_model=ChangeFeed, tags=["Changes"])
+async def get_changes(
+    since: Optional[int] = Query(None, ge=0, description="next_since предыдущего ответа; без него — только текущая позиция"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Что изменилось после since: проекты, пользователи и комментарии (id, операция, версия).
+    Клиент перечитывает только изменившееся; при resync — всё, затем продолжает с next_since
+    """
+    return await read_changes(db, since, limit)
+
+# ==================== EVENTS ====================
+# Вместо опроса /projects/ клиент держит одно соединение: SSE (/events) или WebSocket (/ws).
+# События компактные: тип, id проекта и изменённый объект; содержимое скрытых комментариев не рассылается
+EVENT_KEEPALIVE_SECONDS = 15
+MAX_EVENT_PROJECTS = 200
+
+async def event_user(token: Optional[str]) -> Optional[User]:
+    """Пользователь по токену; сессия БД нужна только на проверку, а не на всё время соединения"""
+    if not token:
+        return None
+    async with async_session_local() as db:
+        try:
+            return await get_current_user(token, db)
+        except HTTPException:
+            return None
+
+def project_topics(project_ids) -> List[str]:
+    topics = []
+    for project_id in project_ids:
+        try:
+            topics.append(f"project:{int(project_id)}")
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid project id: {project_id}")
+    if len(set(topics)) > MAX_EVENT_PROJECTS:
+        raise HTTPException(status_code=400, detail=f"Too many projects, max {MAX_EVENT_PROJECTS}")
+    return topics
+
+@app.get("/events", tags=["Events"])
+async def event_stream(
+    request: Request,
+    projects: Optional[str] = Query(None, description="ID проектов через запятую"),
+    token: Optional[str] = Query(None, description="JWT (EventSource не умеет передавать заголовки)")
+):
+    """
+    Server-Sent Events: события своих проектов и личные (user:{id}) одним потоком.
+    Каждое событие — JSON в data; {"type": "resync"} — клиент отстал, данные нужно перечитать
+    """
+    if token is None:
+        scheme, _, value = request.headers.get("Authorization", "").partition(" ")
+        token = value if scheme.lower() == "bearer" else None
+    user = await event_user(token)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    topics = project_topics(projects.split(",") if projects else [])
+    subscription = broker.subscribe([f"user:{user.id}", *topics])
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = await subscription.get(EVENT_KEEPALIVE_SECONDS)
+                # Комментарий-пинг не даёт прокси закрыть простаивающее соединение
+                yield ": keepalive\n\n" if event is None else f"data: {event}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws")
+async def event_socket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    WebSocket: клиент шлёт {"subscribe": {"projects": [1, 2]}} / {"unsubscribe": {...}},
+    сервер — события в том же формате, что и /events
+    """
+    user = await event_user(token)
+    if user is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscription = broker.subscribe([f"user:{user.id}"])
+
+    async def receive():
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                for action in ("subscribe", "unsubscribe"):
+                    if isinstance(message, dict) and isinstance(message.get(action), dict):
+                        topics = project_topics(message[action].get("projects") or [])
+                        if action == "unsubscribe":
+                            subscription.remove(topics)
+                        elif len(subscription.topics | set(topics)) > MAX_EVENT_PROJECTS + 1:
+                            raise HTTPException(status_code=400, detail=f"Too many projects, max {MAX_EVENT_PROJECTS}")
+                        else:
+                            subscription.add(topics)
+            except json.JSONDecodeError:
+                await websocket.send_json({"type": "error", "detail": "Invalid JSON"})
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "detail": e.detail})
+
+    async def send():
+        while True:
+            event = await subscription.get(EVENT_KEEPALIVE_SECONDS)
+            if event is not None:
+                await websocket.send_text(event)
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not isinstance(task.exception(), WebSocketDisconnect):
+                task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscription.close()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,6 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Float, JSON, Boolean, Date, DateTime, ForeignKey, Index, bindparam, event, select
 from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime
+from sqlalchemy.orm import Session, relationship, query_expression, object_session
+from sqlalchemy.orm.attributes import get_history
+from datetime import datetime, date
+import html
+import uuid
+from typing import Optional
 
 Base = declarative_base()
 
@@ -24,6 +29,7 @@ class User(Base):
     is_teacher = Column(Boolean, default=False, nullable=False) 
     teacher_info = Column(JSON, nullable=True)
     is_admin = Column(Boolean, default=False, nullable=False)
+    version = Column(Integer, nullable=False, default=0, server_default="0")   # растёт при каждом изменении
 
 class Project(Base):
     __tablename__ = "projects"
@@ -33,8 +39,263 @@ class Project(Base):
     body = Column(String, nullable=False)
     underbody = Column(String, default="")
     participants = Column(JSON, default=list)          # список словарей Participant
-    tasks = Column(JSON, default=list)
+    tasks_json = Column("tasks", JSON, default=list)   # устарело: задачи хранятся в project_tasks
     links = Column(JSON, default=dict)
     comments = Column(JSON, default=list)
     suggestions = Column(JSON, default=list)           # <-- новое поле для предложений
-    join_requests = Column(JSON, default=list)
\ No newline at end of file
+    join_requests = Column(JSON, default=list)
+    version = Column(Integer, nullable=False, default=0, server_default="0")   # растёт при каждом изменении
+
+    # Значения, вычисляемые в SQL для краткого представления (см. project_summary.py)
+    excerpt = query_expression()
+    pending_join_requests = query_expression()
+    pending_suggestions = query_expression()
+    # Ранг bm25 и фрагмент с совпадениями — только в результатах /search (см. project_search.py)
+    search_rank = query_expression()
+    search_snippet = query_expression()
+
+    task_rows = relationship(
+        "ProjectTask", order_by="ProjectTask.position", lazy="selectin",
+        cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    @property
+    def snippet(self) -> Optional[str]:
+        """Фрагмент из search_snippet в виде HTML: текст экранирован, совпадения в <mark>"""
+        # Из __dict__: в обычных списках выражение не загружено, и обращение к атрибуту дало бы запрос
+        raw = self.__dict__.get("search_snippet")
+        if not raw:
+            return None
+        return html.escape(raw).replace("\ue000", "<mark>").replace("\ue001", "</mark>")
+
+    @property
+    def tasks(self) -> list:
+        """Задачи в прежнем виде — список словарей по порядку"""
+        return [task.to_dict() for task in self.task_rows]
+
+    @tasks.setter
+    def tasks(self, tasks) -> None:
+        """Заменяет список задач: строки с известным id обновляются, остальные создаются или удаляются"""
+        existing = {task.id: task for task in self.task_rows}
+        rows, seen = [], set()
+        for position, data in enumerate(tasks or []):
+            task_id = data.get("id")
+            if not task_id or task_id in seen:
+                task_id = uuid.uuid4().hex
+            seen.add(task_id)
+            row = existing.get(task_id) or ProjectTask(id=task_id)
+            row.apply(data, replace=True)
+            if row.position != position:
+                row.position = position
+            rows.append(row)
+        self.task_rows = rows
+
+TASK_FIELDS = ("title", "status", "body", "timeline", "timelinend", "progress", "assigned_to")
+
+def parse_task_date(value) -> Optional[date]:
+    """Дата задачи в формате дд.мм.гггг (как во фронтенде) или ISO"""
+    if not value:
+        return None
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value)[:10], fmt).date()
+        except ValueError:
+            continue
+    return None
+
+class ProjectTask(Base):
+    """Задача проекта со стабильным id; порядок в проекте — position"""
+    __tablename__ = "project_tasks"
+
+    id = Column(String, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    title = Column(String, nullable=False, default="")
+    status = Column(String, nullable=True)
+    body = Column(String, nullable=True)
+    timeline = Column(String, nullable=True)           # начало, дд.мм.гггг
+    timelinend = Column(String, nullable=True)         # окончание, дд.мм.гггг
+    deadline = Column(Date, nullable=True)             # timelinend датой — для фильтра и сортировки
+    progress = Column(Float, nullable=True)
+    assigned_to = Column(Integer, nullable=True)
+    extra = Column(JSON, default=dict)                 # подзадачи и прочие поля задачи
+
+    __table_args__ = (
+        Index("ix_project_tasks_project_position", "project_id", "position"),
+        Index("ix_project_tasks_status", "status"),
+        Index("ix_project_tasks_deadline", "deadline"),
+    )
+
+    def to_dict(self) -> dict:
+        data = {"id": self.id}
+        for field in TASK_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        data.update(self.extra or {})
+        return data
+
+    def apply(self, data: dict, replace: bool = False) -> None:
+        """
+        Записать поля задачи из словаря; неизвестные поля уходят в extra.
+        replace=True — отсутствующие в data поля очищаются. Неизменённые колонки не трогаем,
+        чтобы UPDATE содержал только реально изменённое
+        """
+        values = {field: data.get(field) for field in TASK_FIELDS} if replace else {}
+        extra = {} if replace else dict(self.extra or {})
+        for key, value in data.items():
+            if key in ("id", "project_id", "position", "comments"):
+                continue
+            if key in TASK_FIELDS:
+                values[key] = value
+            else:
+                extra[key] = value
+        if values.get("title", self.title) is None:
+            values["title"] = ""
+        for key, value in values.items():
+            if getattr(self, key) != value:
+                setattr(self, key, value)
+        if extra != (self.extra or {}):
+            self.extra = extra
+        deadline = parse_task_date(self.timelinend)
+        if self.deadline != deadline:
+            self.deadline = deadline
+
+class ProjectParticipant(Base):
+    """Нормализованная копия Project.participants для поиска по индексу"""
+    __tablename__ = "project_participants"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    role = Column(String, nullable=False)
+    joined_at = Column(DateTime, nullable=True)
+    invited_by = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_project_participants_user_project", "user_id", "project_id"),
+    )
+
+class ProjectComment(Base):
+    """Комментарий к проекту (task_id = None) или к задаче проекта"""
+    __tablename__ = "project_comments"
+
+    id = Column(String, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    task_id = Column(String, nullable=True)
+    author_id = Column(Integer, nullable=False, index=True)
+    content = Column(String, nullable=False)
+    created_at = Column(String, nullable=False)      # ISO-строка, как Comment.createdAt
+    is_read = Column(Boolean, default=False, nullable=False)
+    hidden = Column(Boolean, default=False, nullable=False)
+
+    __table_args__ = (
+        Index("ix_project_comments_thread", "project_id", "task_id", "created_at", "id"),
+    )
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def participant_rows(project_id: int, participants) -> list:
+    """Строки project_participants из JSON-списка участников"""
+    rows = {}
+    for p in (participants or []):
+        if p.get("user_id") is None:
+            continue
+        rows[p["user_id"]] = {
+            "project_id": project_id,
+            "user_id": p["user_id"],
+            "role": p.get("role") or "",
+            "joined_at": _parse_datetime(p.get("joined_at")),
+            "invited_by": p.get("invited_by"),
+        }
+    return list(rows.values())
+
+def ensure_task_id(task: dict) -> str:
+    """Постоянный id задачи (к нему привязаны комментарии), назначается при первой записи"""
+    if not task.get("id"):
+        task["id"] = uuid.uuid4().hex
+    return task["id"]
+
+def comment_rows(project_id: int, task_id: Optional[str], comments) -> list:
+    """Строки project_comments из JSON-списка комментариев"""
+    rows = {}
+    for c in (comments or []):
+        if not c.get("id"):
+            continue
+        rows[c["id"]] = {
+            "id": c["id"],
+            "project_id": project_id,
+            "task_id": task_id,
+            "author_id": c.get("authorId") or 0,
+            "content": c.get("content") or "",
+            "created_at": c.get("createdAt") or datetime.utcnow().isoformat(),
+            "is_read": bool(c.get("isRead")),
+            "hidden": bool(c.get("hidden")),
+        }
+    return list(rows.values())
+
+@event.listens_for(User, "before_update")
+@event.listens_for(Project, "before_update")
+def _bump_version(mapper, connection, target):
+    # before_update вызывается и для «грязных» объектов без реальных изменений — их версию не трогаем
+    if not object_session(target).is_modified(target, include_collections=False):
+        return
+    # Выражением, а не target.version + 1: атомарные JSON-изменения тоже увеличивают версию
+    target.version = mapper.class_.version + 1
+
+@event.listens_for(ProjectTask, "after_insert")
+@event.listens_for(ProjectTask, "after_update")
+@event.listens_for(ProjectTask, "after_delete")
+def _bump_task_project_version(mapper, connection, target):
+    """Задачи входят в представление проекта, поэтому их изменение меняет и версию проекта"""
+    table = Project.__table__
+    connection.execute(
+        table.update().where(table.c.id == target.project_id).values(version=table.c.version + 1)
+    )
+
+@event.listens_for(Session, "after_flush")
+def _sync_project_participants(session, flush_context):
+    """
+    Держит project_participants в соответствии с JSON-колонкой в той же транзакции.
+    Пишется только разница: INSERT — лишь для действительно новых участников
+    (на него завязан триггер курсоров прочтения), у оставшихся обновляется роль
+    """
+    table = ProjectParticipant.__table__
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            session.execute(table.delete().where(table.c.project_id == obj.id))
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Project):
+            continue
+        if obj not in session.new and not get_history(obj, "participants").has_changes():
+            continue
+        wanted = {row["user_id"]: row for row in participant_rows(obj.id, obj.participants)}
+        current = {} if obj in session.new else {
+            row.user_id: row for row in session.execute(select(table).where(table.c.project_id == obj.id))
+        }
+        gone = current.keys() - wanted.keys()
+        if gone:
+            session.execute(table.delete().where(table.c.project_id == obj.id, table.c.user_id.in_(gone)))
+        added = [row for user_id, row in wanted.items() if user_id not in current]
+        if added:
+            session.execute(table.insert(), added)
+        changed = [
+            {"b_user_id": user_id, "b_role": row["role"],
+             "b_joined_at": row["joined_at"], "b_invited_by": row["invited_by"]}
+            for user_id, row in wanted.items()
+            if user_id in current
+            and (current[user_id].role, current[user_id].joined_at, current[user_id].invited_by)
+            != (row["role"], row["joined_at"], row["invited_by"])
+        ]
+        if changed:
+            session.execute(
+                table.update()
+                .where(table.c.project_id == obj.id, table.c.user_id == bindparam("b_user_id"))
+                .values(role=bindparam("b_role"), joined_at=bindparam("b_joined_at"), invited_by=bindparam("b_invited_by")),
+                changed,
+            )
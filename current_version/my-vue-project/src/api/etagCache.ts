@@ -0,0 +1,41 @@
+// src/api/etagCache.ts
+import type { AxiosInstance } from 'axios'
+
+// Кэш ответов GET с ETag: повторный запрос уходит с If-None-Match,
+// и на 304 сервер не читает и не пересылает запись — отдаём сохранённые данные
+const ETAG_CACHE_SIZE = 200
+
+export function installEtagCache(instance: AxiosInstance) {
+  // Тело храним строкой: компоненты меняют полученные объекты, кэш это не должно задевать
+  const cache = new Map<string, { etag: string; body: string }>()
+
+  instance.interceptors.request.use((config) => {
+    if ((config.method || 'get').toLowerCase() !== 'get') return config
+    const cached = cache.get(instance.getUri(config))
+    if (cached) {
+      config.headers.set('If-None-Match', cached.etag)
+      config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304
+    }
+    return config
+  })
+
+  instance.interceptors.response.use((response) => {
+    if ((response.config.method || 'get').toLowerCase() !== 'get') return response
+    const key = instance.getUri(response.config)
+    if (response.status === 304) {
+      const cached = cache.get(key)
+      if (cached) response.data = JSON.parse(cached.body)
+      return response
+    }
+    const etag = response.headers['etag']
+    if (etag) {
+      // Переставляем в конец: вытесняется самая давно использованная запись
+      cache.delete(key)
+      cache.set(key, { etag, body: JSON.stringify(response.data) })
+      if (cache.size > ETAG_CACHE_SIZE) {
+        cache.delete(cache.keys().next().value as string)
+      }
+    }
+    return response
+  })
+}
@@ -0,0 +1,21 @@
+// src/api/events.ts
+import axios from 'axios'
+
+// Поток событий сервера (SSE /events) вместо периодической перезагрузки проектов.
+// Личные события (user:{id}) приходят всегда, события проектов — по списку projects
+export interface ServerEvent {
+  type: string
+  project_id?: number
+  [key: string]: any
+}
+
+export function subscribeEvents(projects: number[], onEvent: (event: ServerEvent) => void): () => void {
+  const token = localStorage.getItem('access_token')
+  if (!token || typeof EventSource === 'undefined') return () => {}
+  const params = new URLSearchParams({ token })
+  if (projects.length) params.set('projects', projects.join(','))
+  const source = new EventSource(`${axios.defaults.baseURL}/events?${params}`)
+  // {"type": "resync"} — часть событий пропущена, подписчик перечитывает данные сам
+  source.onmessage = (message) => onEvent(JSON.parse(message.data))
+  return () => source.close()
+}
@@ -0,0 +1,26 @@
+// src/api/pagination.ts
+import axios from 'axios'
+import type { Page } from '@/types'
+
+export const PAGE_SIZE = 50
+export const MAX_PAGE_SIZE = 200
+
+// Одна страница списка; after — next_cursor предыдущей страницы
+export async function fetchPage<T>(url: string, params: Record<string, any> = {}, after?: string | null): Promise<Page<T>> {
+  const response = await axios.get<Page<T>>(url, {
+    params: { limit: PAGE_SIZE, ...params, ...(after ? { after } : {}) }
+  })
+  return response.data
+}
+
+// Все страницы подряд — для небольших списков и справочников
+export async function fetchAllPages<T>(url: string, params: Record<string, any> = {}): Promise<T[]> {
+  const items: T[] = []
+  let after: string | null = null
+  do {
+    const page: Page<T> = await fetchPage<T>(url, { limit: MAX_PAGE_SIZE, ...params }, after)
+    items.push(...page.items)
+    after = page.next_cursor
+  } while (after)
+  return items
+}
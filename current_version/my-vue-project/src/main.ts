@@ -4,9 +4,11 @@ import { createPinia } from 'pinia'
 import App from './App.vue'
 import router from './router'
 import axios from 'axios'
+import { installEtagCache } from './api/etagCache'
 
 // Настройка axios
 axios.defaults.baseURL = 'http://localhost:8000'
+installEtagCache(axios)
 
 // Добавляем токен к каждому запросу, если он есть
 const token = localStorage.getItem('access_token')
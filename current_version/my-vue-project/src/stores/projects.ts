@@ -2,31 +2,59 @@
 import { defineStore } from 'pinia';
 import axios from 'axios';
 import { useAuthStore } from './auth';
-import type { Project, ProjectCreate, ProjectUpdate, Suggestion } from '@/types';
+import { fetchPage, fetchAllPages } from '@/api/pagination';
+import type { Project, ProjectCreate, ProjectSummary, ProjectUpdate, Suggestion, Task } from '@/types';
 
 interface ProjectsState {
-  projects: Project[];
+  projects: ProjectSummary[];   // списки работают с кратким представлением
   currentProject: Project | null;
+  nextCursor: string | null;
+  listUrl: string;
+  listParams: Record<string, any>;
 }
 
 export const useProjectsStore = defineStore('projects', {
   state: (): ProjectsState => ({
     projects: [],
     currentProject: null,
+    nextCursor: null,
+    listUrl: '/projects/',
+    listParams: {},
   }),
+  getters: {
+    hasMore: (state) => state.nextCursor !== null,
+  },
   actions: {
+    // Первая страница списка (или поиска при query); дальше — fetchMoreProjects()
+    async fetchProjects(query?: string): Promise<ProjectSummary[]> {
+      this.listUrl = query ? '/search' : '/projects/';
+      this.listParams = query ? { q: query, view: 'summary' } : { view: 'summary' };
+      const page = await fetchPage<ProjectSummary>(this.listUrl, this.listParams);
+      this.projects = page.items;
+      this.nextCursor = page.next_cursor;
+      return this.projects;
+    },
+    async fetchMoreProjects(): Promise<ProjectSummary[]> {
+      if (!this.nextCursor) return this.projects;
+      const page = await fetchPage<ProjectSummary>(this.listUrl, this.listParams, this.nextCursor);
+      this.projects = [...this.projects, ...page.items];
+      this.nextCursor = page.next_cursor;
+      return this.projects;
+    },
     async fetchAllProjects(): Promise<void> {
-      const response = await axios.get<Project[]>('/projects/');
-      this.projects = response.data;
+      this.projects = await fetchAllPages<ProjectSummary>('/projects/', { view: 'summary' });
+      this.nextCursor = null;
     },
-    async fetchUserProjects(): Promise<Project[]> {
+    // Проекты участника — все страницы (у одного пользователя их немного)
+    async fetchProjectsOf(userId: number): Promise<ProjectSummary[]> {
+      return fetchAllPages<ProjectSummary>('/projects/', { participant_id: userId, view: 'summary' });
+    },
+    async fetchUserProjects(): Promise<ProjectSummary[]> {
       const authStore = useAuthStore();
       if (!authStore.userId) return [];
-      const response = await axios.get<Project[]>('/projects/', {
-        params: { participant_id: authStore.userId },
-      });
-      this.projects = response.data;
-      return response.data;
+      this.projects = await this.fetchProjectsOf(authStore.userId);
+      this.nextCursor = null;
+      return this.projects;
     },
     async fetchProjectById(id: number): Promise<Project> {
       const response = await axios.get<Project>(`/projects/${id}`);
@@ -37,20 +65,38 @@ export const useProjectsStore = defineStore('projects', {
       const response = await axios.post<Project>('/projects/', projectData);
       return response.data;
     },
-    async updateProject(id: number, updateData: ProjectUpdate): Promise<Project> {
-      const response = await axios.put<Project>(`/projects/${id}`, updateData);
+    // version — версия, с которой начиналось редактирование; если проект успели изменить, сервер ответит 412
+    async updateProject(id: number, updateData: ProjectUpdate, version?: number): Promise<Project> {
+      const headers = version !== undefined ? { 'If-Match': `"project-${id}-${version}"` } : {};
+      const response = await axios.put<Project>(`/projects/${id}`, updateData, { headers });
+      return response.data;
+    },
+    // Частичное изменение (RFC 7396): передаются только меняемые поля, null удаляет ключ
+    async patchProject(id: number, patch: Record<string, unknown>, version?: number): Promise<Project> {
+      const headers: Record<string, string> = { 'Content-Type': 'application/merge-patch+json' };
+      if (version !== undefined) headers['If-Match'] = `"project-${id}-${version}"`;
+      const response = await axios.patch<Project>(`/projects/${id}`, patch, { headers });
       return response.data;
     },
     async deleteProject(id: number): Promise<void> {
       await axios.delete(`/projects/${id}`);
     },
+    // Задачи: чтение и запись одной задачи без пересылки всего списка
+    async fetchTask(projectId: number, taskIndex: number): Promise<Task> {
+      const response = await axios.get<Task>(`/projects/${projectId}/tasks/${taskIndex}`);
+      return response.data;
+    },
+    async updateTask(taskId: string, updateData: Partial<Task>): Promise<Task> {
+      const response = await axios.put<Task>(`/tasks/${taskId}`, updateData);
+      return response.data;
+    },
     // Методы для предложений (опционально, можно вызывать напрямую axios)
     async acceptSuggestion(projectId: number, suggestionId: string): Promise<Project> {
       const response = await axios.put<Project>(`/projects/${projectId}/suggestions/${suggestionId}/accept`);
       return response.data;
     },
-    async rejectSuggestion(projectId: number, suggestionId: string): Promise<Project> {
-      const response = await axios.put<Project>(`/projects/${projectId}/suggestions/${suggestionId}/reject`);
+    async rejectSuggestion(projectId: number, suggestionId: string): Promise<Suggestion> {
+      const response = await axios.put<Suggestion>(`/projects/${projectId}/suggestions/${suggestionId}/reject`);
       return response.data;
     }
   },
@@ -2,29 +2,47 @@
 import { defineStore } from 'pinia'
 import axios from 'axios'
 import type { User } from '@/types'
+import { fetchPage, fetchAllPages } from '@/api/pagination'
+
+// Не больше стольких id в одном запросе /users/batch
+const BATCH_SIZE = 200
 
 interface UsersState {
   users: User[]
+  nextCursor: string | null
+  params: Record<string, any>
+  // В users все пользователи (fetchAllUsers), а не страница или карточки из ensureUsers
+  allLoaded: boolean
 }
 
 export const useUsersStore = defineStore('users', {
   state: (): UsersState => ({
-    users: []
+    users: [],
+    nextCursor: null,
+    params: {},
+    allLoaded: false
   }),
+  getters: {
+    hasMore: (state) => state.nextCursor !== null
+  },
   actions: {
     /**
-     * Загружает пользователей с возможностью фильтрации по типу и поиску.
+     * Загружает первую страницу пользователей с фильтрацией по типу и поиску.
+     * Следующие страницы — fetchMoreUsers().
      * @param userType - 'student', 'teacher' или undefined (все)
      * @param query - поисковый запрос
      */
     async fetchUsers(userType?: string, query?: string) {
       try {
-        const params: any = {}
+        const params: any = { sort: 'fullname' }
         if (userType) params.user_type = userType
         if (query) params.q = query
 
-        const response = await axios.get('/users/', { params })
-        this.users = response.data
+        const page = await fetchPage<User>('/users/', params)
+        this.params = params
+        this.users = page.items
+        this.nextCursor = page.next_cursor
+        this.allLoaded = false
         return this.users
       } catch (error) {
         console.error('Ошибка загрузки пользователей:', error)
@@ -32,9 +50,48 @@ export const useUsersStore = defineStore('users', {
       }
     },
 
-    // Для совместимости со старым кодом
+    // Следующая страница с теми же фильтрами
+    async fetchMoreUsers() {
+      if (!this.nextCursor) return this.users
+      const page = await fetchPage<User>('/users/', this.params, this.nextCursor)
+      this.users = [...this.users, ...page.items]
+      this.nextCursor = page.next_cursor
+      return this.users
+    },
+
+    // Все пользователи (справочник имён и аватаров), постранично
     async fetchAllUsers() {
-      return this.fetchUsers()
+      try {
+        this.users = await fetchAllPages<User>('/users/')
+        this.params = {}
+        this.nextCursor = null
+        this.allLoaded = true
+        return this.users
+      } catch (error) {
+        console.error('Ошибка загрузки пользователей:', error)
+        throw error
+      }
+    },
+
+    /**
+     * Догружает карточки пользователей, которых ещё нет в users (имена и аватары
+     * участников и авторов), через /users/batch вместо загрузки всего справочника.
+     * @param ids - id пользователей, повторы и уже загруженные пропускаются
+     */
+    async ensureUsers(ids: Iterable<number | null | undefined>) {
+      const known = new Set(this.users.map(u => u.id))
+      const missing = [...new Set(ids)].filter((id): id is number => typeof id === 'number' && !known.has(id))
+      try {
+        for (let i = 0; i < missing.length; i += BATCH_SIZE) {
+          const response = await axios.get<User[]>('/users/batch', {
+            params: { ids: missing.slice(i, i + BATCH_SIZE).join(',') }
+          })
+          this.users = [...this.users, ...response.data]
+        }
+      } catch (error) {
+        console.error('Ошибка загрузки пользователей:', error)
+      }
+      return this.users
     },
 
     async searchUsers(query: string) {
@@ -29,6 +29,7 @@ export interface User {
   is_teacher?: boolean;
   teacher_info?: TeacherInfo;
   is_admin?: boolean;
+  version?: number;
 }
 
 export interface SubTask {
@@ -61,6 +62,36 @@ export interface Comment {
   hidden?: boolean;
 }
 
+// Страница комментариев: next_cursor передаётся в ?after= для следующей страницы
+export interface CommentPage {
+  items: Comment[];
+  next_cursor: string | null;
+  unread: number | null;
+}
+
+// Краткое представление проекта для карточек (?view=summary)
+export interface ProjectSummary {
+  id: number;
+  title: string;
+  excerpt: string;
+  version: number;
+  participants: Participant[];
+  tasks_total: number;
+  task_counts: Record<string, number>;
+  progress: number | null;
+  comment_count: number;
+  pending_join_requests: number;
+  pending_suggestions: number;
+  snippet?: string;     // только в результатах /search
+}
+
+// Страница списка: next_cursor передаётся в ?after=, total приходит только при with_total=true
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+  total: number | null;
+}
+
 export interface SuggestionComment {
   id: string;
   authorId: number;
@@ -110,9 +141,9 @@ export interface Project {
   participants: Participant[];
   tasks: Task[];
   links?: ProjectLinks;
-  comments?: Comment[];
   suggestions?: Suggestion[];
   join_requests?: JoinRequest[];  // <-- добавлено
+  version?: number;               // для If-Match при сохранении
 }
 
 export interface ProjectLinks {
@@ -120,7 +151,8 @@ export interface ProjectLinks {
   google_drive?: string;
 }
 
-export type ProjectCreate = Omit<Project, 'id'>;
+// Начальные комментарии можно передать при создании; потом — /projects/{id}/comments
+export type ProjectCreate = Omit<Project, 'id'> & { comments?: Comment[] };
 
 export interface ProjectUpdate {
   title?: string;
@@ -129,5 +161,4 @@ export interface ProjectUpdate {
   tasks?: Task[];
   participants?: Participant[];
   links?: ProjectLinks;
-  comments?: Comment[];
 }
\ No newline at end of file
@@ -0,0 +1,32 @@
+# participants_backfill.py
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from database import engine
+from models import Base, Project, ProjectParticipant, participant_rows
+
+
+def backfill_project_participants(bind=engine, force: bool = False) -> int:
+    """
+    Заполняет project_participants из JSON-колонки projects.participants.
+    Без force ничего не делает, если таблица уже заполнена
+    """
+    Base.metadata.create_all(bind=bind, tables=[ProjectParticipant.__table__])
+    table = ProjectParticipant.__table__
+    with Session(bind=bind) as db:
+        if not force and db.scalar(select(func.count()).select_from(table)):
+            return 0
+        rows = []
+        for project_id, participants in db.execute(select(Project.id, Project.participants)):
+            rows.extend(participant_rows(project_id, participants))
+        if force:
+            db.execute(table.delete())
+        if rows:
+            # OR IGNORE: несколько воркеров могут запустить заполнение одновременно
+            db.execute(table.insert().prefix_with("OR IGNORE"), rows)
+        db.commit()
+        return len(rows)
+
+
+if __name__ == "__main__":
+    count = backfill_project_participants(force=True)
+    print(f"✅ Перенесено участников: {count}")
@@ -0,0 +1,169 @@
+# project_mutations.py
+"""
+Атомарные изменения JSON-колонок проекта одной командой UPDATE.
+Вместо «прочитать документ — поправить список — записать целиком» SQLite сам
+дописывает элемент (json_insert) или меняет поля одного элемента (json_set).
+Каждое изменение увеличивает projects.version и возвращает изменённый фрагмент
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+# Колонки-массивы, которые можно менять через этот модуль
+JSON_LIST_COLUMNS = ("participants", "join_requests", "suggestions")
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _check(column: str, *fields: str) -> None:
+    # Имена колонок и полей подставляются в SQL, поэтому только из белого списка
+    if column not in JSON_LIST_COLUMNS:
+        raise ValueError(f"Unsupported JSON column: {column}")
+    for field in fields:
+        if not _FIELD_RE.match(field):
+            raise ValueError(f"Invalid JSON field name: {field}")
+
+
+def _match_sql(column: str, conditions: Dict[str, Any], params: dict, prefix: str, select: str = "key") -> str:
+    """Подзапрос по json_each: элементы массива, совпадающие по всем полям"""
+    clauses = []
+    for i, (field, value) in enumerate(conditions.items()):
+        params[f"{prefix}{i}"] = value
+        clauses.append(f"json_extract(value, '$.{field}') = :{prefix}{i}")
+    return f"SELECT {select} FROM json_each(projects.{column}) WHERE " + " AND ".join(clauses)
+
+
+def append_item(db: Session, project_id: int, column: str, item: dict,
+                unless: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """
+    Дописать элемент в конец массива. unless — не дописывать, если уже есть элемент
+    с такими полями (проверка в том же UPDATE, без гонки).
+    Возвращает новую версию проекта или None, если строка не изменилась
+    """
+    _check(column, *(unless or {}))
+    params = {"project_id": project_id, "item": json.dumps(item, ensure_ascii=False)}
+    sql = (
+        f"UPDATE projects SET {column} = json_insert(coalesce({column}, '[]'), '$[#]', json(:item)),"
+        f" version = version + 1 WHERE id = :project_id"
+    )
+    if unless:
+        sql += f" AND NOT EXISTS ({_match_sql(column, unless, params, 'u')})"
+    row = db.execute(text(sql + " RETURNING version"), params).first()
+    return row[0] if row else None
+
+
+def update_item(db: Session, project_id: int, column: str, key: str, key_value: Any,
+                changes: Dict[str, Any], expect: Optional[Dict[str, Any]] = None) -> Optional[Tuple[int, dict]]:
+    """
+    Поменять поля одного элемента массива, найденного по key == key_value.
+    expect — дополнительные условия на текущие значения (например, status == pending).
+    Возвращает (версия, элемент после изменения) или None, если элемент не найден или не подошёл
+    """
+    _check(column, key, *changes, *(expect or {}))
+    params = {"project_id": project_id}
+    index_sql = _match_sql(column, {key: key_value}, params, "k")
+    assignments = []
+    for i, (field, value) in enumerate(changes.items()):
+        params[f"v{i}"] = json.dumps(value, ensure_ascii=False)
+        assignments.append(f"'$[' || ({index_sql}) || '].{field}', json(:v{i})")
+    guard = _match_sql(column, {key: key_value, **(expect or {})}, params, "e")
+    row = db.execute(text(
+        f"UPDATE projects SET {column} = json_set({column}, {', '.join(assignments)}),"
+        f" version = version + 1"
+        f" WHERE id = :project_id AND EXISTS ({guard})"
+        f" RETURNING version, ({_match_sql(column, {key: key_value}, params, 'k', select='value')})"
+    ), params).first()
+    if not row:
+        return None
+    return row[0], json.loads(row[1])
+
+
+def append_items(db: Session, project_id: int, column: str, items: List[dict], unique: str) -> Tuple[Optional[int], List[dict]]:
+    """
+    Дописать несколько элементов одним UPDATE. Элементы, у которых поле unique совпадает
+    с уже имеющимся в массиве (или с более ранним в items), пропускаются.
+    Возвращает (новая версия или None, если дописывать нечего; дописанные элементы)
+    """
+    _check(column, unique)
+    existing = set(db.execute(
+        text(f"SELECT json_extract(value, '$.{unique}') FROM projects, json_each(projects.{column})"
+             f" WHERE projects.id = :project_id"),
+        {"project_id": project_id}, bind_arguments={"bind": _writer(db)},
+    ).scalars())
+    added = []
+    for item in items:
+        if item.get(unique) not in existing:
+            existing.add(item.get(unique))
+            added.append(item)
+    if not added:
+        return None, []
+    params = {"project_id": project_id}
+    values = []
+    for i, item in enumerate(added):
+        params[f"i{i}"] = json.dumps(item, ensure_ascii=False)
+        values.append(f"'$[#]', json(:i{i})")
+    version = db.execute(text(
+        f"UPDATE projects SET {column} = json_insert(coalesce({column}, '[]'), {', '.join(values)}),"
+        f" version = version + 1 WHERE id = :project_id RETURNING version"
+    ), params).scalar()
+    return version, added
+
+
+def _writer(db: Session):
+    # Чтение перед изменением идёт через писателя: его BEGIN IMMEDIATE держит блокировку
+    # до commit, поэтому между чтением и UPDATE элементы никто не изменит
+    return db.get_bind(clause=text("UPDATE projects"))
+
+
+def update_items(db: Session, project_id: int, column: str, key: str, key_values: Sequence[Any],
+                 changes: Dict[str, Any], expect: Optional[Dict[str, Any]] = None) -> Optional[Tuple[int, List[dict]]]:
+    """
+    То же, что update_item, для нескольких элементов сразу: один UPDATE массива
+    и одно увеличение версии на всю пачку. Элементы, не найденные или не подошедшие
+    по expect, пропускаются. Возвращает (версия, изменённые элементы) или None, если менять нечего
+    """
+    _check(column, key, *changes, *(expect or {}))
+    params = {"project_id": project_id, "keys": list(key_values)}
+    conditions = [f"json_extract(value, '$.{key}') IN :keys"]
+    for i, (field, value) in enumerate((expect or {}).items()):
+        params[f"e{i}"] = value
+        conditions.append(f"json_extract(value, '$.{field}') = :e{i}")
+    rows = db.execute(
+        text(f"SELECT key, value FROM projects, json_each(projects.{column})"
+             f" WHERE projects.id = :project_id AND " + " AND ".join(conditions)
+             ).bindparams(bindparam("keys", expanding=True)),
+        params, bind_arguments={"bind": _writer(db)},
+    ).all()
+    if not rows:
+        return None
+    params = {"project_id": project_id, "indexes": [row[0] for row in rows]}
+    assignments = []
+    for i, (field, value) in enumerate(changes.items()):
+        params[f"v{i}"] = json.dumps(value, ensure_ascii=False)
+        assignments.append(f"'$.{field}', json(:v{i})")
+    version = db.execute(text(
+        f"UPDATE projects SET {column} = ("
+        f" SELECT json_group_array(json(CASE WHEN key IN :indexes"
+        f" THEN json_set(value, {', '.join(assignments)}) ELSE value END))"
+        f" FROM (SELECT key, value FROM json_each(projects.{column}) ORDER BY key)),"
+        f" version = version + 1"
+        f" WHERE id = :project_id RETURNING version"
+    ).bindparams(bindparam("indexes", expanding=True)), params).scalar()
+    items = [{**json.loads(row[1]), **changes} for row in rows]
+    return version, items
+
+
+def remove_item(db: Session, project_id: int, column: str, key: str, key_value: Any) -> Optional[int]:
+    """Удалить элемент массива по key == key_value; новая версия или None"""
+    _check(column, key)
+    params = {"project_id": project_id}
+    index_sql = _match_sql(column, {key: key_value}, params, "k")
+    row = db.execute(text(
+        f"UPDATE projects SET {column} = json_remove({column}, '$[' || ({index_sql}) || ']'),"
+        f" version = version + 1"
+        f" WHERE id = :project_id AND EXISTS ({index_sql})"
+        f" RETURNING version"
+    ), params).first()
+    return row[0] if row else None
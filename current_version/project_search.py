@@ -0,0 +1,324 @@
+# project_search.py
+"""
+Полнотекстовый поиск по проектам (SQLite FTS5).
+Строка индекса на проект (название, описание, задачи) и отдельный индекс комментариев —
+строка на каждый видимый комментарий. Новый, скрытый или изменённый комментарий переписывает
+одну свою строку, правка задачи — только строку проекта, без его обсуждения.
+Проект находится, если все слова запроса есть в его строке или в одном комментарии;
+если так не нашлось ничего — если каждое слово есть хотя бы в одной строке проекта.
+Индекс поддерживают триггеры SQLite, поэтому он обновляется при любой записи —
+через ORM, core-вставки и сырой SQL. Полная перестройка: python project_search.py
+"""
+import operator
+from functools import reduce
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, literal, literal_column, or_, select, table, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import with_expression
+from sqlalchemy.orm.attributes import set_committed_value
+
+from core.fts import FTS_TOKENIZER, fold_sql, match_terms
+from database import engine
+from models import Project
+
+SEARCH_TABLE = "project_search"
+COMMENT_TABLE = "project_comment_search"
+# Номера строк комментариев в индексе: id комментария — строка, а скрытый rowid
+# project_comments может поменяться при VACUUM, поэтому номера выдаёт своя таблица
+DOCS_TABLE = "project_search_docs"
+# rowid строки проекта = project_id; rowid комментария = project_id << DOC_BITS | номер (с 1):
+# проект совпадения берётся из rowid без чтения строки; до 2^24 комментариев на проект
+DOC_BITS = 24
+# Веса bm25 по колонкам: название, описание, задачи; у комментария колонка одна
+RANK_WEIGHTS = (10.0, 4.0, 2.0)
+# Маркеры совпадений в snippet(); в HTML их заменяет Project.snippet
+MATCH_START, MATCH_END = "\ue000", "\ue001"
+SNIPPET_TOKENS = 16
+
+
+def _first_doc(project_id: str) -> str:
+    return f"({project_id} << {DOC_BITS})"
+
+
+def _last_doc(project_id: str) -> str:
+    return f"({_first_doc(project_id)} + {(1 << DOC_BITS) - 1})"
+
+
+# Строка проекта: всё, кроме комментариев
+_PROJECT_DOCUMENT = f"""
+SELECT p.id,
+       {fold_sql("p.title")},
+       {fold_sql("coalesce(p.body, '') || ' ' || coalesce(p.underbody, '')")},
+       (SELECT group_concat({fold_sql("coalesce(t.title, '') || ' ' || coalesce(t.body, '')")}, ' ')
+          FROM project_tasks t WHERE t.project_id = p.id)
+  FROM projects p
+"""
+# Строки комментариев, номера — из DOCS_TABLE
+_COMMENT_DOCUMENT = f"""
+SELECT d.doc, {fold_sql("c.content")}
+  FROM {DOCS_TABLE} d JOIN project_comments c ON c.id = d.ref
+"""
+
+
+def _reindex_project(project_id: str) -> str:
+    return (
+        f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, title, body, tasks)"
+        f" {_PROJECT_DOCUMENT} WHERE p.id = {project_id};"
+    )
+
+
+def _remove_comment(row: str) -> str:
+    return (
+        f"DELETE FROM {COMMENT_TABLE} WHERE rowid = (SELECT doc FROM {DOCS_TABLE} WHERE ref = {row}.id);\n"
+        f"DELETE FROM {DOCS_TABLE} WHERE ref = {row}.id;"
+    )
+
+
+def _index_comment(row: str) -> str:
+    # Следующий свободный номер в диапазоне проекта; скрытые комментарии не индексируются
+    project_id = f"{row}.project_id"
+    return (
+        f"INSERT INTO {DOCS_TABLE} (doc, ref)"
+        f" SELECT (SELECT coalesce(max(doc), {_first_doc(project_id)}) + 1 FROM {DOCS_TABLE}"
+        f" WHERE doc BETWEEN {_first_doc(project_id)} AND {_last_doc(project_id)}), {row}.id WHERE NOT {row}.hidden;\n"
+        f"INSERT INTO {COMMENT_TABLE} (rowid, content) {_COMMENT_DOCUMENT} WHERE d.ref = {row}.id;"
+    )
+
+
+# (имя, событие, тело); UPDATE следит только за индексируемыми колонками,
+# поэтому рост version и прочие правки проекта индекс не трогают
+_TRIGGERS = (
+    ("project_search_ai", "AFTER INSERT ON projects", _reindex_project("NEW.id")),
+    ("project_search_au", "AFTER UPDATE OF title, body, underbody ON projects", _reindex_project("NEW.id")),
+    ("project_search_ad", "AFTER DELETE ON projects",
+     f"DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;\n"
+     f"DELETE FROM {COMMENT_TABLE} WHERE rowid BETWEEN {_first_doc('OLD.id')} AND {_last_doc('OLD.id')};\n"
+     f"DELETE FROM {DOCS_TABLE} WHERE doc BETWEEN {_first_doc('OLD.id')} AND {_last_doc('OLD.id')};"),
+    ("project_search_task_ai", "AFTER INSERT ON project_tasks", _reindex_project("NEW.project_id")),
+    ("project_search_task_au", "AFTER UPDATE OF title, body ON project_tasks", _reindex_project("NEW.project_id")),
+    ("project_search_task_ad", "AFTER DELETE ON project_tasks", _reindex_project("OLD.project_id")),
+    ("project_search_comment_ai", "AFTER INSERT ON project_comments", _index_comment("NEW")),
+    # Скрытый комментарий уходит из индекса, возвращённый — снова попадает
+    ("project_search_comment_au", "AFTER UPDATE OF content, hidden ON project_comments",
+     _remove_comment("OLD") + "\n" + _index_comment("NEW")),
+    ("project_search_comment_ad", "AFTER DELETE ON project_comments", _remove_comment("OLD")),
+)
+
+
+def _create_statements():
+    yield f"CREATE TABLE IF NOT EXISTS {DOCS_TABLE} (doc INTEGER PRIMARY KEY, ref TEXT NOT NULL UNIQUE)"
+    yield (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "title, body, tasks, "
+        f"tokenize = '{FTS_TOKENIZER}', prefix = '2 3')"
+    )
+    yield (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENT_TABLE} USING fts5("
+        f"content, tokenize = '{FTS_TOKENIZER}', prefix = '2 3')"
+    )
+    for name, when, body in _TRIGGERS:
+        yield f"CREATE TRIGGER IF NOT EXISTS {name} {when} BEGIN\n{body}\nEND"
+
+
+def _drop_statements():
+    for name, _, _ in _TRIGGERS:
+        yield f"DROP TRIGGER IF EXISTS {name}"
+    yield f"DROP TABLE IF EXISTS {SEARCH_TABLE}"
+    yield f"DROP TABLE IF EXISTS {COMMENT_TABLE}"
+    yield f"DROP TABLE IF EXISTS {DOCS_TABLE}"
+
+
+def _rebuild(conn) -> int:
+    conn.exec_driver_sql(f"DELETE FROM {SEARCH_TABLE}")
+    conn.exec_driver_sql(f"DELETE FROM {COMMENT_TABLE}")
+    conn.exec_driver_sql(f"DELETE FROM {DOCS_TABLE}")
+    count = conn.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, tasks) {_PROJECT_DOCUMENT}").rowcount
+    conn.exec_driver_sql(
+        f"INSERT INTO {DOCS_TABLE} (doc, ref)"
+        f" SELECT {_first_doc('project_id')} + row_number() OVER (PARTITION BY project_id), id"
+        " FROM project_comments WHERE NOT hidden"
+    )
+    conn.exec_driver_sql(f"INSERT INTO {COMMENT_TABLE} (rowid, content) {_COMMENT_DOCUMENT}")
+    # Сливаем сегменты индексов в один — так поиск быстрее
+    for name in (SEARCH_TABLE, COMMENT_TABLE):
+        conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('optimize')")
+    return count
+
+
+def ensure_search_index(bind=engine) -> None:
+    """
+    Создаёт индекс и триггеры, если их нет; новый индекс сразу заполняется.
+    Индекс прежнего вида (комментарии в общей таблице, без COMMENT_TABLE) перестраивается
+    """
+    with bind.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (COMMENT_TABLE,)
+        ).first()
+        if not exists:
+            for statement in _drop_statements():
+                conn.exec_driver_sql(statement)
+        for statement in _create_statements():
+            conn.exec_driver_sql(statement)
+        if not exists:
+            _rebuild(conn)
+
+
+def rebuild_search_index(bind=engine) -> int:
+    """Полная перестройка индекса (после массового импорта или смены токенизатора)"""
+    with bind.begin() as conn:
+        for statement in _drop_statements():
+            conn.exec_driver_sql(statement)
+        for statement in _create_statements():
+            conn.exec_driver_sql(statement)
+        return _rebuild(conn)
+
+
+_PROJECT_INDEX = literal_column(SEARCH_TABLE)
+_COMMENT_INDEX = literal_column(COMMENT_TABLE)
+_PROJECT_ROWID = literal_column(f"{SEARCH_TABLE}.rowid")
+_COMMENT_ROWID = literal_column(f"{COMMENT_TABLE}.rowid")
+
+
+def _project_hits(expression: str, *extra):
+    return (
+        select(_PROJECT_ROWID.label("project_id"), *extra, func.bm25(_PROJECT_INDEX, *RANK_WEIGHTS).label("search_rank"))
+        .select_from(table(SEARCH_TABLE))
+        .where(_PROJECT_INDEX.op("MATCH")(expression))
+    )
+
+
+def _comment_hits(expression: str, *extra):
+    return (
+        select((_COMMENT_ROWID.op(">>")(DOC_BITS)).label("project_id"), *extra, func.bm25(_COMMENT_INDEX).label("search_rank"))
+        .select_from(table(COMMENT_TABLE))
+        .where(_COMMENT_INDEX.op("MATCH")(expression))
+    )
+
+
+def _project_rows(expression: str):
+    return select(_PROJECT_ROWID).select_from(table(SEARCH_TABLE)).where(_PROJECT_INDEX.op("MATCH")(expression))
+
+
+def _comment_rows(expression: str):
+    return select(_COMMENT_ROWID).select_from(table(COMMENT_TABLE)).where(_COMMENT_INDEX.op("MATCH")(expression))
+
+
+def _found(*expressions: str):
+    """
+    Есть ли совпадения хоть одного выражения. Сначала — точные слова: проверка без «*»
+    почти бесплатна, а префиксный поиск FTS5 сливает списки всех слов с этим началом
+    """
+    return or_(*(
+        rows(expression).exists() for expression in expressions
+        for rows in (_project_rows, _comment_rows)
+    ))
+
+
+def _combined_matches(expression: str, exact: str):
+    """
+    Все слова в строке проекта или в одном комментарии. Строки проекта уникальны и идут
+    без группировки; из комментариев — только проекты, чья строка не совпала
+    """
+    # LIMIT -1 не даёт SQLite встроить подзапрос в группировку: bm25() считается только при обходе индекса
+    hits = _comment_hits(expression).limit(-1).subquery("comment_hits")
+    comments = (
+        select(hits.c.project_id, func.min(hits.c.search_rank).label("search_rank"))
+        .group_by(hits.c.project_id)
+        .cte("comment_matches")
+    )
+    # Совпавшие строки проектов из диапазона comment_matches — одним обходом индекса на весь
+    # запрос, а не поиском на каждый проект: с префиксами каждый такой поиск стоит как полный
+    in_range = _PROJECT_ROWID.between(
+        select(func.min(comments.c.project_id)).scalar_subquery(),
+        select(func.max(comments.c.project_id)).scalar_subquery(),
+    )
+    return (
+        _project_hits(expression),
+        select(comments).where(
+            comments.c.project_id.not_in(_project_rows(exact).where(in_range)),
+            comments.c.project_id.not_in(_project_rows(expression).where(in_range)),
+        ),
+    )
+
+
+def _per_term_matches(terms: List[str], expression: str, exact: str):
+    """
+    Запасной путь: каждое слово хотя бы в одной строке проекта; ранг — сумма лучших bm25
+    по словам. Вычисляется, только если совпадений всех слов в одной строке нет совсем
+    """
+    # Условие — в LIMIT: его SQLite вычисляет один раз до обхода, и при LIMIT 0 индекс не читается.
+    # В WHERE подзапрос EXISTS проверялся бы на каждой строке уже после полного обхода
+    hits = union_all(*(
+        hits(term, literal(number).label("term"))
+        for number, term in enumerate(terms) for hits in (_project_hits, _comment_hits)
+    )).limit(case((_found(exact, expression), 0), else_=-1)).subquery("hits")
+    # Если слова нет ни в одной строке проекта, его min() — NULL, сумма тоже, и проект отсеивается
+    rank = reduce(operator.add, (
+        func.min(case((hits.c.term == number, hits.c.search_rank))) for number in range(len(terms))
+    ))
+    return select(hits.c.project_id, rank).group_by(hits.c.project_id).having(rank.isnot(None))
+
+
+def search_query(q: str) -> Tuple[Optional[object], Optional[object]]:
+    """
+    select(Project) по совпадениям с рангом bm25 в Project.search_rank и колонка ранга
+    для сортировки; (None, None) — в запросе нет слов
+    """
+    terms = match_terms(q)
+    if not terms:
+        return None, None
+    expression = " ".join(terms)
+    # Те же слова без префиксного поиска: их совпадение — заведомо и совпадение expression
+    exact = " ".join(term.rstrip("*") for term in terms)
+    parts = list(_combined_matches(expression, exact))
+    if len(terms) > 1:
+        parts.append(_per_term_matches(terms, expression, exact))
+    matches = union_all(*parts).subquery("matches")
+    project_id, search_rank = matches.c
+    # matches слева и LEFT JOIN: так SQLite 3.40 отдаёт совпадения потоком, а при
+    # JOIN сначала складывает их все во временную таблицу. Проект есть у каждой строки
+    # индекса — индекс ведут триггеры в той же транзакции
+    query = select(Project).select_from(matches).outerjoin(Project, project_id == Project.id).options(
+        with_expression(Project.search_rank, search_rank)
+    )
+    return query, search_rank
+
+
+def _snippet(index, column_number: int):
+    return func.snippet(index, column_number, MATCH_START, MATCH_END, "…", SNIPPET_TOKENS)
+
+
+async def attach_snippets(db: AsyncSession, q: str, projects: List[Project]) -> None:
+    """
+    Фрагменты с совпадениями для проектов страницы (Project.search_snippet): из лучшей по bm25
+    строки проекта или его комментария. Отдельными запросами: в основном snippet()
+    считался бы для всех совпадений
+    """
+    terms = match_terms(q)
+    if not terms or not projects:
+        return
+    expression = " OR ".join(terms)
+    ids = [p.id for p in projects]
+    # Диапазон rowid и фильтр поверх него: rowid IN FTS5 выполняет отдельным поиском на каждое
+    # значение, и с префиксами каждый такой поиск стоит как полный (+ 0 — чтобы IN не ушёл в индекс)
+    rows = (await db.execute(
+        _project_hits(expression, _snippet(_PROJECT_INDEX, -1))
+        .where(_PROJECT_ROWID.between(min(ids), max(ids)), (_PROJECT_ROWID + 0).in_(ids))
+    )).all()
+    rows += (await db.execute(
+        _comment_hits(expression, _snippet(_COMMENT_INDEX, 0))
+        .where(_COMMENT_ROWID.between(min(ids) << DOC_BITS, ((max(ids) + 1) << DOC_BITS) - 1),
+               _COMMENT_ROWID.op(">>")(DOC_BITS).in_(ids))
+    )).all()
+    snippets = {}
+    for project_id, text, rank in rows:
+        if project_id not in snippets or rank < snippets[project_id][1]:
+            snippets[project_id] = (text, rank)
+    for project in projects:
+        set_committed_value(project, "search_snippet", snippets.get(project.id, (None,))[0])
+
+
+if __name__ == "__main__":
+    count = rebuild_search_index()
+    print(f"✅ Поисковый индекс перестроен, проектов: {count}")
@@ -0,0 +1,127 @@
+# project_summary.py
+"""
+Краткое представление проектов для списков (?view=summary / ?fields=).
+Из projects читаются только скалярные колонки и значения, посчитанные в SQL;
+JSON-колонки и задачи не загружаются. Счётчики по задачам, комментариям и
+участникам собираются группирующими запросами сразу для всей страницы
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, noload, with_expression
+
+from models import Project, ProjectComment, ProjectParticipant, ProjectTask
+from schemas import ProjectSummary
+
+SUMMARY_FIELDS = tuple(ProjectSummary.model_fields)
+EXCERPT_LENGTH = 200
+TASK_FIELDS = {"tasks_total", "task_counts", "progress"}
+
+
+def summary_fields(view: Optional[str], fields: Optional[str]) -> Optional[Set[str]]:
+    """Набор полей краткого представления; None — полное представление"""
+    if fields:
+        names = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = names - set(SUMMARY_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unsupported fields: {', '.join(sorted(unknown))}")
+        return names | {"id"}
+    if view in (None, "full"):
+        return None
+    if view == "summary":
+        return set(SUMMARY_FIELDS)
+    raise HTTPException(status_code=400, detail=f"Unsupported view: {view}")
+
+
+def _pending_count(column):
+    """Число элементов JSON-массива со status = pending, считается в SQLite"""
+    items = func.json_each(column).table_valued("value")
+    return (
+        select(func.count())
+        .select_from(items)
+        .where(func.json_extract(items.c.value, "$.status") == "pending")
+        .scalar_subquery()
+    )
+
+
+def summary_query(query):
+    """select(Project) без JSON-колонок и задач, с вычисленными в SQL полями"""
+    return query.options(
+        load_only(Project.id, Project.title, Project.version),
+        noload(Project.task_rows),
+        with_expression(Project.excerpt, func.substr(Project.body, 1, EXCERPT_LENGTH)),
+        with_expression(Project.pending_join_requests, _pending_count(Project.join_requests)),
+        with_expression(Project.pending_suggestions, _pending_count(Project.suggestions)),
+    )
+
+
+async def summarize(db: AsyncSession, projects: List[Project], fields: Set[str]) -> List[dict]:
+    """Словари ProjectSummary для страницы проектов (только поля из fields)"""
+    ids = [p.id for p in projects]
+    summaries: Dict[int, dict] = {
+        p.id: {
+            "id": p.id,
+            "title": p.title,
+            "excerpt": p.excerpt,
+            "version": p.version,
+            "pending_join_requests": p.pending_join_requests or 0,
+            "pending_suggestions": p.pending_suggestions or 0,
+            "snippet": p.snippet,
+        }
+        for p in projects
+    }
+    if not ids:
+        return []
+
+    if "participants" in fields:
+        for s in summaries.values():
+            s["participants"] = []
+        rows = await db.execute(
+            select(ProjectParticipant)
+            .where(ProjectParticipant.project_id.in_(ids))
+            .order_by(ProjectParticipant.project_id, ProjectParticipant.joined_at, ProjectParticipant.user_id)
+        )
+        for p in rows.scalars():
+            summaries[p.project_id]["participants"].append({
+                "user_id": p.user_id, "role": p.role, "joined_at": p.joined_at, "invited_by": p.invited_by
+            })
+
+    if fields & TASK_FIELDS:
+        totals = defaultdict(lambda: {"count": 0, "by_status": {}, "progress_sum": 0.0, "progress_count": 0})
+        rows = await db.execute(
+            select(
+                ProjectTask.project_id, ProjectTask.status, func.count(),
+                func.sum(ProjectTask.progress), func.count(ProjectTask.progress)
+            )
+            .where(ProjectTask.project_id.in_(ids))
+            .group_by(ProjectTask.project_id, ProjectTask.status)
+        )
+        for project_id, status, count, progress_sum, progress_count in rows:
+            t = totals[project_id]
+            t["count"] += count
+            t["by_status"][status or ""] = count
+            t["progress_sum"] += progress_sum or 0
+            t["progress_count"] += progress_count
+        for project_id, s in summaries.items():
+            t = totals[project_id]
+            s["tasks_total"] = t["count"]
+            s["task_counts"] = t["by_status"]
+            s["progress"] = t["progress_sum"] / t["progress_count"] if t["progress_count"] else None
+
+    if "comment_count" in fields:
+        rows = await db.execute(
+            select(ProjectComment.project_id, func.count())
+            .where(ProjectComment.project_id.in_(ids), ProjectComment.hidden == False)
+            .group_by(ProjectComment.project_id)
+        )
+        counts = dict(rows.all())
+        for project_id, s in summaries.items():
+            s["comment_count"] = counts.get(project_id, 0)
+
+    # Фрагмент есть только у результатов поиска
+    if not any(s["snippet"] for s in summaries.values()):
+        fields = fields - {"snippet"}
+    return [ProjectSummary(**summaries[i]).model_dump(mode="json", include=fields) for i in ids]
@@ -0,0 +1,169 @@
+# read_cursors.py
+"""
+Курсоры прочтения комментариев для каждого пользователя.
+Ветка — комментарии проекта (thread = '') или одной задачи (thread = task_id).
+Для участника и ветки хранится последний прочитанный комментарий (read_at, read_id)
+и число непрочитанных видимых чужих комментариев после него.
+Счётчики ведут триггеры SQLite в той же транзакции, что и само изменение:
+новый комментарий — +1 остальным участникам, скрытие или удаление — −1 тем,
+у кого он ещё не прочитан. GET /users/me/unread читает только эту таблицу
+"""
+from typing import List, Optional
+
+from sqlalchemy import column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import engine
+
+READS_TABLE = "comment_reads"
+
+comment_reads = table(
+    READS_TABLE,
+    column("user_id"), column("project_id"), column("thread"),
+    column("read_at"), column("read_id"), column("unread"),
+)
+
+
+def _after_cursor(row: str, reads: str = READS_TABLE) -> str:
+    # Порядок ветки — (created_at, id), как у страниц комментариев; без курсора непрочитано всё
+    return (f"({row}.created_at, {row}.id) > "
+            f"(coalesce({reads}.read_at, ''), coalesce({reads}.read_id, ''))")
+
+
+# Пересчёт счётчика строки comment_reads по индексу ix_project_comments_thread
+_RECOUNT = (
+    "(SELECT count(*) FROM project_comments c"
+    f" WHERE c.project_id = {READS_TABLE}.project_id AND c.task_id IS nullif({READS_TABLE}.thread, '')"
+    f" AND c.hidden = 0 AND c.author_id != {READS_TABLE}.user_id AND {_after_cursor('c')})"
+)
+
+
+def _shift(row: str, delta: str) -> str:
+    """Сдвинуть счётчик у всех, для кого комментарий row ещё не прочитан (кроме автора)"""
+    return (
+        f"UPDATE {READS_TABLE} SET unread = max(0, unread + {delta})"
+        f" WHERE project_id = {row}.project_id AND thread = coalesce({row}.task_id, '')"
+        f" AND user_id != {row}.author_id AND {_after_cursor(row)};"
+    )
+
+
+# (имя, событие, тело триггера)
+_TRIGGERS = (
+    ("comment_reads_comment_ai", "AFTER INSERT ON project_comments WHEN NEW.hidden = 0",
+     f"INSERT INTO {READS_TABLE} (user_id, project_id, thread, unread)"
+     " SELECT user_id, NEW.project_id, coalesce(NEW.task_id, ''), 1 FROM project_participants"
+     " WHERE project_id = NEW.project_id AND user_id != NEW.author_id"
+     f" ON CONFLICT (user_id, project_id, thread) DO UPDATE SET unread = unread + ({_after_cursor('NEW')});"),
+    ("comment_reads_comment_hide", "AFTER UPDATE OF hidden ON project_comments WHEN NEW.hidden IS NOT OLD.hidden",
+     _shift("NEW", "CASE WHEN NEW.hidden THEN -1 ELSE 1 END")),
+    ("comment_reads_comment_ad", "AFTER DELETE ON project_comments WHEN OLD.hidden = 0",
+     _shift("OLD", "-1")),
+    # Новый участник (project_participants пишется разницей — INSERT только при вступлении):
+    # строки вернувшегося участника сохраняют курсор, счётчики пересчитываются от него
+    ("comment_reads_participant_ai", "AFTER INSERT ON project_participants",
+     f"INSERT INTO {READS_TABLE} (user_id, project_id, thread)"
+     " SELECT DISTINCT NEW.user_id, NEW.project_id, coalesce(task_id, '') FROM project_comments"
+     " WHERE project_id = NEW.project_id ON CONFLICT DO NOTHING;\n"
+     f"UPDATE {READS_TABLE} SET unread = {_RECOUNT}"
+     " WHERE user_id = NEW.user_id AND project_id = NEW.project_id;"),
+    ("comment_reads_project_ad", "AFTER DELETE ON projects",
+     f"DELETE FROM {READS_TABLE} WHERE project_id = OLD.id;"),
+)
+
+# Первое заполнение: курсор ветки ставится на последний комментарий, отмеченный старым
+# общим флагом is_read, счётчик считается от курсора — так же, как при любом пересчёте
+_BACKFILL = (
+    "WITH last_read AS ("
+    " SELECT project_id, task_id, created_at, id,"
+    " row_number() OVER (PARTITION BY project_id, task_id ORDER BY created_at DESC, id DESC) AS n"
+    " FROM project_comments WHERE is_read),"
+    " threads AS (SELECT DISTINCT project_id, task_id FROM project_comments)"
+    f" INSERT INTO {READS_TABLE} (user_id, project_id, thread, read_at, read_id)"
+    " SELECT p.user_id, t.project_id, coalesce(t.task_id, ''), r.created_at, r.id"
+    " FROM threads t JOIN project_participants p ON p.project_id = t.project_id"
+    " LEFT JOIN last_read r ON r.project_id = t.project_id AND r.task_id IS t.task_id AND r.n = 1",
+    f"UPDATE {READS_TABLE} SET unread = {_RECOUNT}",
+)
+
+
+def ensure_read_cursors(bind=engine) -> None:
+    """Создаёт таблицу курсоров и триггеры; при первом создании заполняет счётчики"""
+    with bind.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (READS_TABLE,)
+        ).scalar()
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {READS_TABLE} ("
+            " user_id INTEGER NOT NULL,"
+            " project_id INTEGER NOT NULL,"
+            " thread TEXT NOT NULL,"
+            " read_at TEXT,"
+            " read_id TEXT,"
+            " unread INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (user_id, project_id, thread)) WITHOUT ROWID"
+        )
+        # Для триггеров: все читатели одной ветки
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_comment_reads_thread ON {READS_TABLE} (project_id, thread)"
+        )
+        for name, when, body in _TRIGGERS:
+            conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {when} BEGIN\n{body}\nEND")
+        if not exists:
+            for statement in _BACKFILL:
+                conn.exec_driver_sql(statement)
+
+
+def advance_cursor(db: Session, user_id: int, project_id: int, task_id: Optional[str],
+                   created_at: str, comment_id: str) -> Optional[int]:
+    """
+    Сдвинуть курсор пользователя до комментария (created_at, comment_id) включительно;
+    назад курсор не двигается. Возвращает непрочитанные после курсора или None,
+    если пользователь не участник проекта (курсоры ведутся только для участников)
+    """
+    params = {"user_id": user_id, "project_id": project_id, "thread": task_id or "",
+              "read_at": created_at, "read_id": comment_id}
+    db.execute(text(
+        f"INSERT INTO {READS_TABLE} (user_id, project_id, thread, read_at, read_id)"
+        " SELECT user_id, project_id, :thread, :read_at, :read_id FROM project_participants"
+        " WHERE project_id = :project_id AND user_id = :user_id"
+        " ON CONFLICT (user_id, project_id, thread) DO UPDATE"
+        " SET read_at = excluded.read_at, read_id = excluded.read_id"
+        f" WHERE (excluded.read_at, excluded.read_id) > (coalesce(read_at, ''), coalesce(read_id, ''))"
+    ), params)
+    return db.execute(text(
+        f"UPDATE {READS_TABLE} SET unread = {_RECOUNT}"
+        " WHERE user_id = :user_id AND project_id = :project_id AND thread = :thread"
+        " RETURNING unread"
+    ), params).scalar()
+
+
+async def thread_cursor(db: AsyncSession, user_id: int, project_id: int, task_id: Optional[str]):
+    """Строка курсора пользователя в ветке или None"""
+    return (await db.execute(select(comment_reads).where(
+        comment_reads.c.user_id == user_id,
+        comment_reads.c.project_id == project_id,
+        comment_reads.c.thread == (task_id or ""),
+    ))).first()
+
+
+def is_read_by(reads, user_id: int, author_id: int, created_at: str, comment_id: str) -> bool:
+    """Прочитан ли комментарий пользователем с курсором reads (свои — всегда)"""
+    if author_id == user_id:
+        return True
+    return (created_at, comment_id) <= (reads.read_at or "", reads.read_id or "")
+
+
+async def unread_threads(db: AsyncSession, user_id: int) -> List[dict]:
+    """Ветки с непрочитанными комментариями в текущих проектах пользователя — по первичному ключу"""
+    rows = await db.execute(text(
+        f"SELECT r.project_id, r.thread, r.unread, r.read_id FROM {READS_TABLE} r"
+        " JOIN project_participants p ON p.project_id = r.project_id AND p.user_id = r.user_id"
+        " WHERE r.user_id = :user_id AND r.unread > 0"
+        " ORDER BY r.project_id, r.thread"
+    ), {"user_id": user_id})
+    return [
+        {"project_id": row.project_id, "task_id": row.thread or None,
+         "unread": row.unread, "last_read_id": row.read_id}
+        for row in rows
+    ]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Generic, Literal, TypeVar
 from datetime import datetime
 from enum import Enum
 
@@ -18,6 +18,66 @@ class Comment(BaseModel):
     isRead: bool
     hidden: bool = False                    # <-- новое поле
 
+class CommentPage(BaseModel):
+    items: List[Comment]
+    next_cursor: Optional[str] = None       # передать в ?after= для следующей страницы
+    unread: Optional[int] = None            # только на первой странице
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    """Страница списка: next_cursor передаётся в ?after=, total — только при with_total=true"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+class ChangeEntry(BaseModel):
+    """Строка журнала изменений: что поменялось, но не само содержимое"""
+    seq: int
+    entity: str                             # project, user или comment
+    id: str
+    op: str                                 # upsert или delete
+    version: Optional[int] = None           # для project и user — версия после изменения (как в ETag)
+    project_id: Optional[int] = None
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeEntry]
+    next_since: int                         # передать в ?since= следующего запроса
+    has_more: bool = False
+    resync: bool = False                    # журнал уже сжат: перечитать всё и продолжить с next_since
+
+# ---------- Пакетные операции ----------
+MAX_BULK_ITEMS = 200
+
+class BulkIds(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class BulkAction(BulkIds):
+    action: Literal["accept", "reject"]
+
+class BulkResult(BaseModel):
+    """Итог пакетной операции: одна транзакция на всю пачку"""
+    updated: List[str]
+    skipped: List[str] = []                 # не найдены или уже обработаны
+    version: Optional[int] = None           # версия проекта после изменения (как в ETag)
+
+class ReadUpTo(BaseModel):
+    up_to: Optional[str] = None             # id комментария: он и все более ранние; без него — вся ветка
+
+class ReadResult(BaseModel):
+    updated: int
+    unread: int                             # непрочитанных в ветке после отметки
+
+class UnreadThread(BaseModel):
+    project_id: int
+    task_id: Optional[str] = None           # None — комментарии самого проекта
+    unread: int
+    last_read_id: Optional[str] = None      # курсор: последний прочитанный комментарий
+
+class UnreadSummary(BaseModel):
+    total: int
+    threads: List[UnreadThread]             # только ветки с непрочитанными
+
 # ---------- Project Roles ----------
 class ProjectRole(str, Enum):
     CUSTOMER = "customer"      # Заказчик
@@ -63,6 +123,7 @@ class StudentCreate(StudentBase):
 
 class StudentResponse(StudentBase):
     id: int
+    version: int = 0
     is_active: Optional[bool] = None
     is_verified: Optional[bool] = None
     created_at: Optional[datetime] = None
@@ -97,6 +158,7 @@ class TeacherCreate(TeacherBase):
 
 class TeacherResponse(TeacherBase):
     id: int
+    version: int = 0
     is_active: Optional[bool] = None
     is_verified: Optional[bool] = None
     created_at: Optional[datetime] = None
@@ -130,9 +192,19 @@ class UserResponse(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     is_admin: bool = False
+    version: int = 0                        # для ETag / If-Match
     
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
+class UserBrief(BaseModel):
+    """Подсказка при наборе (/users/autocomplete): только то, что нужно для выпадающего списка"""
+    id: int
+    nickname: str
+    fullname: str
+    avatar: Optional[str] = None
+    is_teacher: bool = False
+    model_config = ConfigDict(from_attributes=True)
+
 # ---------- Auth ----------
 class LoginRequest(BaseModel):
     nickname: str
@@ -159,6 +231,37 @@ class Suggestion(BaseModel):
     status: SuggestionStatus = SuggestionStatus.PENDING
     created_at: datetime
     comments: List[Comment] = []
+# ---------- Task ----------
+class TaskBase(BaseModel):
+    # Подзадачи и прочие поля фронтенда сохраняются как есть
+    model_config = ConfigDict(extra="allow")
+    title: str = Field(..., json_schema_extra={"example": "расчёты"})
+    status: str = "ожидает"
+    body: str = ""
+    timeline: Optional[str] = Field(None, json_schema_extra={"example": "15.10.2025"})
+    timelinend: Optional[str] = Field(None, json_schema_extra={"example": "20.11.2026"})
+    progress: Optional[float] = None
+    assigned_to: Optional[int] = None
+
+class TaskCreate(TaskBase):
+    position: Optional[int] = None          # по умолчанию — в конец списка
+
+class TaskUpdate(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    title: Optional[str] = None
+    status: Optional[str] = None
+    body: Optional[str] = None
+    timeline: Optional[str] = None
+    timelinend: Optional[str] = None
+    progress: Optional[float] = None
+    assigned_to: Optional[int] = None
+    position: Optional[int] = None          # переместить задачу в списке
+
+class TaskResponse(TaskBase):
+    id: str
+    project_id: int
+    position: int
+
 # ---------- Project ----------
 class ProjectBase(BaseModel):
     title: str = Field(..., min_length=1, json_schema_extra={"example": "Космическая программа"})
@@ -182,18 +285,35 @@ class ProjectBase(BaseModel):
         default=None,
         json_schema_extra={"example": {"github": "https://github.com/...", "google_drive": "https://drive.google.com/..."}}
     )
-    comments: List[Comment] = Field(default=[], description="Комментарии к проекту")
     suggestions: List[Suggestion] = [] 
 
 class ProjectCreate(ProjectBase):
-    pass  # Все поля наследуются
+    # Только начальные комментарии; дальше — /projects/{id}/comments
+    comments: List[Comment] = Field(default=[], description="Комментарии к проекту")
 
 class ProjectResponse(ProjectBase):
     suggestions: List[Suggestion] = []
     id: int
+    version: int = 0                        # для ETag / If-Match
     join_requests: List[JoinRequest] = []   # добавлено! 
+    snippet: Optional[str] = None           # только в /search: фрагмент с <mark>
     model_config = ConfigDict(from_attributes=True)
 
+class ProjectSummary(BaseModel):
+    """Краткое представление проекта для карточек списка (?view=summary или ?fields=)"""
+    id: int
+    title: Optional[str] = None
+    excerpt: Optional[str] = None                   # начало описания
+    version: Optional[int] = None
+    participants: Optional[List[Participant]] = None
+    tasks_total: Optional[int] = None
+    task_counts: Optional[Dict[str, int]] = None    # число задач по статусам
+    progress: Optional[float] = None                # средний прогресс задач, где он указан
+    comment_count: Optional[int] = None
+    pending_join_requests: Optional[int] = None
+    pending_suggestions: Optional[int] = None
+    snippet: Optional[str] = None                   # только в /search: фрагмент с <mark>
+
 class ProjectUpdate(BaseModel):
     title: Optional[str] = None
     body: Optional[str] = None
@@ -201,7 +321,7 @@ class ProjectUpdate(BaseModel):
     tasks: Optional[List[Dict[str, Any]]] = None
     participants: Optional[List[Participant]] = None
     links: Optional[Dict[str, str]] = None
-    comments: Optional[List[Comment]] = None
+    # comments здесь нет: комментарии в ответах не приходят, их меняют через /projects/{id}/comments
 
 # ---------- Email верификация ----------
 class EmailVerificationCodeRequest(BaseModel):
@@ -0,0 +1,30 @@
+# tasks_backfill.py
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from database import engine
+from models import Base, Project, ProjectTask
+
+
+def backfill_project_tasks(bind=engine) -> int:
+    """
+    Переносит задачи из JSON-колонки projects.tasks в project_tasks и очищает колонку.
+    Запускать после backfill_project_comments: тот назначает задачам id
+    """
+    Base.metadata.create_all(bind=bind, tables=[ProjectTask.__table__])
+    moved = 0
+    with Session(bind=bind) as db:
+        pending = select(Project).where(func.json_array_length(Project.tasks_json) > 0)
+        for project in db.scalars(pending):
+            tasks = [t for t in project.tasks_json if isinstance(t, dict)]
+            # Задачи, уже перенесённые другим воркером, не дублируем
+            if not project.task_rows:
+                project.tasks = tasks
+                moved += len(tasks)
+            project.tasks_json = []
+        db.commit()
+    return moved
+
+
+if __name__ == "__main__":
+    count = backfill_project_tasks()
+    print(f"✅ Перенесено задач: {count}")
@@ -0,0 +1,133 @@
+# user_search.py
+"""
+Поиск пользователей по индексу SQLite FTS5: ник, ФИО, email и специальность.
+Регистр (в том числе кириллица) и «ё» сводятся при записи в индекс и в запросе,
+слова ищутся по префиксу — для подсказок при наборе. Индекс поддерживают триггеры
+на users. Полная перестройка: python user_search.py
+"""
+from typing import List, Optional
+
+from sqlalchemy import false, func, literal_column, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.fts import FTS_TOKENIZER, fold_sql, match_expression
+from database import engine
+from models import User
+
+USER_SEARCH_TABLE = "user_search"
+# Веса bm25: ник, ФИО, email, специальность; kind (student/teacher) — только для фильтра
+RANK_WEIGHTS = (10.0, 8.0, 2.0, 1.0, 0.0)
+TEXT_COLUMNS = "{nickname fullname email speciality}"
+AUTOCOMPLETE_LIMIT = 10
+# Короткий префикс («и») совпадает с большой долей пользователей. Подсказки ранжируются
+# среди первых AUTOCOMPLETE_CANDIDATES совпадений: FTS5 отдаёт их в порядке rowid
+# и останавливается, поэтому время не растёт с числом совпавших
+AUTOCOMPLETE_CANDIDATES = 200
+
+_DOCUMENT = f"""
+SELECT u.id, {fold_sql("u.nickname")}, {fold_sql("u.fullname")},
+       {fold_sql("coalesce(u.email, '')")}, {fold_sql("coalesce(u.speciality, '')")},
+       CASE WHEN u.is_teacher THEN 'teacher' ELSE 'student' END
+  FROM users u
+"""
+_COLUMNS = "rowid, nickname, fullname, email, speciality, kind"
+
+
+def _create_statements():
+    yield (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {USER_SEARCH_TABLE} USING fts5("
+        f"nickname, fullname, email, speciality, kind, tokenize = '{FTS_TOKENIZER}', prefix = '1 2 3')"
+    )
+    reindex = (
+        f"DELETE FROM {USER_SEARCH_TABLE} WHERE rowid = NEW.id;\n"
+        f"INSERT INTO {USER_SEARCH_TABLE}({_COLUMNS}) {_DOCUMENT} WHERE u.id = NEW.id;"
+    )
+    yield f"CREATE TRIGGER IF NOT EXISTS user_search_ai AFTER INSERT ON users BEGIN\n{reindex}\nEND"
+    yield (
+        "CREATE TRIGGER IF NOT EXISTS user_search_au "
+        f"AFTER UPDATE OF nickname, fullname, email, speciality, is_teacher ON users BEGIN\n{reindex}\nEND"
+    )
+    yield (
+        "CREATE TRIGGER IF NOT EXISTS user_search_ad AFTER DELETE ON users BEGIN\n"
+        f"DELETE FROM {USER_SEARCH_TABLE} WHERE rowid = OLD.id;\nEND"
+    )
+
+
+def _rebuild(conn) -> int:
+    conn.exec_driver_sql(f"DELETE FROM {USER_SEARCH_TABLE}")
+    count = conn.exec_driver_sql(f"INSERT INTO {USER_SEARCH_TABLE}({_COLUMNS}) {_DOCUMENT}").rowcount
+    conn.exec_driver_sql(f"INSERT INTO {USER_SEARCH_TABLE}({USER_SEARCH_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def ensure_user_search_index(bind=engine) -> None:
+    """Создаёт индекс и триггеры, если их нет; новый индекс сразу заполняется"""
+    with bind.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (USER_SEARCH_TABLE,)
+        ).first()
+        for statement in _create_statements():
+            conn.exec_driver_sql(statement)
+        if not exists:
+            _rebuild(conn)
+
+
+def rebuild_user_search_index(bind=engine) -> int:
+    """Полная перестройка индекса пользователей"""
+    with bind.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {USER_SEARCH_TABLE}")
+        for statement in _create_statements():
+            conn.exec_driver_sql(statement)
+        return _rebuild(conn)
+
+
+def _match(q: str, min_prefix: int = 2, user_type: Optional[str] = None) -> Optional[str]:
+    """Выражение MATCH: слова ищутся только в текстовых колонках, тип — по колонке kind"""
+    expression = match_expression(q, min_prefix)
+    if expression is None:
+        return None
+    expression = f"{TEXT_COLUMNS} : ({expression})"
+    if user_type in ("student", "teacher"):
+        expression += f' AND kind : "{user_type}"'
+    return expression
+
+
+def _matches(expression: str):
+    index = literal_column(USER_SEARCH_TABLE)
+    return (
+        select(
+            literal_column(f"{USER_SEARCH_TABLE}.rowid").label("user_id"),
+            func.bm25(index, *RANK_WEIGHTS).label("rank"),
+        )
+        .select_from(table(USER_SEARCH_TABLE))
+        .where(index.op("MATCH")(expression))
+    )
+
+
+def user_match_filter(q: str):
+    """Условие «пользователь подходит под запрос» для select(User); без слов в запросе — ложно"""
+    expression = _match(q)
+    if expression is None:
+        return false()
+    return User.id.in_(_matches(expression).with_only_columns(literal_column(f"{USER_SEARCH_TABLE}.rowid")))
+
+
+async def autocomplete_users(db: AsyncSession, q: str, limit: int = AUTOCOMPLETE_LIMIT,
+                             user_type: Optional[str] = None) -> List:
+    """Подсказки: лучшие по bm25 среди первых AUTOCOMPLETE_CANDIDATES совпадений"""
+    expression = _match(q, min_prefix=1, user_type=user_type)
+    if expression is None:
+        return []
+    candidates = _matches(expression).limit(max(limit, AUTOCOMPLETE_CANDIDATES)).subquery("candidates")
+    query = (
+        select(User.id, User.nickname, User.fullname, User.avatar, User.is_teacher)
+        .join(candidates, candidates.c.user_id == User.id)
+        .order_by(candidates.c.rank, User.id)
+        .limit(limit)
+    )
+    return (await db.execute(query)).all()
+
+
+if __name__ == "__main__":
+    count = rebuild_user_search_index()
+    print(f"✅ Индекс пользователей перестроен, пользователей: {count}")